@@ -1,5 +1,20 @@
 from django.contrib import admin
+from file_manager.models.chunk import Chunk, FileChunk
+from file_manager.models.chunked_upload import ChunkedUpload
+from file_manager.models.dead_letter import DeadLetter
 from file_manager.models.file import File
+from file_manager.models.file_claim import FileClaim
+from file_manager.models.fingerprint import Fingerprint
+from file_manager.models.transfer_job import TransferJob
+from file_manager.models.transfer_worker import TransferWorker
 
 # Register your models here.
 admin.site.register(File)
+admin.site.register(Fingerprint)
+admin.site.register(TransferJob)
+admin.site.register(ChunkedUpload)
+admin.site.register(DeadLetter)
+admin.site.register(Chunk)
+admin.site.register(FileChunk)
+admin.site.register(FileClaim)
+admin.site.register(TransferWorker)
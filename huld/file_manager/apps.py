@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class FileManagerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "file_manager"
+
+    def ready(self) -> None:
+        # Connects the receiver of the deleted files
+        # Counts the DB queries of every connection
+        from django.db.backends.signals import connection_created
+        from file_manager.services import known_hashes  # noqa: F401
+        from file_manager.services.metrics import instrument_connection
+
+        connection_created.connect(instrument_connection)
@@ -0,0 +1,155 @@
+import itertools
+import os
+import resource
+import tempfile
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from file_manager.services.benchmark import parse_size
+from file_manager.services.hashing import (
+    HASHERS, create_hash_executor, hash_file_path
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the throughput and the memory usage of the file hashing for small, medium and large files, "
+        "optionally by several hash algorithms and by several workers in parallel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="4KiB,64MiB,2GiB",
+            help="Comma separated sizes of the generated files (default: 4KiB,64MiB,2GiB)",
+        )
+        parser.add_argument(
+            "--chunk-sizes",
+            default=str(settings.HASH_CHUNK_SIZE),
+            help="Comma separated chunk sizes to be compared (default: HASH_CHUNK_SIZE)",
+        )
+        parser.add_argument(
+            "--algorithms",
+            default=settings.HASH_ALGORITHM,
+            help=f"Comma separated hash algorithms to be compared, any of {', '.join(HASHERS)} "
+            "(default: HASH_ALGORITHM)",
+        )
+        parser.add_argument(
+            "--files",
+            type=int,
+            default=1,
+            help="Number of generated files of every size (default: 1)",
+        )
+        parser.add_argument(
+            "--workers",
+            default="1",
+            help="Comma separated numbers of hashing workers to be compared, e.g. 1,2,4,8 (default: 1)",
+        )
+        parser.add_argument(
+            "--pool",
+            choices=["thread", "process"],
+            default=settings.HASH_POOL,
+            help="Type of the hashing pool (default: HASH_POOL)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Number of runs per file, the best one is reported (default: 3)",
+        )
+        parser.add_argument(
+            "--dir",
+            default=None,
+            help="Folder, in which the files are generated (default: system temp folder)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [parse_size(size) for size in options["sizes"].split(",")]
+            chunk_sizes = [
+                parse_size(size) for size in options["chunk_sizes"].split(",")
+            ]
+            workers = [int(count) for count in options["workers"].split(",")]
+        except ValueError as e:
+            raise CommandError(f"Invalid value: {e}")
+        algorithms = options["algorithms"].split(",")
+        for algorithm in algorithms:
+            if algorithm not in HASHERS:
+                raise CommandError(
+                    f"Unknown hash algorithm or its package is not installed: {algorithm}"
+                )
+
+        with tempfile.TemporaryDirectory(dir=options["dir"]) as temp_dir:
+            for size in sizes:
+                file_paths = [
+                    os.path.join(temp_dir, f"bench-{size}-{index}.bin")
+                    for index in range(options["files"])
+                ]
+                for file_path in file_paths:
+                    self._generate_file(file_path, size)
+                total_size = size * len(file_paths)
+
+                for chunk_size, algorithm in itertools.product(chunk_sizes, algorithms):
+                    baseline = None
+                    for worker_count in workers:
+                        best = self._measure(
+                            file_paths,
+                            chunk_size,
+                            algorithm,
+                            worker_count,
+                            options["pool"],
+                            options["repeat"],
+                        )
+                        baseline = baseline or best
+
+                        # ru_maxrss is reported in kilobytes on Linux
+                        peak_rss = (
+                            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                        )
+                        self.stdout.write(
+                            f"size={size:>12} B  files={len(file_paths):>4}  chunk={chunk_size:>9} B  "
+                            f"algorithm={algorithm:>7}  workers={worker_count:>3}  time={best:8.4f} s  "
+                            f"throughput={total_size / best / 1024**3:7.3f} GiB/s  "
+                            f"speedup={baseline / best:5.2f}x  peak_rss={peak_rss:8.1f} MiB"
+                        )
+                for file_path in file_paths:
+                    os.remove(file_path)
+
+    @staticmethod
+    def _measure(
+        file_paths: list[str],
+        chunk_size: int,
+        algorithm: str,
+        workers: int,
+        pool: str,
+        repeat: int,
+    ) -> float:
+        """Return the best time of hashing all the files by the algorithm and the given number of workers"""
+        executor = create_hash_executor(workers, pool) if workers > 1 else None
+        hash_path = partial(hash_file_path, chunk_size=chunk_size, algorithm=algorithm)
+        best = None
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                if executor is None:
+                    list(map(hash_path, file_paths))
+                else:
+                    list(executor.map(hash_path, file_paths))
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return best
+
+    @staticmethod
+    def _generate_file(file_path: str, size: int) -> None:
+        """Write a file of the given size, repeating one random block, so the generation itself is fast"""
+        block = os.urandom(min(size, 1024 * 1024))
+        with open(file_path, "wb") as file:
+            remaining = size
+            while remaining > 0:
+                written = file.write(block[:remaining])
+                remaining -= written
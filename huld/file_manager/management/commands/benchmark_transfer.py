@@ -0,0 +1,179 @@
+import multiprocessing
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from file_manager.services.benchmark import (
+    BenchmarkReceiver, CorpusSpec, generate_corpus, measure_transfer,
+    parse_size_distribution, summarize
+)
+
+from rest_framework.utils import json
+
+# Value of `SEND_FILES_BULK` of every mode
+MODES = {"one-by-one": False, "bulk": True}
+
+
+def _measure_mode(
+    sending, bulk: bool, folder_path: str, url: str, rate_limit: float
+) -> None:
+    """Measure one transfer in the forked process and send the measurements to the parent"""
+    try:
+        call_command("flush", interactive=False, verbosity=0)
+        # The process is thrown away afterwards, so the settings are simply overwritten
+        settings.FILES_FOLDER_PATH = folder_path
+        settings.FILE_RECEIVE_URL = url
+        settings.SEND_FILES_BULK = bulk
+        settings.TRANSFER_RATE_LIMIT = rate_limit
+        settings.CHUNK_DEDUP_URL = settings.CHUNKED_UPLOAD_URL = None
+        settings.TRANSFER_SHARDING = False
+        result = measure_transfer()
+    except Exception as e:
+        result = {"error": repr(e)}
+    finally:
+        connections.close_all()
+    sending.send(result)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the end-to-end transfer of a generated folder to a local stand-in receiver in the one-by-one "
+        "and the bulk mode. Every mode is reported as one JSON line with the files/s, MB/s, peak RSS, "
+        "number of the DB queries and the p50/p99 latency of the files, so the results can be compared across commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--files",
+            type=int,
+            default=1000,
+            help="Number of the generated files (default: 1000)",
+        )
+        parser.add_argument(
+            "--sizes",
+            default="4KiB:70,64KiB:20,1MiB:9,16MiB:1",
+            help="Comma separated sizes of the files with their weights (default: 4KiB:70,64KiB:20,1MiB:9,16MiB:1)",
+        )
+        parser.add_argument(
+            "--duplicate-ratio",
+            type=float,
+            default=0.1,
+            help="Fraction of the files, which are copies of another file (default: 0.1)",
+        )
+        parser.add_argument(
+            "--compressibility",
+            type=float,
+            default=0.5,
+            help="Fraction of the content of the files, which is zeros instead of random bytes (default: 0.5)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the generated folder, the same seed generates the same files (default: 0)",
+        )
+        parser.add_argument(
+            "--modes",
+            default=",".join(MODES),
+            help=f"Comma separated modes to be measured, any of {', '.join(MODES)} (default: all)",
+        )
+        parser.add_argument(
+            "--rate-limit",
+            type=float,
+            default=1_000_000,
+            help="Requests per second of the one-by-one mode, the local receiver needs no protection "
+            "(default: 1000000, i.e. unlimited)",
+        )
+        parser.add_argument(
+            "--label",
+            default="",
+            help="Label of the results, e.g. the commit (`--label $(git rev-parse --short HEAD)`)",
+        )
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="File, to which the results are appended (default: standard output)",
+        )
+        parser.add_argument(
+            "--dir",
+            default=None,
+            help="Folder, in which the files are generated (default: system temp folder)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = parse_size_distribution(options["sizes"])
+        except ValueError as e:
+            raise CommandError(f"Invalid value: {e}")
+        modes = options["modes"].split(",")
+        for mode in modes:
+            if mode not in MODES:
+                raise CommandError(f"Unknown mode: {mode}")
+        for name in ["duplicate_ratio", "compressibility"]:
+            if not 0 <= options[name] <= 1:
+                raise CommandError(f"{name} must be between 0 and 1.")
+        spec = CorpusSpec(
+            count=options["files"],
+            sizes=sizes,
+            duplicate_ratio=options["duplicate_ratio"],
+            compressibility=options["compressibility"],
+            seed=options["seed"],
+        )
+
+        # Transfers are measured against an empty database created for the benchmark, same as by the tests
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with tempfile.TemporaryDirectory(dir=options["dir"]) as folder_path:
+                corpus_size = generate_corpus(folder_path, spec)
+                with BenchmarkReceiver() as receiver:
+                    for mode in modes:
+                        measurements = self._measure(
+                            mode, folder_path, receiver.url, options["rate_limit"]
+                        )
+                        result = summarize(
+                            spec, corpus_size, measurements, receiver.pop_samples()
+                        )
+                        self._write(
+                            {"label": options["label"], "mode": mode, **result},
+                            options["output"],
+                        )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    @staticmethod
+    def _measure(mode: str, folder_path: str, url: str, rate_limit: float) -> dict:
+        """
+        Measure the transfer in a forked process, so the peak RSS and the caches (e.g. of the sent hashes)
+        are not carried over from the previous mode
+        """
+        # The connections must not be shared with the forked process
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        receiving, sending = context.Pipe(duplex=False)
+        process = context.Process(
+            target=_measure_mode,
+            args=(sending, MODES[mode], folder_path, url, rate_limit),
+        )
+        process.start()
+        sending.close()
+        try:
+            result = receiving.recv()
+        except EOFError:
+            raise CommandError(f"The {mode} transfer has crashed.")
+        finally:
+            process.join()
+        if "error" in result:
+            raise CommandError(f"The {mode} transfer has failed: {result['error']}")
+        return result
+
+    def _write(self, result: dict, output: str | None) -> None:
+        line = json.dumps(result)
+        if output is None:
+            self.stdout.write(line)
+            return
+        with open(output, "a") as file:
+            file.write(line + "\n")
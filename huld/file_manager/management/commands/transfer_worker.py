@@ -0,0 +1,60 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from file_manager.services.jobs import claim_next_job, run_job
+from file_manager.services.metrics import serve_metrics
+from file_manager.services.sharding import Heartbeat, get_worker_name
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Process the queued transfer jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process all the queued jobs and exit instead of waiting for new ones",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.TRANSFER_WORKER_POLL_INTERVAL,
+            help="Seconds to wait before checking for new jobs again (default: TRANSFER_WORKER_POLL_INTERVAL)",
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            default=settings.METRICS_PORT,
+            help="Port, on which the metrics are served at `/metrics`, 0 disables them (default: METRICS_PORT, 9464)",
+        )
+
+    def handle(self, *args, **options):
+        serve_metrics(options["metrics_port"])
+        if not settings.TRANSFER_SHARDING:
+            self._process_jobs(options)
+            return
+
+        # The worker is a member of the ring of the sharded transfers as long as it runs
+        worker_name = get_worker_name()
+        with Heartbeat(worker_name):
+            self._process_jobs(options, worker_name)
+
+    @staticmethod
+    def _process_jobs(options, worker_name: str | None = None) -> None:
+        while True:
+            job = claim_next_job(worker_name)
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
+                continue
+
+            try:
+                run_job(job)
+            except Exception:
+                # The failure is recorded in the job, the worker shall keep processing other jobs
+                log.exception("Transfer job %s has failed.", job.pk)
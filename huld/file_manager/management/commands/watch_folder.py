@@ -0,0 +1,78 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from file_manager.models import TransferJob
+from file_manager.services.jobs import run_job
+from file_manager.services.metrics import serve_metrics
+from file_manager.services.watcher import create_watcher
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Watch the folder and transfer the new files as soon as they are completely written."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backend",
+            choices=["auto", "inotify", "polling"],
+            default="auto",
+            help="How the folder is watched, `auto` uses inotify if available and polling otherwise (default: auto)",
+        )
+        parser.add_argument(
+            "--debounce",
+            type=float,
+            default=settings.WATCH_DEBOUNCE,
+            help="Seconds a file must stay unchanged before it is sent (default: WATCH_DEBOUNCE)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.WATCH_POLL_INTERVAL,
+            help="Seconds between the scans of the folder by the polling backend (default: WATCH_POLL_INTERVAL)",
+        )
+        parser.add_argument(
+            "--skip-initial-scan",
+            action="store_true",
+            help="Do not transfer the files, which are already in the folder, when the command starts",
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            default=settings.METRICS_PORT,
+            help="Port, on which the metrics are served at `/metrics`, 0 disables them (default: METRICS_PORT, 9464)",
+        )
+
+    def handle(self, *args, **options):
+        folder_path = settings.FILES_FOLDER_PATH
+        try:
+            watcher = create_watcher(
+                folder_path,
+                options["backend"],
+                debounce=options["debounce"],
+                poll_interval=options["poll_interval"],
+            )
+        except FileNotFoundError:
+            raise CommandError(f"The folder `{folder_path}` does not exist.")
+
+        serve_metrics(options["metrics_port"])
+        with watcher:
+            log.info("Watching the folder `%s` for new files.", folder_path)
+            if not options["skip_initial_scan"]:
+                # Files, which arrived while the folder was not watched
+                self._transfer(None)
+            for file_paths in watcher:
+                self._transfer(file_paths)
+
+    @staticmethod
+    def _transfer(file_paths: list[str] | None) -> None:
+        job = TransferJob.objects.create(
+            status=TransferJob.Status.RUNNING, started_at=timezone.now()
+        )
+        try:
+            run_job(job, file_paths)
+        except Exception:
+            # The failure is recorded in the job, the folder shall be watched further
+            log.exception("Transfer job %s has failed.", job.pk)
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.1 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_manager", "0002_alter_file_path"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Fingerprint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("device", models.BigIntegerField()),
+                ("file_number", models.BigIntegerField()),
+                ("size", models.BigIntegerField()),
+                ("modified_ns", models.BigIntegerField()),
+                ("md5_hash", models.CharField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="fingerprint",
+            constraint=models.UniqueConstraint(
+                fields=("device", "file_number"), name="fingerprint_inode_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.1 on 2026-10-17 01:02
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_files(apps, schema_editor):
+    """Keep only the first sent record of every hash and file number, so the unique constraints can be created"""
+    File = apps.get_model("file_manager", "File")
+    for field in ("md5_hash", "file_number"):
+        first_ids = File.objects.values(field).annotate(first_id=Min("id"))
+        File.objects.exclude(id__in=first_ids.values("first_id")).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_manager", "0003_fingerprint"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_files, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="file",
+            name="md5_idx",
+        ),
+        migrations.AlterField(
+            model_name="file",
+            name="file_number",
+            field=models.BigIntegerField(unique=True),
+        ),
+        migrations.AlterField(
+            model_name="file",
+            name="md5_hash",
+            field=models.CharField(unique=True),
+        ),
+    ]
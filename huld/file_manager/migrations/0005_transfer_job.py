@@ -0,0 +1,53 @@
+# Generated by Django 4.2.1 on 2026-10-17 01:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_manager", "0004_file_unique_hash_and_number"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransferJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("succeeded", "Succeeded"),
+                            ("failed", "Failed"),
+                        ],
+                        default="queued",
+                        max_length=16,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("files_scanned", models.PositiveIntegerField(default=0)),
+                ("files_hashed", models.PositiveIntegerField(default=0)),
+                ("files_skipped", models.PositiveIntegerField(default=0)),
+                ("files_sent", models.PositiveIntegerField(default=0)),
+                ("bytes_sent", models.PositiveBigIntegerField(default=0)),
+                ("error", models.TextField(blank=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["status", "created_at"], name="job_status_idx")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.1 on 2026-10-17 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_manager", "0005_transfer_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChunkedUpload",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("md5_hash", models.CharField()),
+                ("size", models.BigIntegerField()),
+                ("url", models.URLField(max_length=2048)),
+                ("offset", models.BigIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="chunkedupload",
+            constraint=models.UniqueConstraint(
+                fields=("md5_hash", "size"), name="chunked_upload_content_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.1 on 2026-10-17 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_manager", "0006_chunked_upload"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="file",
+            name="compressed_size",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="file",
+            name="size",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.1 on 2026-10-17 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_manager", "0009_chunk"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="file",
+            name="hash_algorithm",
+            field=models.CharField(default="md5", max_length=16),
+        ),
+        migrations.AddField(
+            model_name="fingerprint",
+            name="hash_algorithm",
+            field=models.CharField(default="md5", max_length=16),
+        ),
+        migrations.AlterField(
+            model_name="file",
+            name="md5_hash",
+            field=models.CharField(),
+        ),
+        migrations.AddIndex(
+            model_name="file",
+            index=models.Index(fields=["size"], name="size_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="file",
+            constraint=models.UniqueConstraint(
+                fields=("hash_algorithm", "md5_hash"), name="file_hash_unique"
+            ),
+        ),
+    ]
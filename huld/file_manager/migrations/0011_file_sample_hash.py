@@ -0,0 +1,25 @@
+# Generated by Django 4.2.1 on 2026-10-17 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_manager", "0010_hash_algorithm"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="file",
+            name="size_idx",
+        ),
+        migrations.AddField(
+            model_name="file",
+            name="sample_hash",
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="file",
+            index=models.Index(fields=["size", "sample_hash"], name="size_sample_idx"),
+        ),
+    ]
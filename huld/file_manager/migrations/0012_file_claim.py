@@ -0,0 +1,37 @@
+# Generated by Django 4.2.1 on 2026-10-17 01:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_manager", "0011_file_sample_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FileClaim",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("file_number", models.BigIntegerField(unique=True)),
+                ("claimed_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="file_manager.transferjob",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.1 on 2026-10-17 01:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_manager", "0012_file_claim"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransferWorker",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("joined_at", models.DateTimeField(auto_now_add=True)),
+                ("heartbeat_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="transferjob",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="shards",
+                to="file_manager.transferjob",
+            ),
+        ),
+        migrations.AddField(
+            model_name="transferjob",
+            name="worker",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
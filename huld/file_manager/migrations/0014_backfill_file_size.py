@@ -0,0 +1,36 @@
+# Generated by Django 4.2.1 on 2026-10-17 03:10
+
+import os
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_file_size(apps, schema_editor):
+    """
+    Fill in the size of the files sent before it was stored, so they are found by the dedup lookups by size.
+    The size is read from the file, if it is still the same file (by its number), the others are left empty.
+    """
+    File = apps.get_model("file_manager", "File")
+    files = []
+    for file in File.objects.filter(size__isnull=True).only("path", "file_number"):
+        try:
+            stat_result = os.stat(file.path)
+        except OSError:
+            continue
+        if stat_result.st_ino != file.file_number:
+            continue
+        file.size = stat_result.st_size
+        files.append(file)
+    File.objects.bulk_update(files, ["size"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_manager", "0013_transfer_worker"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_file_size, migrations.RunPython.noop),
+    ]
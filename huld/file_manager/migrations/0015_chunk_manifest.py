@@ -0,0 +1,39 @@
+# Generated by Django 4.2.1 on 2026-10-17 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_manager", "0014_backfill_file_size"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChunkManifest",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("md5_hash", models.CharField()),
+                ("hash_algorithm", models.CharField(default="md5", max_length=16)),
+                ("size", models.BigIntegerField()),
+                ("chunker", models.CharField(max_length=64)),
+                ("chunks", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="chunkmanifest",
+            constraint=models.UniqueConstraint(
+                fields=("md5_hash", "hash_algorithm", "size", "chunker"),
+                name="chunk_manifest_content_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.1 on 2026-10-17 02:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_sample_size(apps, schema_editor):
+    """
+    Record the sample size of the files sampled before it was stored, as the current `DEDUP_SAMPLE_SIZE`.
+    If the setting was changed since they were sampled, a duplicate of them may be sent once more.
+    """
+    File = apps.get_model("file_manager", "File")
+    File.objects.filter(sample_hash__isnull=False).update(
+        sample_size=settings.DEDUP_SAMPLE_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_manager", "0015_chunk_manifest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="file",
+            name="sample_size",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_sample_size, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.1 on 2026-10-17 02:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_manager", "0016_file_sample_size"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContentClaim",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content_key", models.CharField(max_length=160, unique=True)),
+                ("claimed_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="file_manager.transferjob",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -1 +1,10 @@
+from file_manager.models.chunk import Chunk, FileChunk  # noqa: F401
+from file_manager.models.chunk_manifest import ChunkManifest  # noqa: F401
+from file_manager.models.chunked_upload import ChunkedUpload  # noqa: F401
+from file_manager.models.content_claim import ContentClaim  # noqa: F401
+from file_manager.models.dead_letter import DeadLetter  # noqa: F401
 from file_manager.models.file import File  # noqa: F401
+from file_manager.models.file_claim import FileClaim  # noqa: F401
+from file_manager.models.fingerprint import Fingerprint  # noqa: F401
+from file_manager.models.transfer_job import TransferJob  # noqa: F401
+from file_manager.models.transfer_worker import TransferWorker  # noqa: F401
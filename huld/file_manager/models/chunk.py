@@ -0,0 +1,27 @@
+from django.db import models
+from file_manager.models.file import File
+
+
+class Chunk(models.Model):
+    """Content-defined chunk of the sent files, which the receiver already has"""
+
+    # SHA-256 of the content of the chunk
+    digest = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class FileChunk(models.Model):
+    """Chunk at the given position of a file sent by chunks, so the file can be assembled from them"""
+
+    file = models.ForeignKey(File, on_delete=models.CASCADE, related_name="chunks")
+    chunk = models.ForeignKey(Chunk, on_delete=models.PROTECT, related_name="+")
+    index = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["file", "index"], name="file_chunk_index_unique"
+            ),
+        ]
+        ordering = ["file", "index"]
@@ -0,0 +1,27 @@
+from django.db import models
+
+
+class ChunkManifest(models.Model):
+    """
+    Content-defined chunks of a file, which is being sent by chunks.
+    The file is split only once, so the attempts to send it (in this or in the next transfers) do not split
+    it again. The manifest is identified by the hash of the file and by the chunker with its chunk sizes,
+    as every chunker cuts the file at other boundaries. It is deleted once the file is sent.
+    """
+
+    md5_hash = models.CharField()
+    hash_algorithm = models.CharField(max_length=16, default="md5")
+    size = models.BigIntegerField()
+    # Name of the chunker with the minimal, the average and the maximal chunk size, e.g. `fastcdc:256:1024:4096`
+    chunker = models.CharField(max_length=64)
+    # Digest and size of every chunk of the file
+    chunks = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["md5_hash", "hash_algorithm", "size", "chunker"],
+                name="chunk_manifest_content_unique",
+            ),
+        ]
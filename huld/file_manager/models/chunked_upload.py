@@ -0,0 +1,24 @@
+from django.db import models
+
+
+class ChunkedUpload(models.Model):
+    """
+    Upload of a large file in chunks, which is not finished yet.
+    The offset is stored after every chunk acknowledged by the receiver, so an interrupted upload is resumed
+    from there. The upload is identified by the hash of the file, same as the `File` stored once it is sent.
+    """
+
+    md5_hash = models.CharField()
+    size = models.BigIntegerField()
+    # Location of the upload at the receiver
+    url = models.URLField(max_length=2048)
+    offset = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["md5_hash", "size"], name="chunked_upload_content_unique"
+            ),
+        ]
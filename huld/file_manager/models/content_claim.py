@@ -0,0 +1,14 @@
+from django.db import models
+from file_manager.models.transfer_job import TransferJob
+
+
+class ContentClaim(models.Model):
+    """
+    Content being sent by a job, so the other jobs do not send its copies under other inodes at the same time
+    (e.g. a copy in another shard). The content is keyed by its size and sample or by its hash, see `get_content_key`.
+    The claim is released together with the claim of the file, a claim of a crashed job expires.
+    """
+
+    content_key = models.CharField(max_length=160, unique=True)
+    job = models.ForeignKey(TransferJob, on_delete=models.CASCADE, related_name="+")
+    claimed_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class DeadLetter(models.Model):
+    """
+    File, which could not be sent even after all the retries.
+    It is tried again by the next transfer and removed once it is sent.
+    """
+
+    name = models.CharField(max_length=255)
+    path = models.FilePathField(max_length=255)
+    md5_hash = models.CharField(unique=True)
+    attempts = models.PositiveIntegerField(default=0)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -4,10 +4,23 @@ from django.db import models
 class File(models.Model):
     name = models.CharField(max_length=255)
     path = models.FilePathField(max_length=255)
+    # Hash of the content by the `hash_algorithm`, the name is kept from the times of md5 only
     md5_hash = models.CharField()
-    file_number = models.IntegerField()
+    hash_algorithm = models.CharField(max_length=16, default="md5")
+    file_number = models.BigIntegerField(unique=True)
+    size = models.BigIntegerField(null=True, blank=True)
+    # Number of bytes actually sent, if the file was compressed
+    compressed_size = models.BigIntegerField(null=True, blank=True)
+    # Hash of the head and the tail of the file, by which the new files are told apart without the full hash
+    sample_hash = models.CharField(max_length=32, null=True, blank=True)
+    # Number of bytes of the head and of the tail, by which the sample was taken, see `DEDUP_SAMPLE_SIZE`
+    sample_size = models.IntegerField(null=True, blank=True)
 
     class Meta:
-        indexes = [
-            models.Index(fields=["md5_hash"], name="md5_idx"),
+        constraints = [
+            # Files hashed by another algorithm before it was changed stay valid for the deduplication
+            models.UniqueConstraint(
+                fields=["hash_algorithm", "md5_hash"], name="file_hash_unique"
+            ),
         ]
+        indexes = [models.Index(fields=["size", "sample_hash"], name="size_sample_idx")]
@@ -0,0 +1,13 @@
+from django.db import models
+from file_manager.models.transfer_job import TransferJob
+
+
+class FileClaim(models.Model):
+    """
+    File being sent by a job, so the other jobs scanning the same folder at the same time do not send it as well.
+    The claim is released once the file is sent or has failed, a claim of a crashed job expires.
+    """
+
+    file_number = models.BigIntegerField(unique=True)
+    job = models.ForeignKey(TransferJob, on_delete=models.CASCADE, related_name="+")
+    claimed_at = models.DateTimeField(auto_now_add=True)
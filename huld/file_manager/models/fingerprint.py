@@ -0,0 +1,34 @@
+import os
+
+from django.db import models
+
+
+class Fingerprint(models.Model):
+    """
+    Hash of a scanned file together with the stat data it was computed from.
+    As long as the stat data of the file stays the same, the file does not need to be hashed again.
+    """
+
+    device = models.BigIntegerField()
+    file_number = models.BigIntegerField()
+    size = models.BigIntegerField()
+    modified_ns = models.BigIntegerField()
+    # Hash of the content by the `hash_algorithm`, the name is kept from the times of md5 only
+    md5_hash = models.CharField()
+    hash_algorithm = models.CharField(max_length=16, default="md5")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["device", "file_number"], name="fingerprint_inode_unique"
+            ),
+        ]
+
+    def matches(self, stat_result: os.stat_result, hash_algorithm: str) -> bool:
+        return (
+            self.hash_algorithm == hash_algorithm
+            and self.device == stat_result.st_dev
+            and self.file_number == stat_result.st_ino
+            and self.size == stat_result.st_size
+            and self.modified_ns == stat_result.st_mtime_ns
+        )
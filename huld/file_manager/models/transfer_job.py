@@ -0,0 +1,49 @@
+from django.db import models
+from django.utils import timezone
+
+
+class TransferJob(models.Model):
+    """One run of the transfer of the files from the folder to the external service"""
+
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        SUCCEEDED = "succeeded"
+        FAILED = "failed"
+
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.QUEUED
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    files_scanned = models.PositiveIntegerField(default=0)
+    files_hashed = models.PositiveIntegerField(default=0)
+    files_skipped = models.PositiveIntegerField(default=0)
+    files_sent = models.PositiveIntegerField(default=0)
+    bytes_sent = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # Transfer of the whole folder, which the job is a shard of, see `TRANSFER_SHARDING`
+    parent = models.ForeignKey(
+        "self",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="shards",
+    )
+    # Name of the worker, which the shard is assigned to
+    worker = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="job_status_idx"),
+        ]
+
+    @property
+    def throughput(self) -> float | None:
+        """Average number of bytes sent per second"""
+        if self.started_at is None:
+            return None
+        finished_at = self.finished_at or timezone.now()
+        duration = (finished_at - self.started_at).total_seconds()
+        return self.bytes_sent / duration if duration else None
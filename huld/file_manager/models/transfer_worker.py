@@ -0,0 +1,12 @@
+from django.db import models
+
+
+class TransferWorker(models.Model):
+    """
+    Running `transfer_worker` taking part in the sharded transfers, see `TRANSFER_SHARDING`.
+    The worker is considered gone, once it has not sent a heartbeat for `TRANSFER_WORKER_TIMEOUT` seconds.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    joined_at = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField()
@@ -0,0 +1,26 @@
+from file_manager.models import TransferJob
+
+from rest_framework.serializers import FloatField, ModelSerializer
+
+
+class TransferJobSerializer(ModelSerializer):
+    throughput = FloatField(read_only=True)
+
+    class Meta:
+        model = TransferJob
+        fields = [
+            "id",
+            "status",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "files_scanned",
+            "files_hashed",
+            "files_skipped",
+            "files_sent",
+            "bytes_sent",
+            "throughput",
+            "error",
+            "parent",
+            "worker",
+        ]
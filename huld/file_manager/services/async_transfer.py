@@ -0,0 +1,285 @@
+import asyncio
+import logging
+from itertools import islice
+from operator import attrgetter
+from typing import AsyncIterator
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from file_manager.services.batching import size_bounded_batches
+from file_manager.services.claims import (
+    aclaim_contents, aclaim_files, arelease_files
+)
+from file_manager.services.compression import (
+    PART_ENCODING_HEADER, choose_codec
+)
+from file_manager.services.dedup import (
+    ScannedFile, aget_legacy_algorithms, amark_duplicates, amark_sent_files
+)
+from file_manager.services.fingerprint import ahash_scanned_files
+from file_manager.services.metrics import measure_stage
+from file_manager.services.multipart import MultipartEncoder
+from file_manager.services.raw_body import RawBodySender
+from file_manager.services.retry import CircuitOpenError, Retrier
+from file_manager.services.sender import TokenBucket
+from file_manager.services.transfer import PROGRESS_FIELDS, TransferService
+
+log = logging.getLogger(__name__)
+
+# Connection errors of `httpx` as well as the files, which could not be read
+SEND_ERRORS = (OSError, httpx.HTTPError)
+
+
+class AsyncTransferService(TransferService):
+    """
+    Asynchronous variant of `TransferService`, meant to be run on the event loop of an ASGI server.
+    Scanning and hashing run in the default thread pool, the DB is accessed by the async ORM
+    and the files are sent by one pooled `httpx.AsyncClient`, so a single process can keep hundreds
+    of uploads in flight (limited by `TRANSFER_ASYNC_MAX_CONCURRENCY`).
+    The files are sent by the same means as by `TransferService`: by the uploaders of `_get_uploader`,
+    which run in the thread of the sync DB access, and as the raw body by the `RawBodySender` in the default
+    thread pool, if `UPLOAD_RAW_BODY` is set.
+    """
+
+    async def arun(self) -> bool:
+        """Transfer the files and return whether all of them were sent successfully"""
+        max_concurrency = settings.TRANSFER_ASYNC_MAX_CONCURRENCY
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_limiter = TokenBucket(
+            settings.TRANSFER_RATE_LIMIT, capacity=max_concurrency
+        )
+        limits = httpx.Limits(
+            max_connections=max_concurrency, max_keepalive_connections=max_concurrency
+        )
+        self._raw_body_sender = RawBodySender() if settings.UPLOAD_RAW_BODY else None
+        # Uploads of big files may take long, so there is no timeout, same as with `requests`
+        async with httpx.AsyncClient(limits=limits, timeout=None) as client:
+            self._client = client
+            self.codec = await self._anegotiate_codec()
+            self.retrier = Retrier()
+            self.legacy_algorithms = await aget_legacy_algorithms()
+            try:
+                if settings.SEND_FILES_BULK:
+                    return await self._asend_files_bulk()
+                return await self._asend_files_by_one()
+            finally:
+                self._report_progress()
+                if self._raw_body_sender is not None:
+                    self._raw_body_sender.close()
+
+    async def _anegotiate_codec(self) -> str | None:
+        if not settings.UPLOAD_COMPRESSION:
+            return None
+
+        try:
+            response = await self._client.options(settings.FILE_RECEIVE_URL)
+        except SEND_ERRORS as e:
+            log.warning("Compression could not be negotiated: %s", str(e))
+            return None
+        return choose_codec(response.headers.get(PART_ENCODING_HEADER, ""))
+
+    async def _aget_batches(self) -> AsyncIterator[list[ScannedFile]]:
+        scanned_files = self._scan_files()
+        batch_size = settings.TRANSFER_BATCH_SIZE
+
+        while True:
+            with measure_stage("scan"):
+                batch = await asyncio.to_thread(
+                    lambda: sorted(
+                        islice(scanned_files, batch_size), key=attrgetter("name")
+                    )
+                )
+            if not batch:
+                return
+
+            self.job.files_scanned += len(batch)
+            with measure_stage("hash"):
+                self.job.files_hashed += await ahash_scanned_files(batch)
+            with measure_stage("dedup"):
+                await amark_duplicates(batch, self.legacy_algorithms)
+            with measure_stage("claim"):
+                claimed_files = await self._aclaim_files(batch)
+            try:
+                with measure_stage("send"):
+                    yield claimed_files
+            finally:
+                with measure_stage("release"):
+                    await arelease_files(self.job, claimed_files)
+            await self.job.asave(update_fields=PROGRESS_FIELDS)
+            self._report_progress()
+
+    async def _aclaim_files(self, batch: list[ScannedFile]) -> list[ScannedFile]:
+        """Asynchronous variant of `_claim_files`"""
+        new_files = [
+            scanned_file for scanned_file in batch if not scanned_file.is_duplicate
+        ]
+        claimed_files = await aclaim_contents(
+            self.job, await aclaim_files(self.job, new_files)
+        )
+        await amark_sent_files(claimed_files)
+        return self._skip_claimed(batch, claimed_files)
+
+    async def _apost_once(
+        self, field_name: str, scanned_files: list[ScannedFile]
+    ) -> httpx.Response:
+        for scanned_file in scanned_files:
+            scanned_file.attempts += 1
+        async with self._semaphore:
+            await self._rate_limiter.aacquire()
+            body = MultipartEncoder(
+                field_name,
+                scanned_files,
+                codec=self.codec,
+                hash_field=settings.UPLOAD_HASH_FIELD,
+            )
+            return await self._client.post(
+                settings.FILE_RECEIVE_URL,
+                content=body.aiter_chunks(),
+                headers=body.headers,
+            )
+
+    async def _apost(
+        self, field_name: str, scanned_files: list[ScannedFile]
+    ) -> httpx.Response:
+        """Send the files, they are sent again if the request fails by a transient error"""
+        return await self.retrier.acall(
+            lambda: self._apost_once(field_name, scanned_files)
+        )
+
+    async def _apost_raw_once(self, scanned_file: ScannedFile) -> requests.Response:
+        scanned_file.attempts += 1
+        async with self._semaphore:
+            await self._rate_limiter.aacquire()
+            return await asyncio.to_thread(self._raw_body_sender.post, scanned_file)
+
+    async def _apost_file(
+        self, scanned_file: ScannedFile
+    ) -> httpx.Response | requests.Response:
+        """Send one file, as the raw body of the request if `UPLOAD_RAW_BODY` is set"""
+        if self._raw_body_sender is None:
+            return await self._apost("file", [scanned_file])
+        return await self.retrier.acall(lambda: self._apost_raw_once(scanned_file))
+
+    async def _asend_file(
+        self, uploaders: dict, scanned_file: ScannedFile
+    ) -> httpx.Response | requests.Response:
+        if self._get_uploader(scanned_file) is None:
+            return await self._apost_file(scanned_file)
+        return await sync_to_async(self._upload)(uploaders, scanned_file)
+
+    async def _asend_files_by_one(self) -> bool:
+        failed = False
+        uploaders = self._get_uploaders(self._rate_limiter)
+        async for batch in self._aget_batches():
+            new_files = [
+                scanned_file for scanned_file in batch if not scanned_file.is_duplicate
+            ]
+            results = await asyncio.gather(
+                *(
+                    self._asend_file(uploaders, scanned_file)
+                    for scanned_file in new_files
+                ),
+                return_exceptions=True,
+            )
+            results = {
+                scanned_file.path: result
+                for scanned_file, result in zip(new_files, results)
+            }
+
+            aborted = False
+            sent_files = []
+            for scanned_file in batch:
+                if scanned_file.is_duplicate:
+                    self._skip_duplicate(scanned_file)
+                    continue
+
+                result = results[scanned_file.path]
+                if isinstance(result, CircuitOpenError):
+                    self._log_exception(result)
+                    aborted = True
+                elif isinstance(result, SEND_ERRORS):
+                    self._log_exception(result)
+                    await sync_to_async(self._dead_letter)(scanned_file, error=result)
+                    failed = True
+                elif isinstance(result, BaseException):
+                    raise result
+                elif self._handle_response(scanned_file, result):
+                    sent_files.append(scanned_file)
+                else:
+                    await sync_to_async(self._dead_letter)(scanned_file, result)
+                    failed = True
+            # Files sent before a failure must be stored as well, so they are not sent again
+            await sync_to_async(self._store_sent_files)(sent_files)
+
+            if aborted:
+                return False
+        return not failed
+
+    async def _asend_bulk(self, scanned_files: list[ScannedFile]) -> bool:
+        """
+        Send one batch of files as one request and store them in the DB once they are sent.
+        If the request fails even after the retries, the files are sent one by one, so only the files,
+        which fail on their own, are moved to the dead letters.
+        """
+        try:
+            response = await self._apost("files", scanned_files)
+        except CircuitOpenError:
+            raise
+        except SEND_ERRORS as e:
+            self._log_exception(e)
+            response, error = None, e
+        else:
+            if self._handle_bulk_response(scanned_files, response):
+                await sync_to_async(self._store_sent_files)(scanned_files)
+                return True
+            error = None
+
+        if len(scanned_files) == 1:
+            await sync_to_async(self._dead_letter)(scanned_files[0], response, error)
+            return False
+        results = await asyncio.gather(
+            *(self._asend_alone(scanned_file) for scanned_file in scanned_files)
+        )
+        return all(results)
+
+    async def _asend_alone(self, scanned_file: ScannedFile) -> bool:
+        """Send one file of a failed batch and store it, or move it to the dead letters if it fails as well"""
+        try:
+            response = await self._apost_file(scanned_file)
+        except CircuitOpenError:
+            raise
+        except SEND_ERRORS as e:
+            self._log_exception(e)
+            await sync_to_async(self._dead_letter)(scanned_file, error=e)
+            return False
+
+        if not self._handle_response(scanned_file, response):
+            await sync_to_async(self._dead_letter)(scanned_file, response)
+            return False
+        await sync_to_async(self._store_sent_files)([scanned_file])
+        return True
+
+    async def _asend_files_bulk(self) -> bool:
+        failed = False
+        async for batch in self._aget_batches():
+            new_files = []
+            for scanned_file in batch:
+                if scanned_file.is_duplicate:
+                    self._skip_duplicate(scanned_file)
+                    continue
+                new_files.append(scanned_file)
+
+            results = await asyncio.gather(
+                *(self._asend_bulk(bulk) for bulk in size_bounded_batches(new_files)),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, CircuitOpenError):
+                    self._log_exception(result)
+                    return False
+                if isinstance(result, BaseException):
+                    raise result
+            failed = failed or not all(results)
+        return not failed
@@ -0,0 +1,41 @@
+from itertools import islice
+from typing import Iterable, Iterator, TypeVar
+
+from django.conf import settings
+from file_manager.services.dedup import ScannedFile
+
+T = TypeVar("T")
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Split the iterable into lists of at most `size` items"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def size_bounded_batches(
+    scanned_files: Iterable[ScannedFile],
+    max_files: int | None = None,
+    max_bytes: int | None = None,
+) -> Iterator[list[ScannedFile]]:
+    """
+    Split files into batches of at most `max_files` files and at most `max_bytes` bytes in total.
+    A file bigger than `max_bytes` is put into a batch of its own.
+    """
+    max_files = max_files or settings.BULK_MAX_FILES
+    max_bytes = max_bytes or settings.BULK_MAX_BYTES
+
+    batch = []
+    batch_size = 0
+    for scanned_file in scanned_files:
+        if batch and (
+            len(batch) >= max_files or batch_size + scanned_file.size > max_bytes
+        ):
+            yield batch
+            batch = []
+            batch_size = 0
+        batch.append(scanned_file)
+        batch_size += scanned_file.size
+    if batch:
+        yield batch
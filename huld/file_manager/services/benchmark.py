@@ -0,0 +1,262 @@
+import logging
+import math
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import urlopen
+
+from django.utils import timezone
+from file_manager.models import TransferJob
+from file_manager.services.compression import PART_ENCODING_HEADER
+from file_manager.services.jobs import run_job
+from file_manager.services.metrics import DB_QUERIES, REGISTRY
+
+from rest_framework.utils import json
+
+log = logging.getLogger(__name__)
+
+SIZE_UNITS = {"B": 1, "KIB": 1024, "MIB": 1024**2, "GIB": 1024**3}
+# Size of the blocks, of which the generated files are made
+BLOCK_SIZE = 64 * 1024
+# Part of the multipart header of every sent file, by which the files of a request are counted
+FILE_PART_MARKER = b"; filename"
+
+
+def parse_size(value: str) -> int:
+    """Parse human-readable size such as `4KiB`, `64MiB` or `2GiB` into the number of bytes"""
+    value = value.strip().upper()
+    for unit, multiplier in sorted(SIZE_UNITS.items(), key=lambda item: -len(item[0])):
+        if value.endswith(unit):
+            return int(float(value[: -len(unit)]) * multiplier)
+    return int(value)
+
+
+def parse_size_distribution(value: str) -> list[tuple[int, float]]:
+    """Parse comma separated sizes with their weights such as `4KiB:80,1MiB:15,64MiB:5` (the weight is 1 if omitted)"""
+    distribution = []
+    for item in value.split(","):
+        size, _, weight = item.partition(":")
+        distribution.append((parse_size(size), float(weight or 1)))
+    return distribution
+
+
+def percentile(values: list[float], percent: float) -> float | None:
+    """Return the percentile of the values by the nearest-rank method, None if there are no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+@dataclass
+class CorpusSpec:
+    """Synthetic folder of files, the same spec always generates the same files"""
+
+    count: int = 1000
+    # Sizes of the files with their weights, see `parse_size_distribution`
+    sizes: list[tuple[int, float]] = field(default_factory=lambda: [(4096, 1.0)])
+    # Fraction of the files, which are copies of another file of the corpus
+    duplicate_ratio: float = 0.0
+    # Fraction of every block of a file, which is zeros instead of random bytes
+    compressibility: float = 0.0
+    seed: int = 0
+
+
+def _write_file(
+    file_path: str, size: int, compressibility: float, rng: random.Random
+) -> None:
+    with open(file_path, "wb") as file:
+        # Random head makes every file unique, even if it is otherwise zeros
+        head = rng.randbytes(min(size, 16))
+        file.write(head)
+        remaining = size - len(head)
+        while remaining > 0:
+            length = min(BLOCK_SIZE, remaining)
+            random_length = round(length * (1 - compressibility))
+            file.write(rng.randbytes(random_length) + bytes(length - random_length))
+            remaining -= length
+
+
+def generate_corpus(folder_path: str, spec: CorpusSpec) -> int:
+    """Write the files of the corpus to the folder and return their total size"""
+    rng = random.Random(spec.seed)
+    sizes, weights = zip(*spec.sizes)
+    originals = []
+    total_size = 0
+    for index in range(spec.count):
+        file_path = os.path.join(folder_path, f"file-{index:07}.bin")
+        if originals and rng.random() < spec.duplicate_ratio:
+            shutil.copyfile(rng.choice(originals), file_path)
+        else:
+            size = rng.choices(sizes, weights)[0]
+            _write_file(file_path, size, spec.compressibility, rng)
+            originals.append(file_path)
+        total_size += os.path.getsize(file_path)
+    return total_size
+
+
+class _ReceiverHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self, status_code: int, body: bytes = b"", headers=None) -> None:
+        self.send_response(status_code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _iter_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while size := int(self.rfile.readline().split(b";")[0], 16):
+                yield self.rfile.read(size)
+                self.rfile.readline()
+            # Trailer
+            while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                pass
+            return
+
+        remaining = int(self.headers.get("Content-Length", 0))
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+    def _read_files(self) -> int:
+        """Read and discard the body, return the number of the files in it"""
+        if not self.headers.get("Content-Type", "").startswith("multipart/"):
+            for _ in self._iter_body():
+                pass
+            return 1
+
+        count = 0
+        tail = b""
+        # A marker split between two chunks is found in the tail of the previous chunk joined with the next one
+        overlap = len(FILE_PART_MARKER) - 1
+        for chunk in self._iter_body():
+            data = tail + chunk
+            count += data.count(FILE_PART_MARKER)
+            tail = data[-overlap:]
+        return count
+
+    def do_OPTIONS(self) -> None:
+        # Compression is used, if it is enabled by `UPLOAD_COMPRESSION`
+        self._respond(200, headers={PART_ENCODING_HEADER: "gzip, zstd"})
+
+    def do_POST(self) -> None:
+        started_at = time.perf_counter()
+        files = self._read_files()
+        duration = time.perf_counter() - started_at
+        with self.server.lock:
+            self.server.samples.append((duration, files))
+        self._respond(200)
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            samples, self.server.samples = self.server.samples, []
+        self._respond(200, json.dumps(samples).encode())
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def _serve(connection) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ReceiverHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.samples = []
+    connection.send(server.server_address[1])
+    server.serve_forever()
+
+
+class BenchmarkReceiver:
+    """
+    Local stand-in for the receiver, which accepts the files sent in any mode and discards them.
+    It runs in its own process, so it does not compete for the GIL with the measured transfer.
+    Every request is recorded with its duration (from its headers until its body is read) and the number
+    of the files in it, see `pop_samples`.
+    """
+
+    def __init__(self) -> None:
+        self._context = multiprocessing.get_context("fork")
+        self._process = None
+        self.url = ""
+        self.stats_url = ""
+
+    def __enter__(self) -> "BenchmarkReceiver":
+        receiving, sending = self._context.Pipe(duplex=False)
+        self._process = self._context.Process(target=_serve, args=(sending,))
+        self._process.daemon = True
+        self._process.start()
+        port = receiving.recv()
+        self.url = f"http://127.0.0.1:{port}/files/"
+        self.stats_url = f"http://127.0.0.1:{port}/stats/"
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._process.terminate()
+        self._process.join()
+
+    def pop_samples(self) -> list[tuple[float, int]]:
+        """Return the duration and the number of files of every request since the last call"""
+        with urlopen(self.stats_url) as response:
+            return [tuple(sample) for sample in json.loads(response.read())]
+
+
+def measure_transfer() -> dict:
+    """
+    Transfer the folder by one job with the current settings and return its measurements.
+    Peak RSS is of the whole process, so every transfer is meant to be measured in a new process.
+    """
+    job = TransferJob.objects.create(
+        status=TransferJob.Status.RUNNING, started_at=timezone.now()
+    )
+    REGISTRY.clear()
+    started_at = time.perf_counter()
+    run_job(job)
+    seconds = time.perf_counter() - started_at
+    return {
+        "status": job.status,
+        "seconds": seconds,
+        "files_scanned": job.files_scanned,
+        "files_hashed": job.files_hashed,
+        "files_skipped": job.files_skipped,
+        "files_sent": job.files_sent,
+        "bytes_sent": job.bytes_sent,
+        "db_queries": int(DB_QUERIES.get_total()),
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def summarize(
+    spec: CorpusSpec,
+    corpus_size: int,
+    measurements: dict,
+    samples: list[tuple[float, int]],
+) -> dict:
+    """
+    Add the throughput and the per-file latency to the measurements of the transfer.
+    The latency of a file is the duration of the request, by which it was sent (so in the bulk mode,
+    all the files of one request have the same latency).
+    """
+    seconds = measurements["seconds"]
+    latencies = [duration for duration, files in samples for _ in range(files)]
+    p50, p99 = percentile(latencies, 50), percentile(latencies, 99)
+    return {
+        **measurements,
+        "corpus": {**asdict(spec), "bytes": corpus_size},
+        "files_per_s": spec.count / seconds,
+        "mb_per_s": corpus_size / seconds / 1000**2,
+        "requests": len(samples),
+        "latency_p50_ms": None if p50 is None else p50 * 1000,
+        "latency_p99_ms": None if p99 is None else p99 * 1000,
+    }
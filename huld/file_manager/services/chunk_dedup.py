@@ -0,0 +1,202 @@
+import hashlib
+import logging
+from dataclasses import dataclass
+from urllib.parse import urljoin
+
+import requests
+from django.conf import settings
+from file_manager.models import Chunk, ChunkManifest
+from file_manager.services.batching import batched
+from file_manager.services.chunking import get_chunker, iter_chunks
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.retry import Retrier
+from file_manager.services.sender import TokenBucket, get_session
+
+log = logging.getLogger(__name__)
+
+
+def is_chunk_deduplicated(scanned_file: ScannedFile) -> bool:
+    """Whether the file shall be sent by the content-defined chunks instead of as a whole"""
+    return bool(
+        settings.CHUNK_DEDUP_URL and scanned_file.size >= settings.CHUNK_DEDUP_THRESHOLD
+    )
+
+
+@dataclass
+class FileChunkInfo:
+    digest: str
+    offset: int
+    size: int
+
+
+class ChunkUploader:
+    """Send files by their content-defined chunks, only the chunks new to the receiver, see `CHUNK_DEDUP_URL`"""
+
+    def __init__(
+        self,
+        url: str | None = None,
+        rate_limiter: TokenBucket | None = None,
+        retrier: Retrier | None = None,
+    ) -> None:
+        self.url = url or settings.CHUNK_DEDUP_URL
+        if self.url and get_chunker(*self._get_sizes()) != "fastcdc":
+            log.warning(
+                "Files are split by the chunker in Python, which is slow. Install `pyfastcdc` "
+                "or set the chunk sizes within its limits."
+            )
+        self.rate_limiter = rate_limiter or TokenBucket(0)
+        self.retrier = retrier or Retrier(max_attempts=1)
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        def request() -> requests.Response:
+            self.rate_limiter.acquire()
+            return get_session().request(method, url, **kwargs)
+
+        return self.retrier.call(request)
+
+    def _split(self, scanned_file: ScannedFile) -> list[FileChunkInfo]:
+        chunks = []
+        offset = 0
+        with open(scanned_file.path, "rb") as file:
+            for data in iter_chunks(file, *self._get_sizes()):
+                digest = hashlib.sha256(data).hexdigest()
+                chunks.append(FileChunkInfo(digest, offset, len(data)))
+                offset += len(data)
+        return chunks
+
+    @staticmethod
+    def _get_sizes() -> tuple[int, int, int]:
+        return (
+            settings.CHUNK_DEDUP_MIN_SIZE,
+            settings.CHUNK_DEDUP_AVG_SIZE,
+            settings.CHUNK_DEDUP_MAX_SIZE,
+        )
+
+    def _get_manifest_key(self, scanned_file: ScannedFile) -> dict:
+        sizes = self._get_sizes()
+        return {
+            "md5_hash": scanned_file.md5_hash,
+            "hash_algorithm": scanned_file.hash_algorithm,
+            "size": scanned_file.size,
+            "chunker": ":".join(map(str, [get_chunker(*sizes), *sizes])),
+        }
+
+    def _get_chunks(self, scanned_file: ScannedFile) -> list[FileChunkInfo]:
+        """Return the chunks of the file from its manifest, the file is split only if it has none yet"""
+        key = self._get_manifest_key(scanned_file)
+        manifest = ChunkManifest.objects.filter(**key).first()
+        if manifest is None:
+            chunks = self._split(scanned_file)
+            ChunkManifest.objects.get_or_create(
+                **key,
+                defaults={"chunks": [[chunk.digest, chunk.size] for chunk in chunks]},
+            )
+            return chunks
+
+        chunks = []
+        offset = 0
+        for digest, size in manifest.chunks:
+            chunks.append(FileChunkInfo(digest, offset, size))
+            offset += size
+        return chunks
+
+    @staticmethod
+    def _get_known_digests(digests: set[str]) -> set[str]:
+        known = set()
+        for batch in batched(digests, settings.TRANSFER_BATCH_SIZE):
+            known.update(
+                Chunk.objects.filter(digest__in=batch).values_list("digest", flat=True)
+            )
+        return known
+
+    def _send_chunks(
+        self, scanned_file: ScannedFile, chunks: list[FileChunkInfo]
+    ) -> requests.Response | None:
+        """Send the chunks and return the response, which has failed, if any"""
+        with open(scanned_file.path, "rb") as file:
+            for chunk in chunks:
+                file.seek(chunk.offset)
+                data = file.read(chunk.size)
+                if hashlib.sha256(data).hexdigest() != chunk.digest:
+                    raise OSError(
+                        f"File {scanned_file.path} was changed while being sent."
+                    )
+
+                response = self._request(
+                    "PUT",
+                    urljoin(self.url, f"chunks/{chunk.digest}"),
+                    data=data,
+                    headers={"Content-Type": "application/octet-stream"},
+                )
+                if response.status_code >= 400:
+                    return response
+                Chunk.objects.get_or_create(
+                    digest=chunk.digest, defaults={"size": chunk.size}
+                )
+        return None
+
+    def _send_manifest(
+        self, scanned_file: ScannedFile, chunks: list[FileChunkInfo]
+    ) -> requests.Response:
+        return self._request(
+            "POST",
+            urljoin(self.url, "files/"),
+            json={
+                "name": scanned_file.name,
+                "size": scanned_file.size,
+                "hash": scanned_file.md5_hash,
+                "hash_algorithm": scanned_file.hash_algorithm,
+                "chunks": [
+                    {"digest": chunk.digest, "size": chunk.size} for chunk in chunks
+                ],
+            },
+        )
+
+    def upload(self, scanned_file: ScannedFile) -> requests.Response:
+        """
+        Send the chunks new to the receiver and the manifest of the file, return the last response of the receiver.
+        Connection errors and files, which could not be read, raise `OSError`.
+        """
+        chunks = self._get_chunks(scanned_file)
+        unique_chunks = {chunk.digest: chunk for chunk in chunks}
+        known = self._get_known_digests(set(unique_chunks))
+        new_chunks = [
+            chunk for digest, chunk in unique_chunks.items() if digest not in known
+        ]
+
+        response = self._send_chunks(scanned_file, new_chunks)
+        if response is not None:
+            return response
+        response = self._send_manifest(scanned_file, chunks)
+
+        if response.status_code == 409:
+            # The receiver does not have some of the chunks indexed as sent, so they are sent again
+            try:
+                missing = set(response.json()["missing"])
+            except (ValueError, KeyError, TypeError):
+                raise OSError(
+                    f"Receiver has not sent the missing chunks of {scanned_file.name}."
+                )
+            missing_chunks = [
+                chunk for digest, chunk in unique_chunks.items() if digest in missing
+            ]
+            new_chunks += missing_chunks
+            response = self._send_chunks(scanned_file, missing_chunks)
+            if response is not None:
+                return response
+            response = self._send_manifest(scanned_file, chunks)
+
+        if response.status_code < 400:
+            ChunkManifest.objects.filter(
+                **self._get_manifest_key(scanned_file)
+            ).delete()
+            scanned_file.chunk_digests = [chunk.digest for chunk in chunks]
+            log.info(
+                "File %s was sent by %s of %s chunks, %s of %s bytes.",
+                scanned_file.name,
+                len(new_chunks),
+                len(chunks),
+                sum(chunk.size for chunk in new_chunks),
+                scanned_file.size,
+            )
+        return response
@@ -0,0 +1,98 @@
+import hashlib
+from typing import BinaryIO, Iterator
+
+try:
+    import pyfastcdc
+except ImportError:
+    pyfastcdc = None
+
+# Random value for every byte, by which the gear hash is rolled. Derived from SHA-256, so it never changes.
+GEAR = [
+    int.from_bytes(hashlib.sha256(bytes([byte])).digest()[:8], "little")
+    for byte in range(256)
+]
+HASH_MASK = (1 << 64) - 1
+# Ranges of the chunk sizes supported by the native chunker of `pyfastcdc`
+FASTCDC_MIN_SIZES = range(64, 1024**2 + 1)
+FASTCDC_AVG_SIZES = range(256, 4 * 1024**2 + 1)
+FASTCDC_MAX_SIZES = range(1024, 16 * 1024**2 + 1)
+
+
+def _cut_mask(avg_size: int) -> int:
+    """
+    Mask of the highest bits of the gear hash, which are all zero once per `avg_size` bytes on average.
+    The lowest bits of the gear hash depend only on the last few bytes, so they are not used.
+    """
+    bits = max(avg_size.bit_length() - 1, 1)
+    return ((1 << bits) - 1) << (64 - bits)
+
+
+def _find_cut(data: bytes, min_size: int, max_size: int, mask: int) -> int:
+    """Return the length of the next chunk at the beginning of the data"""
+    end = min(len(data), max_size)
+    if end <= min_size:
+        return end
+
+    gear = GEAR
+    rolling_hash = 0
+    # Bytes up to the minimal size cannot end the chunk, so they are skipped
+    for position, byte in enumerate(data[min_size:end], start=min_size + 1):
+        rolling_hash = ((rolling_hash << 1) + gear[byte]) & HASH_MASK
+        if not rolling_hash & mask:
+            return position
+    return end
+
+
+def get_chunker(min_size: int, avg_size: int, max_size: int) -> str:
+    """
+    Return the name of the chunker, by which the files are split: the native `fastcdc` if the optional `pyfastcdc`
+    package is installed and supports the sizes, else the `gear` chunker in Python, which is much slower.
+    The chunkers cut the files at different boundaries, so the chunks split by one are not found by the other.
+    """
+    if (
+        pyfastcdc is not None
+        and min_size in FASTCDC_MIN_SIZES
+        and avg_size in FASTCDC_AVG_SIZES
+        and max_size in FASTCDC_MAX_SIZES
+    ):
+        return "fastcdc"
+    return "gear"
+
+
+def _iter_gear_chunks(
+    file: BinaryIO, min_size: int, avg_size: int, max_size: int
+) -> Iterator[bytes]:
+    mask = _cut_mask(avg_size)
+    buffer = b""
+    eof = False
+    while True:
+        # The cut must not depend on how the file is read, so the whole range of the chunk is read first
+        while not eof and len(buffer) < max_size:
+            data = file.read(max_size)
+            eof = not data
+            buffer += data
+        if not buffer:
+            return
+
+        cut = _find_cut(buffer, min_size, max_size, mask)
+        yield buffer[:cut]
+        buffer = buffer[cut:]
+
+
+def iter_chunks(
+    file: BinaryIO, min_size: int, avg_size: int, max_size: int
+) -> Iterator[bytes]:
+    """
+    Split the file to content-defined chunks by the gear rolling hash (as in FastCDC), see `get_chunker`.
+    Chunk boundaries depend only on the content around them, so an insertion or an appended line changes only
+    the chunks around the change, while the other chunks stay the same as in the previous version of the file.
+    At most `2 * max_size` bytes are kept in the memory.
+    """
+    if get_chunker(min_size, avg_size, max_size) == "fastcdc":
+        chunker = pyfastcdc.FastCDC(avg_size, min_size=min_size, max_size=max_size)
+        # The data of a chunk is valid only until the next chunk is cut, so it is copied
+        for chunk in chunker.cut_stream(file):
+            yield bytes(chunk.data)
+        return
+
+    yield from _iter_gear_chunks(file, min_size, avg_size, max_size)
@@ -0,0 +1,230 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
+from file_manager.models import ContentClaim, FileClaim, TransferJob
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.hashing import asample_file_paths, sample_file_paths
+
+log = logging.getLogger(__name__)
+
+
+def _stale_claims(scanned_files: list[ScannedFile]) -> QuerySet:
+    claimed_before = timezone.now() - timedelta(seconds=settings.TRANSFER_CLAIM_TIMEOUT)
+    return FileClaim.objects.filter(
+        file_number__in={scanned_file.file_number for scanned_file in scanned_files},
+        claimed_at__lt=claimed_before,
+    )
+
+
+def _new_claims(job: TransferJob, scanned_files: list[ScannedFile]) -> list[FileClaim]:
+    file_numbers = {scanned_file.file_number for scanned_file in scanned_files}
+    return [FileClaim(file_number=file_number, job=job) for file_number in file_numbers]
+
+
+def _own_claims(job: TransferJob, scanned_files: list[ScannedFile]) -> QuerySet:
+    return FileClaim.objects.filter(
+        job=job,
+        file_number__in={scanned_file.file_number for scanned_file in scanned_files},
+    )
+
+
+def _claimed_files(
+    scanned_files: list[ScannedFile], claimed_file_numbers: set[int]
+) -> list[ScannedFile]:
+    claimed_files = []
+    for scanned_file in scanned_files:
+        if scanned_file.file_number in claimed_file_numbers:
+            claimed_files.append(scanned_file)
+        else:
+            log.info(
+                "File %s is being sent by another job. Skipping...", scanned_file.name
+            )
+    return claimed_files
+
+
+def claim_files(
+    job: TransferJob, scanned_files: list[ScannedFile]
+) -> list[ScannedFile]:
+    """
+    Claim the files for the job and return the claimed ones, the others are being sent by another job.
+    The claims are inserted at once and the conflicting ones are ignored, so exactly one of the jobs
+    claiming a file at the same time wins it. Claims older than `TRANSFER_CLAIM_TIMEOUT` seconds are taken over.
+    The files are claimed by their inodes, so copies of a file under other inodes are not claimed together with it,
+    their content is claimed by `claim_contents`. Only the new files are meant to be claimed, once they were hashed
+    and checked for duplicates, so the rescans of the sent files write no claims.
+    """
+    if not scanned_files:
+        return []
+    _stale_claims(scanned_files).delete()
+    FileClaim.objects.bulk_create(
+        _new_claims(job, scanned_files), ignore_conflicts=True
+    )
+    return _claimed_files(
+        scanned_files,
+        set(_own_claims(job, scanned_files).values_list("file_number", flat=True)),
+    )
+
+
+def get_content_key(scanned_file: ScannedFile) -> str:
+    """
+    Return the key of the content of the file, its size and sample if the files are sampled (see `DEDUP_SAMPLE_SIZE`),
+    otherwise its hash, as every file is hashed then. Copies of the same content always have the same key.
+    Files of another content rarely have the same key too, they are just not sent at the same time then.
+    """
+    if scanned_file.sample_hash is not None:
+        return f"{scanned_file.size}:{scanned_file.sample_hash}"
+    return f"{scanned_file.hash_algorithm}:{scanned_file.md5_hash}"
+
+
+def _unsampled_files(scanned_files: list[ScannedFile]) -> list[ScannedFile]:
+    """Files of the stored hash, which were not sampled, but need the sample for their content key"""
+    if not settings.DEDUP_SAMPLE_SIZE:
+        return []
+    return [
+        scanned_file
+        for scanned_file in scanned_files
+        if scanned_file.sample_hash is None
+    ]
+
+
+def _set_samples(scanned_files: list[ScannedFile], samples: list[str]) -> None:
+    for scanned_file, sample_hash in zip(scanned_files, samples):
+        scanned_file.sample_hash = sample_hash
+        scanned_file.sample_size = settings.DEDUP_SAMPLE_SIZE
+
+
+def _content_keys(scanned_files: list[ScannedFile]) -> set[str]:
+    return {get_content_key(scanned_file) for scanned_file in scanned_files}
+
+
+def _stale_content_claims(content_keys: set[str]) -> QuerySet:
+    claimed_before = timezone.now() - timedelta(seconds=settings.TRANSFER_CLAIM_TIMEOUT)
+    return ContentClaim.objects.filter(
+        content_key__in=content_keys, claimed_at__lt=claimed_before
+    )
+
+
+def _new_content_claims(job: TransferJob, content_keys: set[str]) -> list[ContentClaim]:
+    return [
+        ContentClaim(content_key=content_key, job=job) for content_key in content_keys
+    ]
+
+
+def _own_content_claims(job: TransferJob, content_keys: set[str]) -> QuerySet:
+    return ContentClaim.objects.filter(job=job, content_key__in=content_keys)
+
+
+def _claimed_contents(
+    scanned_files: list[ScannedFile], claimed_keys: set[str]
+) -> list[ScannedFile]:
+    claimed_files = []
+    for scanned_file in scanned_files:
+        if scanned_file.is_duplicate or get_content_key(scanned_file) in claimed_keys:
+            claimed_files.append(scanned_file)
+        else:
+            log.info(
+                "Content of file %s is being sent by another job. Skipping...",
+                scanned_file.name,
+            )
+    return claimed_files
+
+
+def claim_contents(
+    job: TransferJob, scanned_files: list[ScannedFile]
+) -> list[ScannedFile]:
+    """
+    Claim the content of the hashed files, which are not duplicates, and return the files without the ones,
+    whose content is claimed by another job, as a copy of them is being sent (e.g. by another shard).
+    The claims are won like the claims of the files, see `claim_files`.
+    """
+    new_files = [
+        scanned_file for scanned_file in scanned_files if not scanned_file.is_duplicate
+    ]
+    if not new_files:
+        return scanned_files
+    unsampled_files = _unsampled_files(new_files)
+    _set_samples(
+        unsampled_files,
+        sample_file_paths([scanned_file.path for scanned_file in unsampled_files]),
+    )
+    content_keys = _content_keys(new_files)
+    _stale_content_claims(content_keys).delete()
+    ContentClaim.objects.bulk_create(
+        _new_content_claims(job, content_keys), ignore_conflicts=True
+    )
+    return _claimed_contents(
+        scanned_files,
+        set(
+            _own_content_claims(job, content_keys).values_list("content_key", flat=True)
+        ),
+    )
+
+
+def release_files(job: TransferJob, scanned_files: list[ScannedFile]) -> None:
+    """Release the claims of the files and of their content, once they were sent (and stored) or have failed"""
+    if scanned_files:
+        _own_claims(job, scanned_files).delete()
+        _own_content_claims(job, _content_keys(scanned_files)).delete()
+
+
+async def aclaim_files(
+    job: TransferJob, scanned_files: list[ScannedFile]
+) -> list[ScannedFile]:
+    """Asynchronous variant of `claim_files`"""
+    if not scanned_files:
+        return []
+    await _stale_claims(scanned_files).adelete()
+    await FileClaim.objects.abulk_create(
+        _new_claims(job, scanned_files), ignore_conflicts=True
+    )
+    return _claimed_files(
+        scanned_files,
+        {
+            file_number
+            async for file_number in _own_claims(job, scanned_files).values_list(
+                "file_number", flat=True
+            )
+        },
+    )
+
+
+async def aclaim_contents(
+    job: TransferJob, scanned_files: list[ScannedFile]
+) -> list[ScannedFile]:
+    """Asynchronous variant of `claim_contents`"""
+    new_files = [
+        scanned_file for scanned_file in scanned_files if not scanned_file.is_duplicate
+    ]
+    if not new_files:
+        return scanned_files
+    unsampled_files = _unsampled_files(new_files)
+    _set_samples(
+        unsampled_files,
+        await asample_file_paths(
+            [scanned_file.path for scanned_file in unsampled_files]
+        ),
+    )
+    content_keys = _content_keys(new_files)
+    await _stale_content_claims(content_keys).adelete()
+    await ContentClaim.objects.abulk_create(
+        _new_content_claims(job, content_keys), ignore_conflicts=True
+    )
+    return _claimed_contents(
+        scanned_files,
+        {
+            content_key
+            async for content_key in _own_content_claims(job, content_keys).values_list(
+                "content_key", flat=True
+            )
+        },
+    )
+
+
+async def arelease_files(job: TransferJob, scanned_files: list[ScannedFile]) -> None:
+    """Asynchronous variant of `release_files`"""
+    if scanned_files:
+        await _own_claims(job, scanned_files).adelete()
+        await _own_content_claims(job, _content_keys(scanned_files)).adelete()
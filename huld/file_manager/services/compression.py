@@ -0,0 +1,87 @@
+import logging
+import os
+import zlib
+
+import requests
+import zstandard
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+# Leading bytes of the formats, which are compressed already
+COMPRESSED_MAGIC_BYTES = (
+    b"\x1f\x8b",  # gzip
+    b"\x28\xb5\x2f\xfd",  # zstd
+    b"PK\x03\x04",  # zip, docx, xlsx, jar, ...
+    b"BZh",  # bzip2
+    b"\xfd7zXZ\x00",  # xz
+    b"7z\xbc\xaf\x27\x1c",  # 7z
+    b"\x89PNG",
+    b"\xff\xd8\xff",  # jpeg
+    b"GIF8",
+    b"RIFF",  # webp, avi, wav
+    b"%PDF",
+)
+# Number of the leading bytes needed to recognize the compressed formats
+MAGIC_BYTES_LENGTH = max(len(magic) for magic in COMPRESSED_MAGIC_BYTES)
+# Header of the response to `OPTIONS`, by which the receiver lists the codecs it decodes the parts of the multipart
+# body by. `Accept-Encoding` is not used, as it advertises the codings of the whole request body (RFC 7694).
+PART_ENCODING_HEADER = "X-Accept-Part-Encoding"
+
+
+class Compressor:
+    """Streaming compressor of one file by the codec (`gzip` or `zstd`), level 0 or None means the default of the codec"""
+
+    def __init__(self, codec: str, level: int | None = None) -> None:
+        self.codec = codec
+        if codec == "gzip":
+            # The gzip container is written with the window bits increased by 16
+            self._compressor = zlib.compressobj(
+                level or zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+        elif codec == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level or 3).compressobj()
+        else:
+            raise ValueError(f"Unknown compression codec: {codec}")
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+def is_compressible(file_name: str, head: bytes) -> bool:
+    """Whether it is worth to compress the file, judged by its extension and its leading bytes"""
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension in settings.UPLOAD_COMPRESSION_SKIP_EXTENSIONS:
+        return False
+    return not head.startswith(COMPRESSED_MAGIC_BYTES)
+
+
+def choose_codec(accept_part_encoding: str) -> str | None:
+    """
+    Choose the first of the `UPLOAD_COMPRESSION` codecs, which the receiver accepts.
+    The receiver advertises the codings of the parts it accepts by the `X-Accept-Part-Encoding` header.
+    """
+    accepted = {
+        coding.split(";")[0].strip().lower()
+        for coding in accept_part_encoding.split(",")
+    }
+    for codec in settings.UPLOAD_COMPRESSION:
+        if codec in accepted:
+            return codec
+    return None
+
+
+def negotiate_codec(session: requests.Session, url: str) -> str | None:
+    """Ask the receiver by an `OPTIONS` request, which codec the files shall be compressed by, if any"""
+    if not settings.UPLOAD_COMPRESSION:
+        return None
+
+    try:
+        response = session.options(url)
+    except OSError as e:
+        log.warning("Compression could not be negotiated: %s", str(e))
+        return None
+    return choose_codec(response.headers.get(PART_ENCODING_HEADER, ""))
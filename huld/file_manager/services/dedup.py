@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Q, QuerySet
+from file_manager.models import File
+from file_manager.services.hashing import HASHERS, hash_file_path
+from file_manager.services.known_hashes import get_known_hashes
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class ScannedFile:
+    """File found in the scanned folder, which is a candidate to be sent"""
+
+    name: str
+    path: str
+    stat_result: os.stat_result
+    md5_hash: str = ""
+    hash_algorithm: str = "md5"
+    # Hash of the head and the tail of the file, see `DEDUP_SAMPLE_SIZE`
+    sample_hash: str | None = None
+    sample_size: int | None = None
+    # Hash of the content computed while the file was being sent, if it was not hashed before, see `MultipartEncoder`
+    streamed_hash: str | None = None
+    is_duplicate: bool = False
+    compressed_size: int | None = None
+    # Number of the requests made to send the file
+    attempts: int = 0
+    # Digests of the content-defined chunks, if the file was sent by chunks
+    chunk_digests: list[str] | None = None
+
+    @property
+    def file_number(self) -> int:
+        return self.stat_result.st_ino
+
+    @property
+    def size(self) -> int:
+        return self.stat_result.st_size
+
+    def to_model(self) -> File:
+        return File(
+            name=self.name,
+            path=self.path,
+            md5_hash=self.md5_hash,
+            hash_algorithm=self.hash_algorithm,
+            sample_hash=self.sample_hash,
+            sample_size=self.sample_size,
+            file_number=self.file_number,
+            size=self.size,
+            compressed_size=self.compressed_size,
+        )
+
+
+def _hashed_files(
+    scanned_files: list[ScannedFile], file_hashes: list[tuple[str, str]]
+) -> list[ScannedFile]:
+    file_hashes = set(file_hashes)
+    return [
+        scanned_file
+        for scanned_file in scanned_files
+        if (scanned_file.hash_algorithm, scanned_file.md5_hash) in file_hashes
+    ]
+
+
+def _known_hashes(scanned_files: list[ScannedFile]) -> QuerySet:
+    """Return the hashes of the sent files, which are equal to the hashes of the scanned files"""
+    return File.objects.filter(
+        hash_algorithm__in={
+            scanned_file.hash_algorithm for scanned_file in scanned_files
+        },
+        md5_hash__in={
+            scanned_file.md5_hash
+            for scanned_file in scanned_files
+            if scanned_file.md5_hash
+        },
+    ).values_list("hash_algorithm", "md5_hash", "size")
+
+
+def _legacy_algorithms() -> QuerySet:
+    return (
+        File.objects.exclude(hash_algorithm=settings.HASH_ALGORITHM)
+        .order_by()
+        .values("hash_algorithm")
+        .annotate(unsized=Count("id", filter=Q(size__isnull=True)))
+        .values_list("hash_algorithm", "unsized")
+    )
+
+
+def get_legacy_algorithms() -> dict[str, bool]:
+    """
+    Return the algorithms other than `HASH_ALGORITHM`, by which the sent files were hashed, each with whether
+    any of its files is of an unknown size. Meant to be looked up once per transfer, see `mark_duplicates`.
+    """
+    return {algorithm: bool(unsized) for algorithm, unsized in _legacy_algorithms()}
+
+
+async def aget_legacy_algorithms() -> dict[str, bool]:
+    """Asynchronous variant of `get_legacy_algorithms`"""
+    return {
+        algorithm: bool(unsized) async for algorithm, unsized in _legacy_algorithms()
+    }
+
+
+def _known_file_numbers(scanned_files: list[ScannedFile]) -> QuerySet:
+    return File.objects.filter(
+        file_number__in={scanned_file.file_number for scanned_file in scanned_files}
+    ).values_list("file_number", flat=True)
+
+
+def _mark_duplicates(
+    scanned_files: list[ScannedFile],
+    known_hashes: set[tuple[str, str]],
+    known_file_numbers: set[int],
+) -> None:
+    for scanned_file in scanned_files:
+        # Files without the hash were ruled out by their sample as new already
+        file_hash = (scanned_file.hash_algorithm, scanned_file.md5_hash)
+        scanned_file.is_duplicate = (
+            bool(scanned_file.md5_hash) and file_hash in known_hashes
+        ) or scanned_file.file_number in known_file_numbers
+        if scanned_file.md5_hash:
+            known_hashes.add(file_hash)
+        known_file_numbers.add(scanned_file.file_number)
+
+
+def _sent_files(scanned_files: list[ScannedFile]) -> QuerySet:
+    return File.objects.filter(
+        Q(file_number__in={scanned_file.file_number for scanned_file in scanned_files})
+        | Q(
+            hash_algorithm__in={
+                scanned_file.hash_algorithm for scanned_file in scanned_files
+            },
+            md5_hash__in={
+                scanned_file.md5_hash
+                for scanned_file in scanned_files
+                if scanned_file.md5_hash
+            },
+        )
+    ).values_list("file_number", "hash_algorithm", "md5_hash")
+
+
+def _mark_sent_files(
+    scanned_files: list[ScannedFile], sent_files: list[tuple[int, str, str]]
+) -> None:
+    sent_file_numbers = {file_number for file_number, _, _ in sent_files}
+    sent_hashes = {(algorithm, file_hash) for _, algorithm, file_hash in sent_files}
+    for scanned_file in scanned_files:
+        if scanned_file.file_number in sent_file_numbers or (
+            scanned_file.md5_hash
+            and (scanned_file.hash_algorithm, scanned_file.md5_hash) in sent_hashes
+        ):
+            scanned_file.is_duplicate = True
+
+
+def mark_sent_files(scanned_files: list[ScannedFile]) -> None:
+    """
+    Mark the files, which were stored since they were checked by `mark_duplicates`, by one query of the DB
+    (not of the cache, which may not know them yet). Meant to check the files once more after they were claimed,
+    as another job may have sent them and released them meanwhile.
+    """
+    if scanned_files:
+        _mark_sent_files(scanned_files, list(_sent_files(scanned_files)))
+
+
+async def amark_sent_files(scanned_files: list[ScannedFile]) -> None:
+    """Asynchronous variant of `mark_sent_files`"""
+    if scanned_files:
+        _mark_sent_files(
+            scanned_files, [sent_file async for sent_file in _sent_files(scanned_files)]
+        )
+
+
+def _legacy_sizes(
+    scanned_files: list[ScannedFile], legacy_algorithms: dict[str, bool]
+) -> QuerySet:
+    """Return the algorithms with the sizes of their sent files, which are equal to the sizes of the scanned files"""
+    return (
+        File.objects.filter(
+            hash_algorithm__in=legacy_algorithms,
+            size__in={scanned_file.size for scanned_file in scanned_files},
+        )
+        .order_by()
+        .values_list("hash_algorithm", "size")
+        .distinct()
+    )
+
+
+def _unsent_files(scanned_files: list[ScannedFile]) -> list[ScannedFile]:
+    # Files without the hash were ruled out by their sample as new already
+    return [
+        scanned_file
+        for scanned_file in scanned_files
+        if scanned_file.md5_hash and not scanned_file.is_duplicate
+    ]
+
+
+def _hash_by_legacy_algorithms(
+    scanned_files: list[ScannedFile],
+    legacy_algorithms: dict[str, bool],
+    legacy_sizes: set[tuple[str, int]],
+) -> list[tuple[ScannedFile, str, str]]:
+    """
+    Hash the files by the algorithms of the sent files, which may be equal to them: of the same size, or of any size
+    if the algorithm has files of an unknown size. Return the files with the algorithms and the hashes.
+    """
+    legacy_hashes = []
+    for scanned_file in scanned_files:
+        for algorithm, unsized in sorted(legacy_algorithms.items()):
+            if algorithm not in HASHERS or (
+                not unsized and (algorithm, scanned_file.size) not in legacy_sizes
+            ):
+                continue
+            try:
+                file_hash = hash_file_path(
+                    scanned_file.path, settings.HASH_CHUNK_SIZE, algorithm
+                )
+            except OSError as e:
+                log.warning("File %s could not be read: %s", scanned_file.name, e)
+                break
+            legacy_hashes.append((scanned_file, algorithm, file_hash))
+    return legacy_hashes
+
+
+def _sent_legacy_hashes(legacy_hashes: list[tuple[ScannedFile, str, str]]) -> QuerySet:
+    hashes_by_algorithm: dict[str, set[str]] = {}
+    for _, algorithm, file_hash in legacy_hashes:
+        hashes_by_algorithm.setdefault(algorithm, set()).add(file_hash)
+    query = Q()
+    for algorithm, file_hashes in hashes_by_algorithm.items():
+        query |= Q(hash_algorithm=algorithm, md5_hash__in=file_hashes)
+    return File.objects.filter(query).values_list("hash_algorithm", "md5_hash")
+
+
+def _mark_legacy_duplicates(
+    legacy_hashes: list[tuple[ScannedFile, str, str]],
+    sent_hashes: set[tuple[str, str]],
+) -> None:
+    for scanned_file, algorithm, file_hash in legacy_hashes:
+        if (algorithm, file_hash) in sent_hashes:
+            scanned_file.is_duplicate = True
+
+
+def _lookup_cached(
+    scanned_files: list[ScannedFile],
+) -> tuple[list[tuple[str, str, int]], list[ScannedFile]]:
+    """Return the hashes known to be sent by the cache and the files, which have to be looked up in the DB"""
+    cached_hashes, lookup_hashes = get_known_hashes().lookup(
+        [
+            (scanned_file.hash_algorithm, scanned_file.md5_hash)
+            for scanned_file in scanned_files
+            if scanned_file.md5_hash
+        ]
+    )
+    return cached_hashes, _hashed_files(scanned_files, lookup_hashes)
+
+
+def mark_duplicates(
+    scanned_files: list[ScannedFile], legacy_algorithms: dict[str, bool] | None = None
+) -> None:
+    """
+    Mark files, which were already sent once or which are duplicates of another file in the same batch.
+    The whole batch is resolved by two set-based queries instead of one query per file.
+    The hashes are checked by the in-process `KnownHashes` cache first, so the new files are mostly not looked up.
+    Files sent before `HASH_ALGORITHM` was changed are recognized as well: the new files, which may be equal to them
+    (see `_hash_by_legacy_algorithms`), are hashed once more by their algorithm and looked up by two more queries.
+    The `legacy_algorithms` are looked up by `get_legacy_algorithms`, unless given.
+    """
+    known_hashes, lookup_files = [], scanned_files
+    if get_known_hashes().refresh():
+        known_hashes, lookup_files = _lookup_cached(scanned_files)
+    if lookup_files:
+        found_hashes = list(_known_hashes(lookup_files))
+        get_known_hashes().confirm(found_hashes)
+        known_hashes += found_hashes
+
+    _mark_duplicates(
+        scanned_files,
+        {(algorithm, file_hash) for algorithm, file_hash, _ in known_hashes},
+        set(_known_file_numbers(scanned_files)),
+    )
+
+    if legacy_algorithms is None:
+        legacy_algorithms = get_legacy_algorithms()
+    unsent_files = _unsent_files(scanned_files)
+    if not legacy_algorithms or not unsent_files:
+        return
+    legacy_sizes = set()
+    if not all(legacy_algorithms.values()):
+        legacy_sizes = set(_legacy_sizes(unsent_files, legacy_algorithms))
+    legacy_hashes = _hash_by_legacy_algorithms(
+        unsent_files, legacy_algorithms, legacy_sizes
+    )
+    if legacy_hashes:
+        _mark_legacy_duplicates(legacy_hashes, set(_sent_legacy_hashes(legacy_hashes)))
+
+
+async def amark_duplicates(
+    scanned_files: list[ScannedFile], legacy_algorithms: dict[str, bool] | None = None
+) -> None:
+    """Asynchronous variant of `mark_duplicates`"""
+    known_hashes, lookup_files = [], scanned_files
+    if await sync_to_async(get_known_hashes().refresh)():
+        known_hashes, lookup_files = _lookup_cached(scanned_files)
+    if lookup_files:
+        found_hashes = [known_hash async for known_hash in _known_hashes(lookup_files)]
+        get_known_hashes().confirm(found_hashes)
+        known_hashes += found_hashes
+
+    _mark_duplicates(
+        scanned_files,
+        {(algorithm, file_hash) for algorithm, file_hash, _ in known_hashes},
+        {file_number async for file_number in _known_file_numbers(scanned_files)},
+    )
+
+    if legacy_algorithms is None:
+        legacy_algorithms = await aget_legacy_algorithms()
+    unsent_files = _unsent_files(scanned_files)
+    if not legacy_algorithms or not unsent_files:
+        return
+    legacy_sizes = set()
+    if not all(legacy_algorithms.values()):
+        legacy_sizes = {
+            legacy_size
+            async for legacy_size in _legacy_sizes(unsent_files, legacy_algorithms)
+        }
+    legacy_hashes = await asyncio.to_thread(
+        _hash_by_legacy_algorithms, unsent_files, legacy_algorithms, legacy_sizes
+    )
+    if legacy_hashes:
+        _mark_legacy_duplicates(
+            legacy_hashes,
+            {sent_hash async for sent_hash in _sent_legacy_hashes(legacy_hashes)},
+        )
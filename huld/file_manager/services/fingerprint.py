@@ -0,0 +1,249 @@
+import os
+from collections import Counter
+from typing import Iterable
+
+from django.conf import settings
+from django.db.models import Case, F, Q, QuerySet, When
+from file_manager.models import File, Fingerprint
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.hashing import (
+    ahash_file_paths, asample_file_paths, hash_file_paths, sample_file_paths
+)
+from file_manager.services.metrics import BYTES_HASHED
+
+
+def _to_fingerprint(
+    stat_result: os.stat_result, file_hash: str, hash_algorithm: str
+) -> Fingerprint:
+    return Fingerprint(
+        device=stat_result.st_dev,
+        file_number=stat_result.st_ino,
+        size=stat_result.st_size,
+        modified_ns=stat_result.st_mtime_ns,
+        md5_hash=file_hash,
+        hash_algorithm=hash_algorithm,
+    )
+
+
+def _stored_fingerprints(scanned_files: list[ScannedFile]) -> QuerySet:
+    return Fingerprint.objects.filter(
+        file_number__in={scanned_file.file_number for scanned_file in scanned_files}
+    )
+
+
+def _use_stored_fingerprints(
+    scanned_files: list[ScannedFile], stored_fingerprints: Iterable[Fingerprint]
+) -> list[ScannedFile]:
+    """
+    Fill in the stored hashes of the unchanged files and return the files, which have to be hashed.
+    Hashes stored by another algorithm than `HASH_ALGORITHM` are not used, so such files are hashed again.
+    """
+    hash_algorithm = settings.HASH_ALGORITHM
+    fingerprints = {
+        (fingerprint.device, fingerprint.file_number): fingerprint
+        for fingerprint in stored_fingerprints
+    }
+
+    changed_files = []
+    for scanned_file in scanned_files:
+        stat_result = scanned_file.stat_result
+        fingerprint = fingerprints.get((stat_result.st_dev, stat_result.st_ino))
+        scanned_file.hash_algorithm = hash_algorithm
+        if fingerprint is not None and fingerprint.matches(stat_result, hash_algorithm):
+            scanned_file.md5_hash = fingerprint.md5_hash
+        else:
+            changed_files.append(scanned_file)
+    return changed_files
+
+
+def _new_fingerprints(changed_files: list[ScannedFile]) -> list[Fingerprint]:
+    fingerprints = {
+        (scanned_file.stat_result.st_dev, scanned_file.file_number): _to_fingerprint(
+            scanned_file.stat_result, scanned_file.md5_hash, scanned_file.hash_algorithm
+        )
+        for scanned_file in changed_files
+    }
+    return list(fingerprints.values())
+
+
+UPSERT_FINGERPRINTS = {
+    "update_conflicts": True,
+    "unique_fields": ["device", "file_number"],
+    "update_fields": ["size", "modified_ns", "md5_hash", "hash_algorithm"],
+}
+
+
+def store_fingerprint(
+    stat_result: os.stat_result, file_hash: str, hash_algorithm: str
+) -> None:
+    """Store the hash of the file computed elsewhere, e.g. while it was uploaded, so it is not read again"""
+    Fingerprint.objects.bulk_create(
+        [_to_fingerprint(stat_result, file_hash, hash_algorithm)],
+        **UPSERT_FINGERPRINTS,
+    )
+
+
+def _stored_samples(changed_files: list[ScannedFile]) -> QuerySet:
+    """
+    Samples of the sent files of the same sizes as the changed files, None for the files sent before sampling
+    and for the files sampled by another `DEDUP_SAMPLE_SIZE`, as their samples cannot be compared.
+    """
+    sample_size = settings.DEDUP_SAMPLE_SIZE
+    sizes = {scanned_file.size for scanned_file in changed_files}
+    return (
+        File.objects.filter(
+            Q(
+                sample_hash__in={
+                    scanned_file.sample_hash for scanned_file in changed_files
+                },
+                sample_size=sample_size,
+            )
+            | Q(sample_hash__isnull=True)
+            | ~Q(sample_size=sample_size),
+            size__in=sizes,
+        )
+        .annotate(
+            comparable_sample=Case(
+                When(sample_size=sample_size, then=F("sample_hash")), default=None
+            )
+        )
+        .values_list("size", "comparable_sample")
+    )
+
+
+def _unsized_files() -> QuerySet:
+    """Files sent before their size was stored, whose size could not be filled in, may be equal to any file"""
+    return File.objects.filter(size__isnull=True)
+
+
+def _select_colliding_files(
+    scanned_files: list[ScannedFile],
+    changed_files: list[ScannedFile],
+    stored_samples: Iterable[tuple[int, str | None]],
+) -> list[ScannedFile]:
+    """
+    Return the changed files, which may be duplicates, as their size and sample equal to a sent file
+    or to another file of the batch. Files with the stored hash were not sampled, so their size is enough.
+    A sent file without a comparable sample (None) collides with every file of its size.
+    """
+    samples = Counter(
+        (scanned_file.size, scanned_file.sample_hash) for scanned_file in changed_files
+    )
+    stored_samples = set(stored_samples)
+    hashed_sizes = {
+        scanned_file.size for scanned_file in scanned_files if scanned_file.md5_hash
+    }
+    return [
+        scanned_file
+        for scanned_file in changed_files
+        if samples[scanned_file.size, scanned_file.sample_hash] > 1
+        or (scanned_file.size, scanned_file.sample_hash) in stored_samples
+        or (scanned_file.size, None) in stored_samples
+        or scanned_file.size in hashed_sizes
+    ]
+
+
+def _hash_changed_files(
+    changed_files: list[ScannedFile], hashes: list[str]
+) -> list[Fingerprint]:
+    for scanned_file, file_hash in zip(changed_files, hashes):
+        scanned_file.md5_hash = file_hash
+        BYTES_HASHED.inc(scanned_file.size)
+    return _new_fingerprints(changed_files)
+
+
+def hash_scanned_files(scanned_files: list[ScannedFile]) -> int:
+    """
+    Fill in the hash of every scanned file, which may be a duplicate, and return the number of files, which were read.
+    Stored fingerprints of the whole batch are fetched by one query and only the changed or new files are read.
+    The changed files are sampled first (see `DEDUP_SAMPLE_SIZE`), only the files, whose size and sample collide
+    with another file, are hashed. The other files are new for sure, they are hashed by `hash_unhashed_files` once
+    they are sent, so most of the new files are read only once. While there are sent files of an unknown size,
+    all the changed files are hashed.
+    The files are hashed in parallel by the pool of `HASH_WORKERS` workers.
+    """
+    changed_files = _use_stored_fingerprints(
+        scanned_files, _stored_fingerprints(scanned_files)
+    )
+    if settings.DEDUP_SAMPLE_SIZE and changed_files:
+        samples = sample_file_paths(
+            [scanned_file.path for scanned_file in changed_files]
+        )
+        for scanned_file, sample_hash in zip(changed_files, samples):
+            scanned_file.sample_hash = sample_hash
+            scanned_file.sample_size = settings.DEDUP_SAMPLE_SIZE
+        if not _unsized_files().exists():
+            changed_files = _select_colliding_files(
+                scanned_files, changed_files, _stored_samples(changed_files)
+            )
+
+    hashes = hash_file_paths([scanned_file.path for scanned_file in changed_files])
+    if changed_files:
+        Fingerprint.objects.bulk_create(
+            _hash_changed_files(changed_files, hashes), **UPSERT_FINGERPRINTS
+        )
+    return len(changed_files)
+
+
+async def ahash_scanned_files(scanned_files: list[ScannedFile]) -> int:
+    """
+    Asynchronous variant of `hash_scanned_files`.
+    The changed files are hashed concurrently in the hashing pool, while the event loop keeps running.
+    """
+    changed_files = _use_stored_fingerprints(
+        scanned_files,
+        [fingerprint async for fingerprint in _stored_fingerprints(scanned_files)],
+    )
+    if settings.DEDUP_SAMPLE_SIZE and changed_files:
+        samples = await asample_file_paths(
+            [scanned_file.path for scanned_file in changed_files]
+        )
+        for scanned_file, sample_hash in zip(changed_files, samples):
+            scanned_file.sample_hash = sample_hash
+            scanned_file.sample_size = settings.DEDUP_SAMPLE_SIZE
+        if not await _unsized_files().aexists():
+            changed_files = _select_colliding_files(
+                scanned_files,
+                changed_files,
+                [sample async for sample in _stored_samples(changed_files)],
+            )
+
+    hashes = await ahash_file_paths(
+        [scanned_file.path for scanned_file in changed_files]
+    )
+    if changed_files:
+        await Fingerprint.objects.abulk_create(
+            _hash_changed_files(changed_files, hashes), **UPSERT_FINGERPRINTS
+        )
+    return len(changed_files)
+
+
+def hash_unhashed_files(scanned_files: list[ScannedFile]) -> int:
+    """
+    Fill in the hash of the files, which were not hashed before being sent, as their sample was unique,
+    and return their number. The hash computed while the file was sent is used if there is one (see
+    `MultipartEncoder`), only the other files are read again, likely from the page cache.
+    """
+    unhashed_files = [
+        scanned_file for scanned_file in scanned_files if not scanned_file.md5_hash
+    ]
+    if not unhashed_files:
+        return 0
+
+    unread_files = [
+        scanned_file
+        for scanned_file in unhashed_files
+        if scanned_file.streamed_hash is None
+    ]
+    hashes = iter(hash_file_paths([scanned_file.path for scanned_file in unread_files]))
+    Fingerprint.objects.bulk_create(
+        _hash_changed_files(
+            unhashed_files,
+            [
+                scanned_file.streamed_hash or next(hashes)
+                for scanned_file in unhashed_files
+            ],
+        ),
+        **UPSERT_FINGERPRINTS,
+    )
+    return len(unhashed_files)
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import os
+import threading
+from concurrent import futures
+from functools import partial
+from typing import BinaryIO, Callable
+
+from django.conf import settings
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Hash algorithms, by which the files can be hashed, the ones of the optional packages only if they are installed
+HASHERS: dict[str, Callable] = {
+    "md5": hashlib.md5,
+    "sha256": hashlib.sha256,
+    "blake2b": partial(hashlib.blake2b, digest_size=32),
+}
+if blake3 is not None:
+    HASHERS["blake3"] = blake3.blake3
+if xxhash is not None:
+    # 128 bits, so the collisions of the distinct files stay as unlikely as by md5
+    HASHERS["xxh3"] = xxhash.xxh3_128
+
+
+def get_hasher(algorithm: str | None = None):
+    """Return a new hash object of the algorithm (`HASH_ALGORITHM` by default)"""
+    algorithm = algorithm or settings.HASH_ALGORITHM
+    try:
+        return HASHERS[algorithm]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown hash algorithm or its package is not installed: {algorithm}"
+        )
+
+
+def hash_file(
+    file: BinaryIO, chunk_size: int | None = None, algorithm: str | None = None
+) -> str:
+    """
+    Compute the hex digest of an opened binary file by the algorithm (`HASH_ALGORITHM` by default).
+    The file is read from its beginning in fixed-size chunks into one reusable buffer,
+    so the memory usage stays constant no matter how big the file is.
+    The file position is rewound afterwards, so the same handle can be sent right away.
+    """
+    chunk_size = chunk_size or settings.HASH_CHUNK_SIZE
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    file_hash = get_hasher(algorithm)
+
+    file.seek(0)
+    while read_bytes := file.readinto(buffer):
+        file_hash.update(view[:read_bytes])
+    file.seek(0)
+    return file_hash.hexdigest()
+
+
+def hash_file_path(
+    file_path: str, chunk_size: int, algorithm: str | None = None
+) -> str:
+    with open(file_path, "rb") as file:
+        return hash_file(file, chunk_size=chunk_size, algorithm=algorithm)
+
+
+def sample_file_path(file_path: str, sample_size: int) -> str:
+    """
+    Return the hash of the first and the last `sample_size` bytes of the file.
+    Files of the same size with different samples cannot be equal, so such a file needs no full hash to be
+    recognized as a new one. Only two small reads are needed no matter how big the file is.
+    """
+    with open(file_path, "rb") as file:
+        head = file.read(sample_size)
+        end = file.seek(0, os.SEEK_END)
+        file.seek(max(end - sample_size, len(head)))
+        tail = file.read()
+    return hashlib.blake2b(head + tail, digest_size=16).hexdigest()
+
+
+def sample_file_paths(file_paths: list[str]) -> list[str]:
+    """Sample the files by `DEDUP_SAMPLE_SIZE` bytes in the hashing pool, keeping the order of the given paths"""
+    sample_path = partial(sample_file_path, sample_size=settings.DEDUP_SAMPLE_SIZE)
+    if len(file_paths) <= 1:
+        return [sample_path(file_path) for file_path in file_paths]
+    return list(get_hash_executor().map(sample_path, file_paths))
+
+
+async def asample_file_paths(file_paths: list[str]) -> list[str]:
+    """Asynchronous variant of `sample_file_paths`"""
+    loop = asyncio.get_running_loop()
+    executor = get_hash_executor()
+    sample_path = partial(sample_file_path, sample_size=settings.DEDUP_SAMPLE_SIZE)
+    return await asyncio.gather(
+        *(
+            loop.run_in_executor(executor, sample_path, file_path)
+            for file_path in file_paths
+        )
+    )
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def create_hash_executor(workers: int, pool: str = "thread") -> futures.Executor:
+    if pool == "process":
+        return futures.ProcessPoolExecutor(max_workers=workers)
+    return futures.ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="file-hasher"
+    )
+
+
+def get_hash_executor() -> futures.Executor:
+    """
+    Return the pool shared by the whole process, in which the files are hashed.
+    Threads are enough to use all the cores, as `hashlib` releases the GIL while hashing bigger buffers,
+    processes can be used instead by setting `HASH_POOL` to `process`.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = create_hash_executor(
+                settings.HASH_WORKERS or os.cpu_count() or 1, settings.HASH_POOL
+            )
+        return _executor
+
+
+def hash_file_paths(
+    file_paths: list[str],
+    executor: futures.Executor | None = None,
+    algorithm: str | None = None,
+) -> list[str]:
+    """Hash the files in parallel and return their hashes in the same order as the given paths"""
+    # The algorithm is resolved here, so the workers of a process pool do not depend on the settings
+    hash_path = partial(
+        hash_file_path,
+        chunk_size=settings.HASH_CHUNK_SIZE,
+        algorithm=algorithm or settings.HASH_ALGORITHM,
+    )
+    if len(file_paths) <= 1:
+        return [hash_path(file_path) for file_path in file_paths]
+
+    executor = executor or get_hash_executor()
+    return list(executor.map(hash_path, file_paths))
+
+
+async def ahash_file_paths(
+    file_paths: list[str], algorithm: str | None = None
+) -> list[str]:
+    """Asynchronous variant of `hash_file_paths`"""
+    loop = asyncio.get_running_loop()
+    executor = get_hash_executor()
+    hash_path = partial(
+        hash_file_path,
+        chunk_size=settings.HASH_CHUNK_SIZE,
+        algorithm=algorithm or settings.HASH_ALGORITHM,
+    )
+    return await asyncio.gather(
+        *(
+            loop.run_in_executor(executor, hash_path, file_path)
+            for file_path in file_paths
+        )
+    )
@@ -0,0 +1,156 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.utils import timezone
+from file_manager.models import TransferJob
+from file_manager.services.async_transfer import AsyncTransferService
+from file_manager.services.locking import lock_transaction
+from file_manager.services.metrics import JOB_SECONDS, JOBS
+from file_manager.services.sharding import get_members
+from file_manager.services.transfer import PROGRESS_FIELDS, TransferService
+
+log = logging.getLogger(__name__)
+
+
+def get_transfer_lock_name() -> str:
+    """Name of the advisory lock of the transfers of the folder started by the API"""
+    return f"transfer:{settings.FILES_FOLDER_PATH}"
+
+
+def _has_shards() -> Exists:
+    return Exists(TransferJob.objects.filter(parent=OuterRef("pk")))
+
+
+def queue_job() -> tuple[TransferJob, bool]:
+    """
+    Queue a transfer of the folder and return the job together with whether it was created.
+    A job queued already and not started yet (e.g. by a double-click) would transfer the same files,
+    so it is returned instead. Concurrent requests are serialized by an advisory lock.
+    If `TRANSFER_SHARDING` is set, the job is split to a shard for every running worker.
+    """
+    with transaction.atomic():
+        lock_transaction(get_transfer_lock_name())
+        job = (
+            TransferJob.objects.filter(
+                status=TransferJob.Status.QUEUED, parent__isnull=True
+            )
+            .order_by("created_at", "id")
+            .first()
+        )
+        if job is not None:
+            return job, False
+
+        job = TransferJob.objects.create()
+        if settings.TRANSFER_SHARDING:
+            TransferJob.objects.bulk_create(
+                TransferJob(parent=job, worker=name) for name in get_members()
+            )
+        return job, True
+
+
+def claim_next_job(worker_name: str | None = None) -> TransferJob | None:
+    """
+    Take the oldest queued job and mark it as running.
+    Locked jobs are skipped, so several workers never process the same job.
+    Jobs split to shards are not taken, only their shards are. If the name of the worker is given,
+    only the shards assigned to it or to the workers, which have left, are taken.
+    """
+    jobs = TransferJob.objects.filter(status=TransferJob.Status.QUEUED).exclude(
+        _has_shards()
+    )
+    if worker_name is not None:
+        jobs = jobs.filter(
+            Q(worker="") | Q(worker=worker_name) | ~Q(worker__in=get_members())
+        )
+
+    with transaction.atomic():
+        job = (
+            jobs.select_for_update(skip_locked=True)
+            .order_by("created_at", "id")
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = TransferJob.Status.RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "started_at"])
+        if job.parent_id is not None:
+            TransferJob.objects.filter(
+                pk=job.parent_id, status=TransferJob.Status.QUEUED
+            ).update(status=TransferJob.Status.RUNNING, started_at=job.started_at)
+        return job
+
+
+def _finish_parent(parent_id: int) -> None:
+    """Sum up the progress of the shards into the transfer they are part of, finish it with the last shard"""
+    with transaction.atomic():
+        parent = TransferJob.objects.select_for_update().get(pk=parent_id)
+        shards = TransferJob.objects.filter(parent_id=parent_id)
+        for field, total in shards.aggregate(
+            *(Sum(field) for field in PROGRESS_FIELDS)
+        ).items():
+            setattr(parent, field.removesuffix("__sum"), total or 0)
+
+        unfinished = shards.filter(
+            status__in=[TransferJob.Status.QUEUED, TransferJob.Status.RUNNING]
+        )
+        if not unfinished.exists():
+            failed = shards.filter(status=TransferJob.Status.FAILED)
+            _finish_job(
+                parent,
+                not failed.exists(),
+                "\n".join(failed.exclude(error="").values_list("error", flat=True)),
+            )
+        parent.save()
+
+
+def _finish_job(job: TransferJob, succeeded: bool, error: str = "") -> None:
+    job.status = (
+        TransferJob.Status.SUCCEEDED if succeeded else TransferJob.Status.FAILED
+    )
+    job.error = error
+    job.finished_at = timezone.now()
+
+
+def _observe_job(job: TransferJob) -> None:
+    JOBS.inc(status=job.status)
+    if job.started_at is not None:
+        JOB_SECONDS.observe((job.finished_at - job.started_at).total_seconds())
+
+
+def run_job(job: TransferJob, file_paths: list[str] | None = None) -> TransferJob:
+    """
+    Transfer the files and record the result in the job, which is expected to be running already.
+    Only the given `file_paths` are transferred if set, otherwise the whole folder is scanned.
+    """
+    log.info("Transfer job %s has started.", job.pk)
+    try:
+        _finish_job(job, TransferService(job, file_paths).run())
+    except Exception as e:
+        _finish_job(job, False, str(e))
+        raise
+    finally:
+        job.save()
+        log.info("Transfer job %s has finished with status %s.", job.pk, job.status)
+        _observe_job(job)
+        if job.parent_id is not None:
+            _finish_parent(job.parent_id)
+    return job
+
+
+async def arun_job(job: TransferJob) -> TransferJob:
+    """Asynchronous variant of `run_job`, which transfers the files by the `AsyncTransferService`"""
+    log.info("Transfer job %s has started.", job.pk)
+    try:
+        _finish_job(job, await AsyncTransferService(job).arun())
+    except Exception as e:
+        _finish_job(job, False, str(e))
+        raise
+    finally:
+        await job.asave()
+        log.info("Transfer job %s has finished with status %s.", job.pk, job.status)
+        _observe_job(job)
+    return job
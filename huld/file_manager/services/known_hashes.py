@@ -0,0 +1,231 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Iterable
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from file_manager.models import File
+
+log = logging.getLogger(__name__)
+
+# Hash algorithm, hash and size of a sent file
+KnownHash = tuple[str, str, int | None]
+# Hash algorithm and hash of a scanned file
+FileHash = tuple[str, str]
+# First and last missing id and the time, when they were found missing
+Gap = tuple[int, int, float]
+# Maximal number of the gaps read again, a transaction in flight holds one of the recently allocated ids
+MAX_GAPS = 100
+
+
+class BloomFilter:
+    """
+    Set of keys, which never answers falsely that a key is missing, but which answers falsely that a key is present
+    for `error_rate` of the missing keys, once `capacity` keys were added. Takes about 10 bits per key for 1 %.
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.size = max(
+            64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # The positions are derived from two halves of one digest (Kirsch-Mitzenmacher)
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return (
+            (first + index * second) % self.size for index in range(self.hash_count)
+        )
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+def _to_key(hash_algorithm: str, file_hash: str) -> str:
+    return f"{hash_algorithm}:{file_hash}"
+
+
+class KnownHashes:
+    """
+    In-process cache of the hashes of the sent files, so most of the dedup checks of the new files need no DB query.
+    A bloom filter of all the sent hashes rules out the new files, an LRU of `DEDUP_CACHE_POSITIVES` hashes
+    confirmed by the DB recognizes the duplicates. Only the files, which the filter may contain and the LRU does not,
+    are looked up in the DB.
+    The filter is warmed from the `File` model by the first check, then only the rows added since (by any process)
+    are read by their primary key, at most once per `DEDUP_CACHE_REFRESH_INTERVAL` seconds. The files sent by this
+    process are added at once, the files sent by the others may be missed until the next refresh (and then are
+    refused by the unique hash once sent). The ids are not committed in their order, so the ids missing below
+    the last read one are read again for `DEDUP_CACHE_GAP_TIMEOUT` seconds, until their transaction commits.
+    Deleted files are dropped from the LRU, the filter keeps them as a false positive, which is checked by the DB.
+    The cache learns only the committed rows, so it is bypassed inside a transaction (transfers run in autocommit).
+    """
+
+    def __init__(
+        self,
+        capacity: int | None = None,
+        error_rate: float | None = None,
+        positives: int | None = None,
+    ) -> None:
+        self.capacity = settings.DEDUP_CACHE_CAPACITY if capacity is None else capacity
+        self.error_rate = error_rate or settings.DEDUP_CACHE_ERROR_RATE
+        self.max_positives = (
+            settings.DEDUP_CACHE_POSITIVES if positives is None else positives
+        )
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        self._bloom = None
+        self._last_id = 0
+        self._gaps: list[Gap] = []
+        self._count = 0
+        self._refreshed_at = None
+        self._positives: OrderedDict[str, KnownHash] = OrderedDict()
+
+    def refresh(self) -> bool:
+        """
+        Warm the cache or read the files sent since the last refresh, return whether the cache can be used.
+        The files are read only if the last refresh is older than `DEDUP_CACHE_REFRESH_INTERVAL` seconds.
+        The filter is built again twice as large, once it holds more files than its capacity.
+        """
+        if not self.capacity or connection.in_atomic_block:
+            return False
+
+        with self._lock:
+            now = time.monotonic()
+            if self._bloom is None or self._count > self.capacity:
+                if self._bloom is not None:
+                    self.capacity *= 2
+                self._bloom = BloomFilter(self.capacity, self.error_rate)
+                self._last_id = 0
+                self._gaps = []
+                self._count = 0
+                self._refreshed_at = None
+                log.info("Cache of the sent hashes is being warmed up.")
+            elif now - self._refreshed_at < settings.DEDUP_CACHE_REFRESH_INTERVAL:
+                return True
+
+            new_ids = Q(id__gt=self._last_id)
+            for start, end, _ in self._gaps:
+                new_ids |= Q(id__range=(start, end))
+            new_files = (
+                File.objects.filter(new_ids)
+                .order_by("id")
+                .values_list("id", "hash_algorithm", "md5_hash")
+            )
+            read_ids = []
+            for file_id, hash_algorithm, file_hash in new_files.iterator():
+                self._bloom.add(_to_key(hash_algorithm, file_hash))
+                self._count += 1
+                read_ids.append(file_id)
+            self._update_gaps(read_ids, now)
+            self._refreshed_at = now
+        return True
+
+    def _update_gaps(self, read_ids: list[int], now: float) -> None:
+        """Drop the read ids and the expired gaps, add the gaps below the newly read ids"""
+        gaps = []
+        for start, end, found_at in self._gaps:
+            if now - found_at > settings.DEDUP_CACHE_GAP_TIMEOUT:
+                continue
+            first, last = bisect_left(read_ids, start), bisect_right(read_ids, end)
+            for file_id in read_ids[first:last]:
+                if start < file_id:
+                    gaps.append((start, file_id - 1, found_at))
+                start = file_id + 1
+            if start <= end:
+                gaps.append((start, end, found_at))
+
+        for file_id in read_ids:
+            if file_id <= self._last_id:
+                continue
+            if file_id > self._last_id + 1:
+                gaps.append((self._last_id + 1, file_id - 1, now))
+            self._last_id = file_id
+        self._gaps = sorted(gaps)[-MAX_GAPS:]
+
+    def lookup(
+        self, file_hashes: list[FileHash]
+    ) -> tuple[list[KnownHash], list[FileHash]]:
+        """Return the hashes known to be sent by the LRU and the hashes, which have to be looked up in the DB"""
+        known_hashes = []
+        lookup_hashes = []
+        with self._lock:
+            for file_hash in file_hashes:
+                key = _to_key(*file_hash)
+                known_hash = self._positives.get(key)
+                if known_hash is not None:
+                    self._positives.move_to_end(key)
+                    known_hashes.append(known_hash)
+                elif key in self._bloom:
+                    lookup_hashes.append(file_hash)
+        return known_hashes, lookup_hashes
+
+    def confirm(self, known_hashes: Iterable[KnownHash]) -> None:
+        """Remember the hashes of the sent files found in the DB"""
+        with self._lock:
+            for known_hash in known_hashes:
+                key = _to_key(*known_hash[:2])
+                self._positives[key] = known_hash
+                self._positives.move_to_end(key)
+            while len(self._positives) > self.max_positives:
+                self._positives.popitem(last=False)
+
+    def add(self, files: Iterable[File]) -> None:
+        """
+        Remember the newly sent files, once they are committed, so they are known before the next refresh
+        (which reads them once more, the filter does not mind).
+        """
+        known_hashes = [
+            (file.hash_algorithm, file.md5_hash, file.size) for file in files
+        ]
+        transaction.on_commit(lambda: self._add_committed(known_hashes))
+
+    def _add_committed(self, known_hashes: list[KnownHash]) -> None:
+        with self._lock:
+            if self._bloom is not None:
+                for hash_algorithm, file_hash, _ in known_hashes:
+                    self._bloom.add(_to_key(hash_algorithm, file_hash))
+        self.confirm(known_hashes)
+
+    def discard(self, hash_algorithm: str, file_hash: str) -> None:
+        with self._lock:
+            self._positives.pop(_to_key(hash_algorithm, file_hash), None)
+
+
+_known_hashes = None
+_known_hashes_lock = threading.Lock()
+
+
+def get_known_hashes() -> KnownHashes:
+    """Return the cache shared by the whole process"""
+    global _known_hashes
+    with _known_hashes_lock:
+        if _known_hashes is None:
+            _known_hashes = KnownHashes()
+        return _known_hashes
+
+
+@receiver(post_delete, sender=File)
+def discard_deleted_file(sender, instance: File, **kwargs) -> None:
+    """Forget the deleted file at once, so it is not taken for a sent one, even if the deletion is rolled back"""
+    if _known_hashes is not None:
+        _known_hashes.discard(instance.hash_algorithm, instance.md5_hash)
@@ -0,0 +1,38 @@
+import hashlib
+
+from django.db import connection
+
+
+def _lock_key(name: str) -> int:
+    # Advisory locks are identified by a signed 64-bit number
+    return int.from_bytes(
+        hashlib.blake2b(name.encode(), digest_size=8).digest(), "big", signed=True
+    )
+
+
+def try_advisory_lock(name: str) -> bool:
+    """
+    Take the session-level advisory lock of the name without waiting, return whether it was taken.
+    The lock is released by `advisory_unlock` or when the connection is closed, e.g. by a crash of the process.
+    Databases other than PostgreSQL have no advisory locks, so the lock is always taken there.
+    """
+    if connection.vendor != "postgresql":
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [_lock_key(name)])
+        return cursor.fetchone()[0]
+
+
+def advisory_unlock(name: str) -> None:
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", [_lock_key(name)])
+
+
+def lock_transaction(name: str) -> None:
+    """Wait for the transaction-level advisory lock of the name, which is released by the end of the transaction"""
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [_lock_key(name)])
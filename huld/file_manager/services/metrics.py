@@ -0,0 +1,278 @@
+import bisect
+import contextvars
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+log = logging.getLogger(__name__)
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Upper bounds of the buckets of the latency histograms in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """Named metric of the process, whose values are kept per combination of the label values"""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple[tuple[str, str], ...]:
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    @abstractmethod
+    def _samples(self) -> Iterator[str]:
+        """Yield the lines of the values in the Prometheus text format, called with the lock held"""
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        with self._lock:
+            lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def get_total(self) -> float:
+        """Sum of the values of all the label values"""
+        with self._lock:
+            return sum(self._values.values())
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """Distribution of the observed values in cumulative buckets, as well as their count and sum"""
+
+    type = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the number of seconds the block took"""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def get_count(self, **labels) -> int:
+        counts, _ = self._values.get(self._key(labels), ([0], 0.0))
+        return sum(counts)
+
+    def _samples(self) -> Iterator[str]:
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(key + (("le", _format_value(bound)),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(key)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def clear(self) -> None:
+        """Reset all the values, e.g. between the tests"""
+        for metric in self._metrics.values():
+            metric.clear()
+
+    def render(self) -> str:
+        """Return all the metrics in the Prometheus text exposition format"""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+FILES = REGISTRY.register(
+    Counter(
+        "huld_transfer_files_total",
+        "Files processed by the transfers by the outcome (scanned, hashed, skipped, sent).",
+        ["outcome"],
+    )
+)
+BYTES_SENT = REGISTRY.register(
+    Counter("huld_transfer_sent_bytes_total", "Bytes of the files sent.")
+)
+BYTES_HASHED = REGISTRY.register(
+    Counter("huld_hashed_bytes_total", "Bytes of the files hashed.")
+)
+JOBS = REGISTRY.register(
+    Counter("huld_transfer_jobs_total", "Finished transfer jobs by status.", ["status"])
+)
+STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "huld_transfer_stage_seconds",
+        "Duration of the stages of the transfer (per batch of the files).",
+        ["stage"],
+    )
+)
+DB_QUERIES = REGISTRY.register(
+    Counter(
+        "huld_db_queries_total",
+        "DB queries by the stage of the transfer, which made them (none outside of transfers).",
+        ["stage"],
+    )
+)
+DB_QUERY_SECONDS = REGISTRY.register(
+    Histogram("huld_db_query_seconds", "Duration of the DB queries.")
+)
+JOB_SECONDS = REGISTRY.register(
+    Histogram(
+        "huld_transfer_job_seconds",
+        "Duration of the transfer jobs.",
+        buckets=(1, 5, 15, 30, 60, 300, 900, 1800, 3600, 4 * 3600),
+    )
+)
+RECEIVER_REQUESTS = REGISTRY.register(
+    Counter(
+        "huld_receiver_requests_total",
+        "Requests to the receiver by the status code of the response (error if it failed to connect).",
+        ["status"],
+    )
+)
+RECEIVER_SECONDS = REGISTRY.register(
+    Histogram(
+        "huld_receiver_request_seconds",
+        "Duration of the requests to the receiver until the response was received.",
+    )
+)
+
+_stage = contextvars.ContextVar("stage", default="none")
+
+
+@contextmanager
+def measure_stage(stage: str) -> Iterator[None]:
+    """Observe the duration of the stage, the DB queries made meanwhile are counted to the stage"""
+    token = _stage.set(stage)
+    try:
+        with STAGE_SECONDS.time(stage=stage):
+            yield
+    finally:
+        _stage.reset(token)
+
+
+def observe_request(started_at: float, status: int | str) -> None:
+    """Record the request to the receiver started at the `time.perf_counter` time"""
+    RECEIVER_SECONDS.observe(time.perf_counter() - started_at)
+    RECEIVER_REQUESTS.inc(status=status)
+
+
+def count_query(execute, sql, params, many, context):
+    """DB execute wrapper counting the queries, see `connection.execute_wrapper`"""
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        DB_QUERY_SECONDS.observe(time.perf_counter() - started_at)
+        DB_QUERIES.inc(stage=_stage.get())
+
+
+def instrument_connection(sender, connection, **kwargs) -> None:
+    """Count the queries of every new DB connection, connected to the `connection_created` signal"""
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+def start_metrics_server(port: int) -> ThreadingHTTPServer:
+    """
+    Serve the metrics of the process at `http://<host>:<port>/metrics` by a background thread,
+    for the commands, which are not served by the application, e.g. the `transfer_worker`.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            body = REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    log.info("Metrics are served on port %s.", server.server_address[1])
+    return server
+
+
+def serve_metrics(port: int) -> ThreadingHTTPServer | None:
+    """
+    Start the metrics server of a command, unless the port is 0.
+    The port may be taken by another command on the same host, which only leaves this one without the metrics.
+    """
+    if not port:
+        return None
+    try:
+        return start_metrics_server(port)
+    except OSError as e:
+        log.error("Metrics cannot be served on port %s: %s", port, e)
+        return None
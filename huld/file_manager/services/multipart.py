@@ -0,0 +1,194 @@
+import asyncio
+import itertools
+import secrets
+import sys
+from typing import AsyncIterator, Iterator
+
+from django.conf import settings
+from file_manager.services.compression import (
+    MAGIC_BYTES_LENGTH, Compressor, is_compressible
+)
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.hashing import get_hasher
+from urllib3.fields import format_multipart_header_param
+
+
+class MultipartEncoder:
+    """
+    File-like `multipart/form-data` body, which reads the files lazily while the request is being sent.
+    Only one file is open and at most one chunk of it is kept in the memory at a time.
+    The total length is known up-front from the sizes of the files, so the request is sent with `Content-Length`.
+    If a compression `codec` is given, the files are compressed on the fly and marked by `Content-Encoding`
+    in the header of their part, the codec is negotiated by `negotiate_codec`. The length is not known then,
+    so the body shall be sent chunked.
+    Files, which were not hashed yet, are hashed as they are read, so they are read from the disk only once.
+    If a `hash_field` is given, every file is followed by a field of that name with the hash of its content
+    (`<algorithm>:<hash>`), which serves as a trailer, as the hash is known only once the file was sent.
+    """
+
+    def __init__(
+        self,
+        field_name: str,
+        scanned_files: list[ScannedFile],
+        chunk_size: int | None = None,
+        codec: str | None = None,
+        hash_field: str | None = None,
+    ) -> None:
+        self.boundary = secrets.token_hex(16)
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+        self.codec = codec
+        self.field_name = field_name
+        self.hash_field = hash_field
+        self.fields = [
+            (self._part_header(field_name, scanned_file.name), scanned_file)
+            for scanned_file in scanned_files
+        ]
+        self._closing = f"--{self.boundary}--\r\n".encode()
+        self.len = None
+        if codec is None:
+            self.len = sum(
+                len(header)
+                + scanned_file.size
+                + 2
+                + self._hash_part_length(scanned_file)
+                for header, scanned_file in self.fields
+            ) + len(self._closing)
+
+        self._chunks = self._iter_chunks()
+        self._chunk = b""
+        self._offset = 0
+
+    def __len__(self) -> int:
+        return self.len
+
+    def __iter__(self) -> Iterator[bytes]:
+        while chunk := self.read(self.chunk_size):
+            yield chunk
+
+    @property
+    def headers(self) -> dict[str, str]:
+        if self.len is None:
+            return {"Content-Type": self.content_type}
+        return {"Content-Type": self.content_type, "Content-Length": str(self.len)}
+
+    @property
+    def data(self) -> "MultipartEncoder | Iterator[bytes]":
+        """Body to be passed to `requests`, which is sent chunked if its length is not known"""
+        return self if self.len is not None else iter(self)
+
+    def _part_header(
+        self, field_name: str, file_name: str, content_encoding: str | None = None
+    ) -> bytes:
+        disposition = "; ".join(
+            [
+                "form-data",
+                format_multipart_header_param("name", field_name),
+                format_multipart_header_param("filename", file_name),
+            ]
+        )
+        header = f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+        if content_encoding:
+            header += f"Content-Encoding: {content_encoding}\r\n"
+        return f"{header}\r\n".encode()
+
+    def _hash_part(self, scanned_file: ScannedFile, file_hash: str) -> bytes:
+        value = f"{scanned_file.hash_algorithm}:{file_hash}"
+        disposition = format_multipart_header_param("name", self.hash_field)
+        return (
+            f"--{self.boundary}\r\nContent-Disposition: form-data; {disposition}"
+            f"\r\n\r\n{value}\r\n"
+        ).encode()
+
+    def _hash_part_length(self, scanned_file: ScannedFile) -> int:
+        if not self.hash_field:
+            return 0
+        # Only the length of the hash is known before the file is read
+        file_hash = (
+            scanned_file.md5_hash or get_hasher(scanned_file.hash_algorithm).hexdigest()
+        )
+        return len(self._hash_part(scanned_file, file_hash))
+
+    def _iter_file(self, scanned_file: ScannedFile) -> Iterator[bytes]:
+        """
+        Read exactly the scanned size of the file, so the announced length of the body holds.
+        The hash of the file is computed meanwhile, unless it is known already.
+        """
+        file_hash = None
+        if not scanned_file.md5_hash:
+            file_hash = get_hasher(scanned_file.hash_algorithm)
+        remaining = scanned_file.size
+        with open(scanned_file.path, "rb") as file:
+            while remaining:
+                chunk = file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    raise OSError(
+                        f"File {scanned_file.path} was truncated while being sent."
+                    )
+                remaining -= len(chunk)
+                if file_hash is not None:
+                    file_hash.update(chunk)
+                yield chunk
+        if file_hash is not None:
+            scanned_file.streamed_hash = file_hash.hexdigest()
+
+    def _iter_compressed_file(self, scanned_file: ScannedFile) -> Iterator[bytes]:
+        """
+        Yield the header of the part and the file compressed, unless it is compressed already.
+        The compressed size is recorded in the scanned file.
+        """
+        chunks = self._iter_file(scanned_file)
+        head = next(chunks, b"")
+        if not is_compressible(scanned_file.name, head[:MAGIC_BYTES_LENGTH]):
+            yield self._part_header(self.field_name, scanned_file.name)
+            yield head
+            yield from chunks
+            return
+
+        yield self._part_header(self.field_name, scanned_file.name, self.codec)
+        compressor = Compressor(self.codec, settings.UPLOAD_COMPRESSION_LEVEL)
+        compressed_size = 0
+        for chunk in itertools.chain([head], chunks):
+            if compressed := compressor.compress(chunk):
+                compressed_size += len(compressed)
+                yield compressed
+        compressed = compressor.flush()
+        scanned_file.compressed_size = compressed_size + len(compressed)
+        yield compressed
+
+    def _iter_chunks(self) -> Iterator[bytes]:
+        for header, scanned_file in self.fields:
+            if self.codec is None:
+                yield header
+                yield from self._iter_file(scanned_file)
+            else:
+                yield from self._iter_compressed_file(scanned_file)
+            yield b"\r\n"
+            if self.hash_field:
+                yield self._hash_part(
+                    scanned_file, scanned_file.md5_hash or scanned_file.streamed_hash
+                )
+        yield self._closing
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = sys.maxsize
+
+        parts = []
+        while size > 0:
+            if self._offset >= len(self._chunk):
+                self._chunk = next(self._chunks, b"")
+                self._offset = 0
+                if not self._chunk:
+                    break
+            start, end = self._offset, self._offset + size
+            part = self._chunk[start:end]
+            self._offset += len(part)
+            size -= len(part)
+            parts.append(part)
+        return b"".join(parts)
+
+    async def aiter_chunks(self) -> AsyncIterator[bytes]:
+        """Read the body asynchronously, the files are read in the default thread pool"""
+        while chunk := await asyncio.to_thread(self.read, self.chunk_size):
+            yield chunk
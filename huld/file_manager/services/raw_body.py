@@ -0,0 +1,118 @@
+import http.client
+import socket
+import ssl
+import threading
+from urllib.parse import quote, urlsplit
+
+import requests
+from django.conf import settings
+from file_manager.services.dedup import ScannedFile
+
+# Errors of a kept-alive connection, which the receiver has closed meanwhile
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+class RawBodySender:
+    """
+    Send a file as the raw body of a `POST` request, its name is in the `Content-Disposition` header.
+    The body is written by `socket.sendfile`, so over plain HTTP the content goes from the page cache straight
+    to the socket by `os.sendfile`, without being copied to Python (over HTTPS it is encrypted in Python,
+    so it is read in blocks instead). The `requests` library always copies the body through Python buffers,
+    so the request is written to a kept-alive socket of every thread directly.
+    """
+
+    def __init__(self, url: str | None = None, timeout: float | None = None) -> None:
+        self.url = url or settings.FILE_RECEIVE_URL
+        parts = urlsplit(self.url)
+        self._is_https = parts.scheme == "https"
+        self._address = (parts.hostname, parts.port or (443 if self._is_https else 80))
+        self._host = parts.netloc
+        self._target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.timeout = timeout
+        self._local = threading.local()
+        self._sockets = set()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.create_connection(self._address, timeout=self.timeout)
+        if self._is_https:
+            sock = ssl.create_default_context().wrap_socket(
+                sock, server_hostname=self._address[0]
+            )
+        with self._lock:
+            self._sockets.add(sock)
+        return sock
+
+    def _disconnect(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            with self._lock:
+                self._sockets.discard(sock)
+            sock.close()
+
+    def close(self) -> None:
+        """Close the connections of all the threads"""
+        with self._lock:
+            sockets, self._sockets = self._sockets, set()
+        for sock in sockets:
+            sock.close()
+
+    def _get_head(self, scanned_file: ScannedFile) -> bytes:
+        lines = [
+            f"POST {self._target} HTTP/1.1",
+            f"Host: {self._host}",
+            "Content-Type: application/octet-stream",
+            f"Content-Length: {scanned_file.size}",
+            f"Content-Disposition: attachment; filename*=UTF-8''{quote(scanned_file.name)}",
+        ]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    def _exchange(
+        self, sock: socket.socket, scanned_file: ScannedFile, file
+    ) -> tuple[http.client.HTTPResponse, bytes]:
+        sock.sendall(self._get_head(scanned_file))
+        # An empty body cannot be sent by `sendfile`
+        if (
+            scanned_file.size
+            and sock.sendfile(file, 0, scanned_file.size) < scanned_file.size
+        ):
+            raise OSError(f"File {scanned_file.path} was truncated while being sent.")
+        response = http.client.HTTPResponse(sock, method="POST")
+        response.begin()
+        return response, response.read()
+
+    def post(self, scanned_file: ScannedFile) -> requests.Response:
+        """Send the file and return the response of the receiver, connection errors raise `OSError`"""
+        with open(scanned_file.path, "rb") as file:
+            sock = getattr(self._local, "sock", None)
+            try:
+                if sock is not None:
+                    try:
+                        response, content = self._exchange(sock, scanned_file, file)
+                    except STALE_CONNECTION_ERRORS:
+                        # The receiver has closed the idle connection, which is not a failure of the request
+                        self._disconnect()
+                        sock = None
+                if sock is None:
+                    sock = self._local.sock = self._connect()
+                    response, content = self._exchange(sock, scanned_file, file)
+            except BaseException:
+                # The connection is in an unknown state, e.g. a part of the body was sent
+                self._disconnect()
+                raise
+
+        if response.will_close:
+            self._disconnect()
+
+        result = requests.Response()
+        result.status_code = response.status
+        result.reason = response.reason
+        result.headers.update(response.getheaders())
+        result.url = self.url
+        result._content = content
+        return result
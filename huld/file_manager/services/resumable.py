@@ -0,0 +1,170 @@
+import base64
+import logging
+from urllib.parse import urljoin
+
+import requests
+from django.conf import settings
+from file_manager.models import ChunkedUpload
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.retry import Retrier
+from file_manager.services.sender import TokenBucket, get_session
+
+log = logging.getLogger(__name__)
+
+TUS_VERSION = "1.0.0"
+# Number of times the offset of one upload is read again after the receiver has rejected the offset of a chunk
+MAX_RESYNCS = 3
+
+
+def is_resumable(scanned_file: ScannedFile) -> bool:
+    """Whether the file shall be uploaded in chunks instead of one request"""
+    return bool(
+        settings.CHUNKED_UPLOAD_URL
+        and scanned_file.size >= settings.CHUNKED_UPLOAD_THRESHOLD
+    )
+
+
+class ResumableUploader:
+    """
+    Upload files in fixed-size chunks by the core tus protocol (https://tus.io/protocols/resumable-upload).
+    The offset acknowledged by the receiver is stored in a `ChunkedUpload` after every chunk, so if the upload
+    is interrupted, it is resumed from the last acknowledged chunk next time instead of from the beginning.
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        chunk_size: int | None = None,
+        rate_limiter: TokenBucket | None = None,
+        retrier: Retrier | None = None,
+    ) -> None:
+        self.url = url or settings.CHUNKED_UPLOAD_URL
+        self.chunk_size = chunk_size or settings.CHUNKED_UPLOAD_CHUNK_SIZE
+        self.rate_limiter = rate_limiter or TokenBucket(0)
+        self.retrier = retrier or Retrier(max_attempts=1)
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        headers = {"Tus-Resumable": TUS_VERSION, **kwargs.pop("headers", {})}
+
+        def request() -> requests.Response:
+            self.rate_limiter.acquire()
+            return get_session().request(method, url, headers=headers, **kwargs)
+
+        return self.retrier.call(request)
+
+    def _head(self, upload: ChunkedUpload) -> requests.Response:
+        """Ask the receiver for the offset of the upload, which is in `Upload-Offset` header of the response"""
+        return self._request("HEAD", upload.url)
+
+    @staticmethod
+    def _get_offset(upload: ChunkedUpload, response: requests.Response) -> int:
+        """Return the offset of the upload acknowledged by the receiver, raise `OSError` if it is missing or invalid"""
+        try:
+            offset = int(response.headers["Upload-Offset"])
+        except (KeyError, ValueError):
+            raise OSError(f"Receiver has not sent a valid offset of {upload.url}.")
+        if not 0 <= offset <= upload.size:
+            raise OSError(f"Receiver has sent offset {offset} out of {upload.url}.")
+        return offset
+
+    def _resume(
+        self, scanned_file: ScannedFile
+    ) -> tuple[ChunkedUpload | None, requests.Response | None]:
+        upload = ChunkedUpload.objects.filter(
+            md5_hash=scanned_file.md5_hash, size=scanned_file.size
+        ).first()
+        if upload is None:
+            return None, None
+
+        response = self._head(upload)
+        if response.status_code >= 400:
+            log.info(
+                "Upload of file %s has expired, starting again.", scanned_file.name
+            )
+            upload.delete()
+            return None, None
+
+        upload.offset = self._get_offset(upload, response)
+        log.info(
+            "Upload of file %s is resumed from byte %s.",
+            scanned_file.name,
+            upload.offset,
+        )
+        return upload, response
+
+    def _create(
+        self, scanned_file: ScannedFile
+    ) -> tuple[ChunkedUpload | None, requests.Response]:
+        file_name = base64.b64encode(scanned_file.name.encode()).decode()
+        response = self._request(
+            "POST",
+            self.url,
+            headers={
+                "Upload-Length": str(scanned_file.size),
+                "Upload-Metadata": f"filename {file_name}",
+            },
+        )
+        if response.status_code >= 400:
+            return None, response
+        location = response.headers.get("Location")
+        if not location:
+            raise OSError(f"Receiver has not sent the location of {scanned_file.name}.")
+
+        upload = ChunkedUpload.objects.create(
+            md5_hash=scanned_file.md5_hash,
+            size=scanned_file.size,
+            url=urljoin(self.url, location),
+        )
+        return upload, response
+
+    def upload(self, scanned_file: ScannedFile) -> requests.Response:
+        """
+        Upload the file and return the last response of the receiver.
+        Connection errors, files, which could not be read, a missing location of a new upload and invalid offsets
+        (missing or rejected more than `MAX_RESYNCS` times) raise `OSError`; the upload can be resumed later.
+        """
+        upload, response = self._resume(scanned_file)
+        if upload is None:
+            upload, response = self._create(scanned_file)
+            if upload is None:
+                return response
+
+        resyncs = 0
+        with open(scanned_file.path, "rb") as file:
+            while upload.offset < upload.size:
+                file.seek(upload.offset)
+                chunk = file.read(min(self.chunk_size, upload.size - upload.offset))
+                if not chunk:
+                    raise OSError(
+                        f"File {scanned_file.path} was truncated while being sent."
+                    )
+
+                response = self._request(
+                    "PATCH",
+                    upload.url,
+                    data=chunk,
+                    headers={
+                        "Upload-Offset": str(upload.offset),
+                        "Content-Type": "application/offset+octet-stream",
+                    },
+                )
+                if response.status_code == 409:
+                    # The receiver has a different offset, e.g. it did not acknowledge the last chunk
+                    resyncs += 1
+                    if resyncs > MAX_RESYNCS:
+                        raise OSError(
+                            f"Receiver has rejected the offset of {upload.url} {resyncs} times."
+                        )
+                    response = self._head(upload)
+                    if response.status_code >= 400:
+                        return response
+                    upload.offset = self._get_offset(upload, response)
+                    continue
+                if response.status_code >= 400:
+                    return response
+
+                upload.offset = self._get_offset(upload, response)
+                upload.save(update_fields=["offset", "updated_at"])
+
+        upload.delete()
+        return response
@@ -0,0 +1,166 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable
+
+import httpx
+import requests
+from django.conf import settings
+from file_manager.services.metrics import observe_request
+
+# Status codes of the responses, which may succeed if the request is sent again later
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+# Errors of the connection to the receiver, as opposed to the errors of reading the files
+RETRYABLE_ERRORS = (
+    requests.RequestException,
+    httpx.TransportError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class CircuitOpenError(ConnectionError):
+    """The receiver has failed too many times in a row, so no requests are sent to it for a while"""
+
+
+class CircuitBreaker:
+    """
+    Stop sending requests to the receiver after `threshold` failed attempts in a row.
+    After `reset_timeout` seconds one request is let through again, which closes the circuit if it succeeds.
+    """
+
+    def __init__(
+        self, threshold: int | None = None, reset_timeout: float | None = None
+    ) -> None:
+        self.threshold = threshold or settings.TRANSFER_CIRCUIT_THRESHOLD
+        self.reset_timeout = (
+            settings.TRANSFER_CIRCUIT_RESET_TIMEOUT
+            if reset_timeout is None
+            else reset_timeout
+        )
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def before_request(self) -> None:
+        """Raise `CircuitOpenError` if the request must not be sent"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("The receiver is not available.")
+            # Only this request is let through to find out, whether the receiver is back
+            self._opened_at = now
+            self._trial = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+class Retrier:
+    """
+    Send a request again, if it fails by a connection error or by a status code, which may be transient.
+    The delay between the attempts grows exponentially with a full jitter, so the retrying clients spread out.
+    `Retry-After` of the response is respected as the lowest delay.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int | None = None,
+        base_delay: float | None = None,
+        max_delay: float | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self.max_attempts = max_attempts or settings.TRANSFER_RETRY_ATTEMPTS
+        self.base_delay = (
+            settings.TRANSFER_RETRY_BASE_DELAY if base_delay is None else base_delay
+        )
+        self.max_delay = (
+            settings.TRANSFER_RETRY_MAX_DELAY if max_delay is None else max_delay
+        )
+        self.breaker = breaker or CircuitBreaker()
+
+    def _get_delay(self, attempt: int, response=None) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        retry_after = (
+            response.headers.get("Retry-After") if response is not None else None
+        )
+        if isinstance(retry_after, str) and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), self.max_delay))
+        return delay
+
+    def _check(
+        self, attempt: int, response=None, error: Exception | None = None
+    ) -> float | None:
+        """
+        Record the result of the attempt to the circuit breaker.
+        Return the delay before the next attempt, or None if the result is final.
+        """
+        if error is not None:
+            if not isinstance(error, RETRYABLE_ERRORS):
+                return None
+        elif response.status_code not in RETRYABLE_STATUS_CODES:
+            self.breaker.record_success()
+            return None
+
+        self.breaker.record_failure()
+        if attempt + 1 >= self.max_attempts:
+            return None
+        return self._get_delay(attempt, response)
+
+    def call(self, request: Callable[[], requests.Response]) -> requests.Response:
+        """Return the last response, or raise the last error, once there are no attempts left"""
+        for attempt in range(self.max_attempts):
+            self.breaker.before_request()
+            started_at = time.perf_counter()
+            try:
+                response = request()
+            except OSError as e:
+                observe_request(started_at, "error")
+                delay = self._check(attempt, error=e)
+                if delay is None:
+                    raise
+            else:
+                observe_request(started_at, response.status_code)
+                delay = self._check(attempt, response)
+                if delay is None:
+                    return response
+            time.sleep(delay)
+
+    async def acall(
+        self, request: Callable[[], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        """Asynchronous variant of `call`"""
+        for attempt in range(self.max_attempts):
+            self.breaker.before_request()
+            started_at = time.perf_counter()
+            try:
+                response = await request()
+            except (OSError, httpx.HTTPError) as e:
+                observe_request(started_at, "error")
+                delay = self._check(attempt, error=e)
+                if delay is None:
+                    raise
+            else:
+                observe_request(started_at, response.status_code)
+                delay = self._check(attempt, response)
+                if delay is None:
+                    return response
+            await asyncio.sleep(delay)
@@ -0,0 +1,76 @@
+import logging
+import os
+import stat
+from typing import Iterator
+
+from django.conf import settings
+from file_manager.services.dedup import ScannedFile
+
+log = logging.getLogger(__name__)
+
+# Prefix of the files being uploaded to the folder, which are not complete yet, see `FolderUploadHandler`
+PARTIAL_UPLOAD_PREFIX = ".huld-upload-"
+
+
+def scan_folder(
+    folder_path: str, recursive: bool | None = None
+) -> Iterator[ScannedFile]:
+    """
+    Yield the files of the folder as they are read from the directory, without listing and sorting it up-front.
+    The type of the entry comes from the directory listing itself, so only one `stat` is needed per file.
+    Files being uploaded (see `PARTIAL_UPLOAD_PREFIX`) are skipped.
+    Subfolders are scanned as well if `recursive` (default: `FILES_FOLDER_RECURSIVE`) is set, their files are named
+    by the path relative to `folder_path`. Symbolic links to folders are not followed, so the scan cannot loop.
+
+    Raises `FileNotFoundError` if `folder_path` itself does not exist.
+    """
+    if recursive is None:
+        recursive = settings.FILES_FOLDER_RECURSIVE
+
+    # Subfolders are scanned after their parent is closed, so only one folder is open at a time
+    folders = [(folder_path, "")]
+    while folders:
+        path, prefix = folders.pop()
+        try:
+            entries = os.scandir(path)
+        except OSError as e:
+            if path == folder_path:
+                raise
+            log.warning("The folder `%s` could not be scanned: %s", path, str(e))
+            continue
+
+        subfolders = []
+        with entries:
+            for entry in entries:
+                name = prefix + entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            subfolders.append((entry.path, name + "/"))
+                    elif entry.is_file() and not entry.name.startswith(
+                        PARTIAL_UPLOAD_PREFIX
+                    ):
+                        yield ScannedFile(
+                            name=name, path=entry.path, stat_result=entry.stat()
+                        )
+                except FileNotFoundError:
+                    # The file was removed or it is a broken symbolic link
+                    continue
+        folders.extend(reversed(subfolders))
+
+
+def scan_paths(folder_path: str, file_paths: list[str]) -> Iterator[ScannedFile]:
+    """
+    Yield the given files of the folder, e.g. the ones reported by a watcher, named same as by `scan_folder`.
+    Files, which do not exist anymore, are not regular files or are being uploaded, are skipped.
+    """
+    for file_path in file_paths:
+        if os.path.basename(file_path).startswith(PARTIAL_UPLOAD_PREFIX):
+            continue
+        try:
+            stat_result = os.stat(file_path)
+        except FileNotFoundError:
+            continue
+        if stat.S_ISREG(stat_result.st_mode):
+            name = os.path.relpath(file_path, folder_path).replace(os.sep, "/")
+            yield ScannedFile(name=name, path=file_path, stat_result=stat_result)
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.multipart import MultipartEncoder
+from file_manager.services.raw_body import RawBodySender
+from file_manager.services.retry import Retrier
+from requests.adapters import HTTPAdapter
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Return the session shared by the whole process.
+    Its connections are kept alive and reused, so the TCP and TLS handshakes are not repeated for every file.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=settings.TRANSFER_MAX_CONCURRENCY
+            )
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+class TokenBucket:
+    """
+    Rate limiter allowing `rate` acquisitions per second on average and bursts of up to `capacity` acquisitions.
+    Rate of zero disables the limiting.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1) -> None:
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take one token and return 0, or return the number of seconds until a token is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        if not self.rate:
+            return
+
+        while wait := self._take():
+            time.sleep(wait)
+
+    async def aacquire(self) -> None:
+        if not self.rate:
+            return
+
+        while wait := self._take():
+            await asyncio.sleep(wait)
+
+
+class FileSender:
+    """
+    Send files to the external URL one-by-one, using a bounded pool of worker threads.
+    Meant to be used as a context manager, so the workers are stopped once the sending is done.
+    If `raw_body` is set, each file is sent as the raw body of the request by the `RawBodySender` (uncompressed).
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        max_concurrency: int | None = None,
+        rate_limit: float | None = None,
+        codec: str | None = None,
+        retrier: Retrier | None = None,
+        raw_body: bool | None = None,
+    ) -> None:
+        self.url = url or settings.FILE_RECEIVE_URL
+        self.max_concurrency = max_concurrency or settings.TRANSFER_MAX_CONCURRENCY
+        rate_limit = settings.TRANSFER_RATE_LIMIT if rate_limit is None else rate_limit
+        self.rate_limiter = TokenBucket(rate_limit, capacity=self.max_concurrency)
+        self.codec = codec
+        self.retrier = retrier or Retrier()
+        raw_body = settings.UPLOAD_RAW_BODY if raw_body is None else raw_body
+        self.raw_body_sender = RawBodySender(self.url) if raw_body else None
+        self._executor = None
+
+    def __enter__(self) -> "FileSender":
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="file-sender"
+        )
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        if self.raw_body_sender is not None:
+            self.raw_body_sender.close()
+
+    def _post(self, scanned_file: ScannedFile) -> requests.Response:
+        scanned_file.attempts += 1
+        self.rate_limiter.acquire()
+        if self.raw_body_sender is not None:
+            return self.raw_body_sender.post(scanned_file)
+        body = MultipartEncoder(
+            "file",
+            [scanned_file],
+            codec=self.codec,
+            hash_field=settings.UPLOAD_HASH_FIELD,
+        )
+        return get_session().post(self.url, data=body.data, headers=body.headers)
+
+    def send(self, scanned_file: ScannedFile) -> requests.Response:
+        """Send the file, it is sent again if it fails by a transient error"""
+        return self.retrier.call(lambda: self._post(scanned_file))
+
+    def submit(self, scanned_file: ScannedFile) -> Future:
+        """Schedule the file to be sent by one of the workers"""
+        return self._executor.submit(self.send, scanned_file)
@@ -0,0 +1,147 @@
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+from typing import Iterable
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from file_manager.models import TransferJob, TransferWorker
+
+log = logging.getLogger(__name__)
+
+
+def _ring_position(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring of the workers. Every worker is placed on the ring at `virtual_nodes` points and a key
+    is owned by the worker of the first point following the position of the key.
+    Once a worker joins or leaves, only about `1 / number of workers` of the keys change their owner.
+    """
+
+    def __init__(
+        self, members: Iterable[str], virtual_nodes: int | None = None
+    ) -> None:
+        virtual_nodes = virtual_nodes or settings.TRANSFER_SHARD_VIRTUAL_NODES
+        points = sorted(
+            (_ring_position(f"{member}#{index}"), member)
+            for member in set(members)
+            for index in range(virtual_nodes)
+        )
+        self._positions = [position for position, _ in points]
+        self._members = [member for _, member in points]
+
+    def get_owner(self, key: str) -> str | None:
+        if not self._positions:
+            return None
+        index = bisect.bisect(self._positions, _ring_position(key))
+        return self._members[index % len(self._members)]
+
+
+class Shard:
+    """
+    Files of the folder owned by one worker of the ring. The files are keyed by their inode (file number), so the files
+    are spread evenly over the shards even if all of them are of the same size, and the hard links of a file are
+    in one shard. Copies of the same content may be in different shards, only one of them is sent at a time,
+    as their content is claimed before being sent (see `claim_contents`).
+    """
+
+    def __init__(self, ring: HashRing, member: str) -> None:
+        self.ring = ring
+        self.member = member
+
+    def __contains__(self, file_number: int) -> bool:
+        return self.ring.get_owner(str(file_number)) == self.member
+
+
+def get_shard(job: TransferJob) -> Shard | None:
+    """
+    Return the shard of the folder, which the job transfers, or None if the job transfers the whole folder.
+    The ring is made of the workers of all the shards of the transfer, as they were when it was queued,
+    so every file belongs to exactly one of the shards, even if the workers have changed since.
+    """
+    if job.parent_id is None:
+        return None
+    members = TransferJob.objects.filter(parent_id=job.parent_id).values_list(
+        "worker", flat=True
+    )
+    return Shard(HashRing(members), job.worker)
+
+
+def get_worker_name() -> str:
+    return settings.TRANSFER_WORKER_NAME or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def heartbeat(name: str) -> None:
+    """Register the worker or record that it is still running"""
+    TransferWorker.objects.update_or_create(
+        name=name, defaults={"heartbeat_at": timezone.now()}
+    )
+
+
+def leave(name: str) -> None:
+    """
+    Unregister the worker, its shards, which have not finished, are queued again to be taken over by the others.
+    The files of the shards claimed by the worker are released by then.
+    """
+    TransferWorker.objects.filter(name=name).delete()
+    TransferJob.objects.filter(worker=name, status=TransferJob.Status.RUNNING).update(
+        status=TransferJob.Status.QUEUED
+    )
+
+
+def get_members() -> list[str]:
+    """
+    Return the names of the running workers. Workers, which have not sent a heartbeat
+    for `TRANSFER_WORKER_TIMEOUT` seconds, are removed and their shards are queued again.
+    """
+    beaten_after = timezone.now() - timedelta(seconds=settings.TRANSFER_WORKER_TIMEOUT)
+    for name in TransferWorker.objects.filter(
+        heartbeat_at__lt=beaten_after
+    ).values_list("name", flat=True):
+        log.warning("Worker %s has stopped sending heartbeats.", name)
+        leave(name)
+    return list(TransferWorker.objects.order_by("name").values_list("name", flat=True))
+
+
+class Heartbeat:
+    """
+    Send the heartbeats of the worker by a background thread every `TRANSFER_WORKER_HEARTBEAT_INTERVAL` seconds,
+    so the worker stays a member of the ring while it processes a long transfer.
+    """
+
+    def __init__(self, name: str, interval: float | None = None) -> None:
+        self.name = name
+        self.interval = interval or settings.TRANSFER_WORKER_HEARTBEAT_INTERVAL
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        try:
+            while not self._stopped.wait(self.interval):
+                close_old_connections()
+                try:
+                    heartbeat(self.name)
+                except Exception:
+                    log.exception("Heartbeat of worker %s has failed.", self.name)
+        finally:
+            connection.close()
+
+    def __enter__(self) -> "Heartbeat":
+        heartbeat(self.name)
+        log.info("Worker %s has joined the transfers.", self.name)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._stopped.set()
+        self._thread.join()
+        leave(self.name)
+        log.info("Worker %s has left the transfers.", self.name)
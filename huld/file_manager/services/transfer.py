@@ -0,0 +1,449 @@
+import logging
+from operator import attrgetter
+from typing import Iterator
+
+import requests
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from file_manager.models import DeadLetter, File, FileChunk, TransferJob
+from file_manager.services.batching import batched, size_bounded_batches
+from file_manager.services.chunk_dedup import (
+    ChunkUploader, is_chunk_deduplicated
+)
+from file_manager.services.claims import (
+    claim_contents, claim_files, release_files
+)
+from file_manager.services.compression import negotiate_codec
+from file_manager.services.dedup import (
+    ScannedFile, get_legacy_algorithms, mark_duplicates, mark_sent_files
+)
+from file_manager.services.fingerprint import (
+    hash_scanned_files, hash_unhashed_files
+)
+from file_manager.services.known_hashes import get_known_hashes
+from file_manager.services.metrics import BYTES_SENT, FILES, measure_stage
+from file_manager.services.multipart import MultipartEncoder
+from file_manager.services.resumable import ResumableUploader, is_resumable
+from file_manager.services.retry import CircuitOpenError, Retrier
+from file_manager.services.scanner import scan_folder, scan_paths
+from file_manager.services.sender import FileSender, TokenBucket, get_session
+from file_manager.services.sharding import get_shard
+
+log = logging.getLogger(__name__)
+
+PROGRESS_FIELDS = [
+    "files_scanned",
+    "files_hashed",
+    "files_skipped",
+    "files_sent",
+    "bytes_sent",
+]
+
+
+class TransferService:
+    """
+    Scan the folder and send the new files to the external service.
+    Progress of the transfer is recorded in the given job after every batch of the files.
+    If `file_paths` are given, only these files of the folder are transferred instead of scanning the whole folder.
+    If the job is a shard of a sharded transfer, only the files of the shard are transferred.
+    """
+
+    def __init__(self, job: TransferJob, file_paths: list[str] | None = None) -> None:
+        self.job = job
+        self.file_paths = file_paths
+        self.codec = None
+        self.retrier = None
+        self.shard = None
+        # Algorithms of the files sent before `HASH_ALGORITHM` was changed, looked up once per transfer
+        self.legacy_algorithms = None
+        self._reported = dict.fromkeys(PROGRESS_FIELDS, 0)
+
+    def run(self) -> bool:
+        """Transfer the files and return whether all of them were sent successfully"""
+        self.codec = negotiate_codec(get_session(), settings.FILE_RECEIVE_URL)
+        self.retrier = Retrier()
+        self.shard = get_shard(self.job)
+        self.legacy_algorithms = get_legacy_algorithms()
+        try:
+            if settings.SEND_FILES_BULK:
+                return self._send_files_bulk()
+            return self._send_files_by_one()
+        finally:
+            self._report_progress()
+
+    def _report_progress(self) -> None:
+        """Add the progress made since the last report to the metrics of the process"""
+        for field in PROGRESS_FIELDS:
+            value = getattr(self.job, field)
+            delta = value - self._reported[field]
+            self._reported[field] = value
+            if not delta:
+                continue
+            if field == "bytes_sent":
+                BYTES_SENT.inc(delta)
+            else:
+                FILES.inc(delta, outcome=field.removeprefix("files_"))
+
+    def _save_progress(self) -> None:
+        self.job.save(update_fields=PROGRESS_FIELDS)
+        self._report_progress()
+
+    def _scan_files(self) -> Iterator[ScannedFile]:
+        folder_path = settings.FILES_FOLDER_PATH
+        if self.file_paths is not None:
+            yield from scan_paths(folder_path, self.file_paths)
+            return
+
+        try:
+            yield from scan_folder(folder_path)
+        except FileNotFoundError:
+            log.error("The folder `%s` does not exist.", folder_path)
+
+    def _get_batches(self) -> Iterator[list[ScannedFile]]:
+        """
+        Scan the folder and yield the found files in batches, as soon as each batch is read from the folder.
+        Every batch is hashed, checked for duplicates and claimed at once, so the number of DB queries does not grow
+        with the number of files. Only the new files are claimed (see `_claim_files`), so a rescan of the sent
+        files writes nothing. The claims of the batch are released once the batch is processed.
+        """
+        scanned_files = self._scan_files()
+        if self.shard is not None:
+            scanned_files = (
+                scanned_file
+                for scanned_file in scanned_files
+                if scanned_file.file_number in self.shard
+            )
+
+        batches = batched(scanned_files, settings.TRANSFER_BATCH_SIZE)
+        while True:
+            with measure_stage("scan"):
+                batch = next(batches, None)
+            if batch is None:
+                return
+
+            # Only the batch is sorted, so it is decided deterministically, which one of the duplicates is sent
+            batch.sort(key=attrgetter("name"))
+            self.job.files_scanned += len(batch)
+            with measure_stage("hash"):
+                self.job.files_hashed += hash_scanned_files(batch)
+            with measure_stage("dedup"):
+                mark_duplicates(batch, self.legacy_algorithms)
+            with measure_stage("claim"):
+                claimed_files = self._claim_files(batch)
+            try:
+                with measure_stage("send"):
+                    yield claimed_files
+            finally:
+                with measure_stage("release"):
+                    release_files(self.job, claimed_files)
+            self._save_progress()
+
+    def _skip_claimed(
+        self, batch: list[ScannedFile], claimed_files: list[ScannedFile]
+    ) -> list[ScannedFile]:
+        """Return the duplicates and the claimed files of the batch in its order, the others are skipped"""
+        claimed_ids = {id(scanned_file) for scanned_file in claimed_files}
+        sent_files = [
+            scanned_file
+            for scanned_file in batch
+            if scanned_file.is_duplicate or id(scanned_file) in claimed_ids
+        ]
+        self.job.files_skipped += len(batch) - len(sent_files)
+        return sent_files
+
+    def _claim_files(self, batch: list[ScannedFile]) -> list[ScannedFile]:
+        """
+        Claim the new files of the batch and their content and return the batch without the files claimed
+        by another job running at the same time. The claimed files are checked in the DB once more,
+        as another job may have sent them since they were checked for duplicates.
+        """
+        new_files = [
+            scanned_file for scanned_file in batch if not scanned_file.is_duplicate
+        ]
+        claimed_files = claim_contents(self.job, claim_files(self.job, new_files))
+        mark_sent_files(claimed_files)
+        return self._skip_claimed(batch, claimed_files)
+
+    def _skip_duplicate(self, scanned_file: ScannedFile) -> None:
+        self.job.files_skipped += 1
+        log.info(
+            "File with name %s was already sent once or is a duplicate. Skipping...",
+            scanned_file.name,
+        )
+
+    @staticmethod
+    def _log_exception(e: Exception) -> None:
+        log.error("Files were NOT sent. An Exception has been raised: %s", str(e))
+
+    def _handle_response(self, scanned_file: ScannedFile, response) -> bool:
+        """Log the response of the external service to one file and return whether the file was sent"""
+        if response.status_code >= 400:
+            log.error(
+                "File %s was NOT sent. There was an error with the external service. Response: %s",
+                scanned_file.name,
+                response.text,
+            )
+            return False
+
+        self.job.files_sent += 1
+        self.job.bytes_sent += scanned_file.size
+        log.info(
+            "File %s were sent. Response: Status-code: %s, Text: %s",
+            scanned_file.name,
+            response.status_code,
+            response.text,
+        )
+        return True
+
+    def _handle_bulk_response(self, scanned_files: list[ScannedFile], response) -> bool:
+        """Log the response of the external service to a batch of files and return whether the batch was sent"""
+        if response.status_code >= 400:
+            log.error(
+                "Files were NOT sent. There was an error with the external service. Response: %s",
+                response.text,
+            )
+            return False
+
+        self.job.files_sent += len(scanned_files)
+        self.job.bytes_sent += sum(scanned_file.size for scanned_file in scanned_files)
+        log.info(
+            "Files were sent. Response: Status-code: %s, Text: %s",
+            response.status_code,
+            response.text,
+        )
+        return True
+
+    def _dead_letter(
+        self, scanned_file: ScannedFile, response=None, error: Exception | None = None
+    ) -> None:
+        """Record the file, which could not be sent even after all the retries"""
+        try:
+            self.job.files_hashed += hash_unhashed_files([scanned_file])
+        except OSError as e:
+            log.warning("File %s could not be read: %s", scanned_file.name, str(e))
+            return
+
+        dead_letter, _ = DeadLetter.objects.get_or_create(
+            md5_hash=scanned_file.md5_hash
+        )
+        dead_letter.name = scanned_file.name
+        dead_letter.path = scanned_file.path
+        dead_letter.attempts += scanned_file.attempts
+        dead_letter.status_code = None if response is None else response.status_code
+        dead_letter.error = str(error) if response is None else response.text
+        dead_letter.save()
+        log.warning(
+            "File %s was moved to the dead letters after %s attempts.",
+            scanned_file.name,
+            scanned_file.attempts,
+        )
+
+    @staticmethod
+    def _create_files(scanned_files: list[ScannedFile]) -> list[File]:
+        files = File.objects.bulk_create(
+            [scanned_file.to_model() for scanned_file in scanned_files]
+        )
+        FileChunk.objects.bulk_create(
+            [
+                FileChunk(file=file, chunk_id=digest, index=index)
+                for file, scanned_file in zip(files, scanned_files)
+                for index, digest in enumerate(scanned_file.chunk_digests or [])
+            ]
+        )
+        return files
+
+    def _store_sent_files(self, scanned_files: list[ScannedFile]) -> None:
+        with measure_stage("store"):
+            self._store_files(scanned_files)
+
+    def _store_files(self, scanned_files: list[ScannedFile]) -> None:
+        self.job.files_hashed += hash_unhashed_files(scanned_files)
+        try:
+            with transaction.atomic():
+                files = self._create_files(scanned_files)
+        except IntegrityError:
+            # A file of the same content was sent by another job meanwhile, the unique constraints keep only one
+            files = []
+            for scanned_file in scanned_files:
+                try:
+                    with transaction.atomic():
+                        files += self._create_files([scanned_file])
+                except IntegrityError:
+                    log.warning(
+                        "File %s was sent by another job at the same time.",
+                        scanned_file.name,
+                    )
+        get_known_hashes().add(files)
+        DeadLetter.objects.filter(
+            md5_hash__in=[scanned_file.md5_hash for scanned_file in scanned_files]
+        ).delete()
+
+    @staticmethod
+    def _get_uploader(scanned_file: ScannedFile) -> str | None:
+        """
+        Return the name of the uploader of the file, if it is not sent by one request.
+        The uploaders store their progress in the DB, so they must be used by the thread owning the transaction.
+        """
+        if is_chunk_deduplicated(scanned_file):
+            return "chunks"
+        if is_resumable(scanned_file):
+            return "resumable"
+        return None
+
+    def _get_uploaders(self, rate_limiter: TokenBucket) -> dict:
+        return {
+            "chunks": ChunkUploader(rate_limiter=rate_limiter, retrier=self.retrier),
+            "resumable": ResumableUploader(
+                rate_limiter=rate_limiter, retrier=self.retrier
+            ),
+        }
+
+    def _upload(self, uploaders: dict, scanned_file: ScannedFile) -> requests.Response:
+        """Send the file by its uploader, see `_get_uploader`"""
+        # The uploads are keyed by the hash of the file
+        self.job.files_hashed += hash_unhashed_files([scanned_file])
+        return uploaders[self._get_uploader(scanned_file)].upload(scanned_file)
+
+    def _send_files_by_one(self) -> bool:
+        """
+        Send files to the external URL one-by-one.
+        Thus, this method results in multiple requests to the external endpoint.
+        The requests are sent concurrently, limited by `TRANSFER_MAX_CONCURRENCY` and `TRANSFER_RATE_LIMIT`.
+        Large files are sent by the `ChunkUploader` meanwhile, if `CHUNK_DEDUP_URL` is set, so only the chunks
+        changed since a similar file was sent are sent, or else uploaded in chunks by the `ResumableUploader`,
+        if `CHUNKED_UPLOAD_URL` is set.
+        Files, which fail even after the retries, are moved to the dead letters and the other files are sent further.
+        The transfer is stopped only if the receiver is not available (the circuit breaker opens).
+        """
+        failed = False
+        aborted = False
+        with FileSender(codec=self.codec, retrier=self.retrier) as sender:
+            uploaders = self._get_uploaders(sender.rate_limiter)
+            for batch in self._get_batches():
+                futures = {
+                    scanned_file.path: sender.submit(scanned_file)
+                    for scanned_file in batch
+                    if not scanned_file.is_duplicate
+                    and self._get_uploader(scanned_file) is None
+                }
+                sent_files = []
+                for scanned_file in batch:
+                    if scanned_file.is_duplicate:
+                        self._skip_duplicate(scanned_file)
+                        continue
+
+                    future = futures.get(scanned_file.path)
+                    if aborted and (future is None or future.cancel()):
+                        continue
+
+                    try:
+                        if future is None:
+                            response = self._upload(uploaders, scanned_file)
+                        else:
+                            response = future.result()
+                    except CircuitOpenError as e:
+                        self._log_exception(e)
+                        aborted = True
+                        continue
+                    except OSError as e:
+                        # Covers the connection errors as well as the files, which could not be read
+                        self._log_exception(e)
+                        self._dead_letter(scanned_file, error=e)
+                        failed = True
+                        continue
+
+                    if self._handle_response(scanned_file, response):
+                        sent_files.append(scanned_file)
+                    else:
+                        self._dead_letter(scanned_file, response)
+                        failed = True
+                # Files sent before a failure must be stored as well, so they are not sent again
+                self._store_sent_files(sent_files)
+
+                if aborted:
+                    return False
+        return not failed
+
+    def _send_files_bulk(self) -> bool:
+        """
+        Send files to the external URL as a bulk.
+        Thus, the files are sent to the external URL in batches, each as one request.
+        Every batch is limited by `BULK_MAX_FILES` and `BULK_MAX_BYTES`, so only files of one batch are open at once.
+        The transfer is stopped only if the receiver is not available (the circuit breaker opens).
+        """
+        failed = False
+        with FileSender(codec=self.codec, retrier=self.retrier) as sender:
+            for batch in self._get_batches():
+                new_files = []
+                for scanned_file in batch:
+                    if scanned_file.is_duplicate:
+                        self._skip_duplicate(scanned_file)
+                        continue
+                    new_files.append(scanned_file)
+
+                for bulk in size_bounded_batches(new_files):
+                    try:
+                        if not self._send_bulk(bulk, sender):
+                            failed = True
+                    except CircuitOpenError as e:
+                        self._log_exception(e)
+                        return False
+        return not failed
+
+    def _send_bulk(self, scanned_files: list[ScannedFile], sender: FileSender) -> bool:
+        """
+        Send one batch of files as one request and store them in the DB once they are sent.
+        If the request fails even after the retries, the files are sent one by one, so only the files,
+        which fail on their own, are moved to the dead letters.
+        """
+
+        def post() -> requests.Response:
+            for scanned_file in scanned_files:
+                scanned_file.attempts += 1
+            body = MultipartEncoder(
+                "files",
+                scanned_files,
+                codec=self.codec,
+                hash_field=settings.UPLOAD_HASH_FIELD,
+            )
+            return get_session().post(
+                settings.FILE_RECEIVE_URL, data=body.data, headers=body.headers
+            )
+
+        try:
+            response = self.retrier.call(post)
+        except CircuitOpenError:
+            raise
+        except OSError as e:
+            # Covers the connection errors as well as the files, which could not be read
+            self._log_exception(e)
+            response, error = None, e
+        else:
+            if self._handle_bulk_response(scanned_files, response):
+                self._store_sent_files(scanned_files)
+                return True
+            error = None
+
+        if len(scanned_files) == 1:
+            self._dead_letter(scanned_files[0], response, error)
+            return False
+        return all(
+            [self._send_alone(scanned_file, sender) for scanned_file in scanned_files]
+        )
+
+    def _send_alone(self, scanned_file: ScannedFile, sender: FileSender) -> bool:
+        """Send one file of a failed batch and store it, or move it to the dead letters if it fails as well"""
+        try:
+            response = sender.send(scanned_file)
+        except CircuitOpenError:
+            raise
+        except OSError as e:
+            self._log_exception(e)
+            self._dead_letter(scanned_file, error=e)
+            return False
+
+        if not self._handle_response(scanned_file, response):
+            self._dead_letter(scanned_file, response)
+            return False
+        self._store_sent_files([scanned_file])
+        return True
@@ -0,0 +1,104 @@
+import logging
+import os
+import secrets
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from file_manager.models import File
+from file_manager.services.fingerprint import store_fingerprint
+from file_manager.services.hashing import get_hasher
+from file_manager.services.scanner import PARTIAL_UPLOAD_PREFIX
+
+log = logging.getLogger(__name__)
+
+# Header of the upload request with the hash of the uploaded file (`<algorithm>:<hash>`), by which a duplicate
+# is rejected before its content is read
+HASH_HEADER = "HTTP_X_CONTENT_HASH"
+
+
+def is_sent(hash_algorithm: str, file_hash: str) -> bool:
+    return File.objects.filter(
+        hash_algorithm=hash_algorithm, md5_hash=file_hash
+    ).exists()
+
+
+class StoredUploadedFile(UploadedFile):
+    """File uploaded straight to the folder, `path` is None if it was a duplicate and so it was not stored"""
+
+    def __init__(self, name: str, size: int, file_hash: str, path: str | None) -> None:
+        super().__init__(file=None, name=name, size=size)
+        self.file_hash = file_hash
+        self.path = path
+
+    def open(self, mode=None):
+        if self.path is None:
+            raise ValueError("The duplicate file was not stored.")
+        return open(self.path, mode or "rb")
+
+
+class FolderUploadHandler(FileUploadHandler):
+    """
+    Write the uploaded files straight to `FILES_FOLDER_PATH` instead of spooling them to a temporary file first.
+    Each file is written to a hidden temporary file in the folder (skipped by the scans) and renamed to its name
+    once complete, so a transfer never sees a partial file. The file is hashed by `HASH_ALGORITHM` in the same pass
+    and its fingerprint is stored, so the next transfer does not read it again.
+    Files, whose content was sent already, are not stored. If the request has the `X-Content-Hash` header,
+    such a file is rejected before its content is read at all (`rejected_hash` is set then).
+    """
+
+    def __init__(self, request=None) -> None:
+        super().__init__(request)
+        self.hash_algorithm = settings.HASH_ALGORITHM
+        self.rejected_hash = None
+        self._file_hash = None
+        self._temp_file = None
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        hash_algorithm, _, file_hash = META.get(HASH_HEADER, "").partition(":")
+        if file_hash and is_sent(hash_algorithm, file_hash):
+            log.info("Uploaded file %s was sent already. Rejecting...", file_hash)
+            self.rejected_hash = file_hash
+            # The body is not parsed at all
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, *args, **kwargs) -> None:
+        super().new_file(*args, **kwargs)
+        folder_path = settings.FILES_FOLDER_PATH
+        os.makedirs(folder_path, exist_ok=True)
+        self._file_hash = get_hasher(self.hash_algorithm)
+        temp_name = f"{PARTIAL_UPLOAD_PREFIX}{secrets.token_hex(8)}"
+        self._temp_file = open(os.path.join(folder_path, temp_name), "xb")
+
+    def receive_data_chunk(self, raw_data: bytes, start: int) -> None:
+        self._temp_file.write(raw_data)
+        self._file_hash.update(raw_data)
+        return None
+
+    def _discard(self) -> None:
+        self._temp_file.close()
+        os.unlink(self._temp_file.name)
+        self._temp_file = None
+
+    def file_complete(self, file_size: int) -> StoredUploadedFile:
+        file_hash = self._file_hash.hexdigest()
+        if is_sent(self.hash_algorithm, file_hash):
+            log.info("Uploaded file %s was sent already. Skipping...", self.file_name)
+            self._discard()
+            return StoredUploadedFile(self.file_name, file_size, file_hash, None)
+
+        self._temp_file.close()
+        file_path = os.path.join(settings.FILES_FOLDER_PATH, self.file_name)
+        os.replace(self._temp_file.name, file_path)
+        self._temp_file = None
+        store_fingerprint(os.stat(file_path), file_hash, self.hash_algorithm)
+        return StoredUploadedFile(self.file_name, file_size, file_hash, file_path)
+
+    def upload_interrupted(self) -> None:
+        if self._temp_file is not None:
+            self._discard()
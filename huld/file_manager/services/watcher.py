@@ -0,0 +1,258 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import time
+from abc import ABC, abstractmethod
+from typing import Iterator
+
+from django.conf import settings
+from file_manager.services.scanner import scan_folder
+
+log = logging.getLogger(__name__)
+
+# Constants of the Linux inotify API, see `man 7 inotify`
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class FolderWatcher(ABC):
+    """
+    Report the files, which were written to or moved into the folder, once they are complete.
+    A file is complete, when it was not written to for `debounce` seconds after it has been closed or moved in,
+    so a file written in several passes is reported only once.
+    Iterating the watcher blocks and yields lists of paths of the complete files.
+    """
+
+    def __init__(
+        self,
+        folder_path: str,
+        recursive: bool | None = None,
+        debounce: float | None = None,
+    ) -> None:
+        self.folder_path = folder_path
+        self.recursive = (
+            settings.FILES_FOLDER_RECURSIVE if recursive is None else recursive
+        )
+        self.debounce = settings.WATCH_DEBOUNCE if debounce is None else debounce
+        # Path of every file being debounced mapped to the time of the last write to it
+        self._pending: dict[str, float] = {}
+
+    def __enter__(self) -> "FolderWatcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[list[str]]:
+        while True:
+            if file_paths := self.poll():
+                yield file_paths
+
+    def close(self) -> None:
+        pass
+
+    def poll(self, timeout: float | None = None) -> list[str]:
+        """Wait for the changes at most `timeout` seconds (until the next file is complete by default)"""
+        self._wait(self._get_timeout(timeout))
+
+        now = time.monotonic()
+        ready = [
+            file_path
+            for file_path, written_at in self._pending.items()
+            if now - written_at >= self.debounce
+        ]
+        for file_path in ready:
+            del self._pending[file_path]
+        return sorted(ready)
+
+    def _get_timeout(self, timeout: float | None) -> float | None:
+        if not self._pending:
+            return timeout
+
+        next_ready = min(self._pending.values()) + self.debounce - time.monotonic()
+        next_ready = max(next_ready, 0)
+        return next_ready if timeout is None else min(timeout, next_ready)
+
+    def _touch(self, file_path: str) -> None:
+        self._pending[file_path] = time.monotonic()
+
+    def _touch_folder(self, folder_path: str) -> None:
+        """Treat all the files of the folder as written, e.g. after the events were lost"""
+        for scanned_file in scan_folder(folder_path, self.recursive):
+            self._touch(scanned_file.path)
+
+    @abstractmethod
+    def _wait(self, timeout: float | None) -> None:
+        """Wait for the events up to `timeout` seconds (forever if None) and touch the written files"""
+
+
+class InotifyWatcher(FolderWatcher):
+    """
+    Watcher based on the Linux inotify API, so the cost of one event does not depend on the size of the folder.
+    A watch is added to every subfolder in the recursive mode, including the ones created later.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._libc = _load_libc()
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 has failed")
+        self._folders: dict[int, str] = {}
+        try:
+            self._add_watch(self.folder_path)
+        except OSError:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _add_watch(self, folder_path: str) -> None:
+        watch = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(folder_path), WATCH_MASK
+        )
+        if watch < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), folder_path)
+        self._folders[watch] = folder_path
+
+        if self.recursive:
+            with os.scandir(folder_path) as entries:
+                subfolders = [
+                    entry.path
+                    for entry in entries
+                    if entry.is_dir(follow_symlinks=False)
+                ]
+            for subfolder in subfolders:
+                self._add_watch(subfolder)
+
+    def _wait(self, timeout: float | None) -> None:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return
+
+        data = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            watch, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            start, offset = offset, offset + length
+            name = os.fsdecode(data[start:offset].rstrip(b"\0"))
+            self._handle_event(watch, mask, name)
+
+    def _handle_event(self, watch: int, mask: int, name: str) -> None:
+        if mask & IN_Q_OVERFLOW:
+            log.warning("Events of the folder were lost, the folder is scanned again.")
+            self._touch_folder(self.folder_path)
+            return
+        if mask & IN_IGNORED:
+            self._folders.pop(watch, None)
+            return
+
+        folder_path = self._folders.get(watch)
+        if folder_path is None:
+            return
+        path = os.path.join(folder_path, name)
+
+        if mask & IN_ISDIR:
+            if self.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                try:
+                    self._add_watch(path)
+                except OSError as e:
+                    log.warning(
+                        "The folder `%s` could not be watched: %s", path, str(e)
+                    )
+                    return
+                # Files could have been written to the folder before the watch was added
+                self._touch_folder(path)
+        elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            self._touch(path)
+        elif mask & IN_MODIFY and path in self._pending:
+            # The file is written again, so it is not complete yet
+            self._touch(path)
+
+
+class PollingWatcher(FolderWatcher):
+    """
+    Fallback watcher for the platforms without inotify, which scans the whole folder every `poll_interval` seconds.
+    A file is reported, when its size and modification time were not changed for `debounce` seconds.
+    """
+
+    def __init__(self, *args, poll_interval: float | None = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.poll_interval = (
+            settings.WATCH_POLL_INTERVAL if poll_interval is None else poll_interval
+        )
+        # A file must be seen unchanged by two scans at least, before it is complete
+        self.debounce = max(self.debounce, self.poll_interval)
+        # Files existing before the watcher was started are not reported
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        try:
+            return {
+                scanned_file.path: (
+                    scanned_file.size,
+                    scanned_file.stat_result.st_mtime_ns,
+                )
+                for scanned_file in scan_folder(self.folder_path, self.recursive)
+            }
+        except FileNotFoundError:
+            log.error("The folder `%s` does not exist.", self.folder_path)
+            return {}
+
+    def _get_timeout(self, timeout: float | None) -> float:
+        timeout = super()._get_timeout(timeout)
+        return (
+            self.poll_interval if timeout is None else min(timeout, self.poll_interval)
+        )
+
+    def _wait(self, timeout: float) -> None:
+        time.sleep(timeout)
+
+        snapshot = self._scan()
+        for file_path, state in snapshot.items():
+            if self._snapshot.get(file_path) != state:
+                self._touch(file_path)
+        self._snapshot = snapshot
+
+
+def _load_libc() -> ctypes.CDLL:
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        raise OSError("inotify is not supported by the platform")
+    return libc
+
+
+def create_watcher(folder_path: str, backend: str = "auto", **kwargs) -> FolderWatcher:
+    """
+    Create the watcher of the folder by the `backend` (`inotify`, `polling` or `auto`).
+    The `auto` backend uses inotify, if the platform supports it, and falls back to polling otherwise.
+    """
+    if backend == "polling":
+        return PollingWatcher(folder_path, **kwargs)
+
+    poll_interval = kwargs.pop("poll_interval", None)
+    try:
+        return InotifyWatcher(folder_path, **kwargs)
+    except OSError as e:
+        if backend == "inotify" or isinstance(e, FileNotFoundError):
+            raise
+        log.warning("Inotify is not available (%s), polling the folder instead.", e)
+        return PollingWatcher(folder_path, poll_interval=poll_interval, **kwargs)
@@ -0,0 +1,243 @@
+import base64
+import gzip
+import hashlib
+import itertools
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import requests
+import zstandard
+from file_manager.services.compression import PART_ENCODING_HEADER
+from file_manager.services.hashing import get_hasher
+
+from rest_framework.utils import json
+
+
+def make_response(status_code: int, headers: dict | None = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = b""
+    return response
+
+
+def parse_parts(body: bytes, boundary: str) -> list[tuple[dict, bytes]]:
+    """Split the multipart body to the headers and the content of its parts"""
+    parts = []
+    for part in body.split(f"--{boundary}".encode())[1:-1]:
+        head, content = part.split(b"\r\n\r\n", 1)
+        headers = dict(
+            line.split(": ", 1) for line in head.decode().strip().split("\r\n")
+        )
+        parts.append((headers, content.removesuffix(b"\r\n")))
+    return parts
+
+
+class MultipartReceiver:
+    """
+    In-memory reference receiver of the files sent in the multipart body, which decodes the compressed parts.
+    Meant to replace `requests.Session.request`, it advertises the `accepted_codecs` in response to `OPTIONS`.
+    """
+
+    def __init__(self, accepted_codecs: str = "") -> None:
+        self.accepted_codecs = accepted_codecs
+        self.files: dict[str, bytes] = {}
+        self.encodings: dict[str, str | None] = {}
+
+    @staticmethod
+    def _decode(content: bytes, encoding: str | None) -> bytes:
+        if encoding == "gzip":
+            return gzip.decompress(content)
+        if encoding == "zstd":
+            return zstandard.ZstdDecompressor().decompressobj().decompress(content)
+        return content
+
+    def request(self, method: str, url: str, headers=None, data=None, **kwargs):
+        if method == "OPTIONS":
+            return make_response(200, {PART_ENCODING_HEADER: self.accepted_codecs})
+        if method != "POST":
+            return make_response(405)
+
+        body = data.read() if hasattr(data, "read") else b"".join(data)
+        boundary = headers["Content-Type"].partition("boundary=")[2]
+        for part_headers, content in parse_parts(body, boundary):
+            file_name = re.search(
+                r'filename="([^"]*)"', part_headers["Content-Disposition"]
+            )
+            if file_name is None:
+                continue
+            encoding = part_headers.get("Content-Encoding")
+            self.files[file_name[1]] = self._decode(content, encoding)
+            self.encodings[file_name[1]] = encoding
+        return make_response(200)
+
+
+class TusReceiver:
+    """
+    In-memory stand-in for a receiver of the resumable uploads by the tus protocol.
+    Meant to replace `requests.Session.request`, the connection can be dropped before the chosen PATCH requests.
+    """
+
+    def __init__(self, url: str, drop_on_patches: set[int] | None = None) -> None:
+        self.url = url
+        self.drop_on_patches = drop_on_patches or set()
+        self.uploads: dict[str, dict] = {}
+        self.patches = 0
+        self.bytes_received = 0
+        self._ids = itertools.count(1)
+
+    def files(self) -> dict[str, bytes]:
+        """Return the content of the finished uploads by the names of the files"""
+        return {
+            upload["name"]: bytes(upload["data"])
+            for upload in self.uploads.values()
+            if len(upload["data"]) == upload["length"]
+        }
+
+    def request(self, method: str, url: str, headers=None, data=None, **kwargs):
+        headers = headers or {}
+        if headers.get("Tus-Resumable") != "1.0.0":
+            return make_response(412)
+
+        if method == "POST" and url == self.url:
+            _, name = headers["Upload-Metadata"].split(" ")
+            location = f"/files/{next(self._ids)}"
+            self.uploads[location] = {
+                "name": base64.b64decode(name).decode(),
+                "length": int(headers["Upload-Length"]),
+                "data": bytearray(),
+            }
+            return make_response(201, {"Location": location})
+
+        upload = self.uploads.get(urlsplit(url).path)
+        if upload is None:
+            return make_response(404)
+
+        if method == "HEAD":
+            return make_response(
+                200,
+                {
+                    "Upload-Offset": str(len(upload["data"])),
+                    "Upload-Length": str(upload["length"]),
+                },
+            )
+
+        if method == "PATCH":
+            self.patches += 1
+            if self.patches in self.drop_on_patches:
+                raise requests.ConnectionError("Connection dropped")
+            if int(headers["Upload-Offset"]) != len(upload["data"]):
+                return make_response(409)
+            upload["data"] += data
+            self.bytes_received += len(data)
+            return make_response(204, {"Upload-Offset": str(len(upload["data"]))})
+
+        return make_response(405)
+
+
+class ChunkReceiver:
+    """
+    In-memory reference receiver of the files sent by the content-defined chunks.
+    Meant to replace `requests.Session.request`, it stores the chunks by their digests and assembles the files
+    from the manifests.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.chunks: dict[str, bytes] = {}
+        self.files: dict[str, bytes] = {}
+        self.bytes_received = 0
+
+    def request(self, method: str, url: str, data=None, **kwargs):
+        manifest = kwargs.get("json")
+        path = url.removeprefix(self.url)
+        if method == "PUT" and path.startswith("chunks/"):
+            digest = path.removeprefix("chunks/")
+            if hashlib.sha256(data).hexdigest() != digest:
+                return make_response(400)
+            self.chunks[digest] = data
+            self.bytes_received += len(data)
+            return make_response(201)
+
+        if method == "POST" and path == "files/":
+            missing = [
+                chunk["digest"]
+                for chunk in manifest["chunks"]
+                if chunk["digest"] not in self.chunks
+            ]
+            if missing:
+                response = make_response(409)
+                response._content = json.dumps({"missing": missing}).encode()
+                return response
+
+            content = b"".join(
+                self.chunks[chunk["digest"]] for chunk in manifest["chunks"]
+            )
+            file_hash = get_hasher(manifest["hash_algorithm"])
+            file_hash.update(content)
+            if file_hash.hexdigest() != manifest["hash"]:
+                return make_response(400)
+            self.files[manifest["name"]] = content
+            return make_response(201)
+
+        return make_response(405)
+
+
+class RawBodyReceiver:
+    """
+    Local HTTP server receiving the files sent as the raw body of the requests, see `RawBodySender`.
+    Meant to be used as a context manager, the server runs in a background thread meanwhile.
+    The receiver can close the connection after the chosen requests to test the reconnection.
+    """
+
+    def __init__(self, close_after_requests: set[int] | None = None) -> None:
+        self.close_after_requests = close_after_requests or set()
+        self.files: dict[str, bytes] = {}
+        self.requests = 0
+        self.connections = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/files/"
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                receiver.connections += 1
+
+            def do_POST(self) -> None:
+                receiver.requests += 1
+                data = self.rfile.read(int(self.headers["Content-Length"]))
+                disposition = self.headers.get("Content-Disposition", "")
+                file_name = unquote(disposition.partition("filename*=UTF-8''")[2])
+                receiver.files[file_name] = data
+
+                self.send_response(201)
+                self.send_header("Content-Length", "0")
+                if receiver.requests in receiver.close_after_requests:
+                    self.send_header("Connection", "close")
+                    self.close_connection = True
+                self.end_headers()
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "RawBodyReceiver":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._server.shutdown()
+        self._server.server_close()
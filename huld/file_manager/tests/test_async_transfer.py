@@ -0,0 +1,123 @@
+import os
+import tempfile
+from unittest import mock
+from unittest.mock import AsyncMock, MagicMock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from file_manager.models import DeadLetter, File, TransferJob
+from file_manager.tests.receivers import RawBodyReceiver, TusReceiver
+
+from rest_framework import status
+
+MOCK_FILE_RECEIVE_URL = "https://test-url.com/"
+MOCK_CHUNKED_UPLOAD_URL = "https://test-url.com/files/"
+VALID_FILES = [("file1.txt", "test-text"), ("file2.txt", "test-text2")]
+DUPLICATE_FILES = [("file1.txt", "test-text"), ("file2.txt", "test-text")]
+
+
+@override_settings(FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL, TRANSFER_RETRY_BASE_DELAY=0)
+class AsyncTransferViewTestCase(TestCase):
+    def _post(self, files: list) -> dict:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for file_name, file_content in files:
+                with open(os.path.join(temp_dir, file_name), "w") as temp_file:
+                    temp_file.write(file_content)
+
+            with override_settings(FILES_FOLDER_PATH=temp_dir):
+                return self.client.post(reverse("transfer-async"))
+
+    @mock.patch("file_manager.services.async_transfer.httpx.AsyncClient.post")
+    def test_transfer_files(self, mock_post: AsyncMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+
+        with self.assertLogs("file_manager.services.transfer") as log_mock:
+            response = self._post(VALID_FILES)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["status"], TransferJob.Status.SUCCEEDED)
+        self.assertEqual(response.json()["files_sent"], 2)
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(mock_post.call_args.args[0], MOCK_FILE_RECEIVE_URL)
+        self.assertIn(
+            "File file1.txt were sent. Response:", log_mock.records[0].getMessage()
+        )
+        self.assertEqual(File.objects.count(), 2)
+
+    @override_settings(UPLOAD_RAW_BODY=True)
+    def test_files_are_sent_as_raw_body(self):
+        with RawBodyReceiver() as receiver, override_settings(
+            FILE_RECEIVE_URL=receiver.url
+        ):
+            response = self._post(VALID_FILES)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["files_sent"], 2)
+        self.assertEqual(
+            receiver.files,
+            {file_name: content.encode() for file_name, content in VALID_FILES},
+        )
+
+    @override_settings(
+        CHUNKED_UPLOAD_URL=MOCK_CHUNKED_UPLOAD_URL, CHUNKED_UPLOAD_THRESHOLD=10
+    )
+    @mock.patch("file_manager.services.async_transfer.httpx.AsyncClient.post")
+    def test_large_files_are_uploaded_in_chunks(self, mock_post: AsyncMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+        receiver = TusReceiver(MOCK_CHUNKED_UPLOAD_URL)
+
+        with mock.patch(
+            "file_manager.services.sender.requests.Session.request",
+            side_effect=receiver.request,
+        ):
+            response = self._post(VALID_FILES)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["files_sent"], 2)
+        # Only the file below the threshold is sent by one request
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(receiver.files(), {"file2.txt": b"test-text2"})
+
+    @mock.patch("file_manager.services.async_transfer.httpx.AsyncClient.post")
+    def test_duplicate_files(self, mock_post: AsyncMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+
+        response = self._post(DUPLICATE_FILES)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["files_skipped"], 1)
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(File.objects.filter(name="file1.txt").count(), 1)
+        self.assertEqual(File.objects.filter(name="file2.txt").count(), 0)
+
+    @mock.patch("file_manager.services.async_transfer.httpx.AsyncClient.post")
+    @override_settings(SEND_FILES_BULK=True, BULK_MAX_FILES=1)
+    def test_retried_batch_bulk(self, mock_post: AsyncMock):
+        mock_post.side_effect = [
+            MagicMock(status_code=status.HTTP_503_SERVICE_UNAVAILABLE),
+            MagicMock(status_code=status.HTTP_200_OK),
+            MagicMock(status_code=status.HTTP_200_OK),
+        ]
+
+        with self.assertLogs("file_manager.services.transfer"):
+            response = self._post(VALID_FILES)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["files_sent"], 2)
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(File.objects.count(), 2)
+
+    @mock.patch("file_manager.services.async_transfer.httpx.AsyncClient.post")
+    def test_connection_error(self, mock_post: AsyncMock):
+        mock_post.side_effect = ConnectionError()
+
+        with self.assertLogs("file_manager.services.transfer") as log_mock:
+            response = self._post(VALID_FILES)
+
+        self.assertEqual(response.status_code, status.HTTP_424_FAILED_DEPENDENCY)
+        self.assertIn(
+            "Files were NOT sent. An Exception has been raised: ",
+            [record.getMessage() for record in log_mock.records],
+        )
+        self.assertEqual(File.objects.count(), 0)
+        self.assertEqual(DeadLetter.objects.count(), 2)
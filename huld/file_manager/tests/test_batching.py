@@ -0,0 +1,41 @@
+import os
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase
+from file_manager.services.batching import batched, size_bounded_batches
+from file_manager.services.dedup import ScannedFile
+
+
+def _scanned_file(name: str, size: int) -> ScannedFile:
+    return ScannedFile(
+        name=name, path=name, stat_result=MagicMock(spec=os.stat_result, st_size=size)
+    )
+
+
+class BatchingTestCase(SimpleTestCase):
+    def test_batched(self):
+        self.assertEqual(list(batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(batched([], 2)), [])
+
+    def test_batches_are_limited_by_count(self):
+        files = [_scanned_file(f"file{index}", 1) for index in range(5)]
+
+        batches = list(size_bounded_batches(files, max_files=2, max_bytes=100))
+
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+
+    def test_batches_are_limited_by_size(self):
+        files = [
+            _scanned_file("file1", 40),
+            _scanned_file("file2", 40),
+            _scanned_file("file3", 40),
+            _scanned_file("big", 500),
+            _scanned_file("file4", 10),
+        ]
+
+        batches = list(size_bounded_batches(files, max_files=10, max_bytes=100))
+
+        self.assertEqual(
+            [[scanned_file.name for scanned_file in batch] for batch in batches],
+            [["file1", "file2"], ["file3"], ["big"], ["file4"]],
+        )
@@ -0,0 +1,124 @@
+import gzip
+import hashlib
+import os
+import tempfile
+
+import requests
+from django.test import TestCase, override_settings
+from file_manager.services.benchmark import (
+    BenchmarkReceiver, CorpusSpec, generate_corpus, measure_transfer,
+    parse_size_distribution, percentile, summarize
+)
+
+
+def get_hashes(folder_path: str) -> dict[str, str]:
+    hashes = {}
+    for file_name in sorted(os.listdir(folder_path)):
+        with open(os.path.join(folder_path, file_name), "rb") as file:
+            hashes[file_name] = hashlib.md5(file.read()).hexdigest()
+    return hashes
+
+
+class CorpusTestCase(TestCase):
+    def _generate(self, spec: CorpusSpec) -> tuple[str, int]:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        return temp_dir.name, generate_corpus(temp_dir.name, spec)
+
+    def test_parse_size_distribution(self):
+        self.assertEqual(
+            parse_size_distribution("4KiB:80,1MiB:20,10"),
+            [(4096, 80.0), (1024**2, 20.0), (10, 1.0)],
+        )
+
+    def test_corpus_is_reproducible(self):
+        spec = CorpusSpec(count=20, sizes=[(100, 1), (5000, 1)], duplicate_ratio=0.3)
+
+        first_path, first_size = self._generate(spec)
+        second_path, second_size = self._generate(spec)
+
+        self.assertEqual(first_size, second_size)
+        self.assertEqual(get_hashes(first_path), get_hashes(second_path))
+
+    def test_duplicates(self):
+        folder_path, _ = self._generate(
+            CorpusSpec(count=100, sizes=[(1000, 1)], duplicate_ratio=0.5)
+        )
+
+        unique_count = len(set(get_hashes(folder_path).values()))
+        self.assertGreater(unique_count, 30)
+        self.assertLess(unique_count, 70)
+
+    def test_compressibility(self):
+        for compressibility, min_ratio, max_ratio in [(0, 0.95, 1.1), (0.75, 0, 0.35)]:
+            folder_path, size = self._generate(
+                CorpusSpec(
+                    count=1, sizes=[(200_000, 1)], compressibility=compressibility
+                )
+            )
+            with open(
+                os.path.join(folder_path, os.listdir(folder_path)[0]), "rb"
+            ) as file:
+                ratio = len(gzip.compress(file.read())) / size
+
+            self.assertGreater(ratio, min_ratio, compressibility)
+            self.assertLess(ratio, max_ratio, compressibility)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 50))
+
+
+class BenchmarkReceiverTestCase(TestCase):
+    def test_files_are_counted(self):
+        with BenchmarkReceiver() as receiver:
+            multipart = requests.post(
+                receiver.url,
+                files=[("files", ("a.txt", b"a")), ("files", ("b.txt", b"b"))],
+            )
+            raw_body = requests.post(receiver.url, data=b"content")
+            chunked = requests.post(
+                receiver.url,
+                data=iter([b"x" * 10, b"y" * 100_000]),
+            )
+            samples = receiver.pop_samples()
+            self.assertEqual(receiver.pop_samples(), [])
+
+        for response in [multipart, raw_body, chunked]:
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual([files for _, files in samples], [2, 1, 1])
+
+
+@override_settings(
+    TRANSFER_RETRY_BASE_DELAY=0,
+    TRANSFER_RATE_LIMIT=1000,
+    CHUNK_DEDUP_URL=None,
+    CHUNKED_UPLOAD_URL=None,
+)
+class MeasureTransferTestCase(TestCase):
+    def test_measure_bulk_transfer(self):
+        spec = CorpusSpec(count=30, sizes=[(100, 1), (10_000, 1)], duplicate_ratio=0.2)
+        with tempfile.TemporaryDirectory() as temp_dir, BenchmarkReceiver() as receiver:
+            corpus_size = generate_corpus(temp_dir, spec)
+            with override_settings(
+                FILES_FOLDER_PATH=temp_dir,
+                FILE_RECEIVE_URL=receiver.url,
+                SEND_FILES_BULK=True,
+            ):
+                measurements = measure_transfer()
+            result = summarize(spec, corpus_size, measurements, receiver.pop_samples())
+
+        self.assertEqual(result["status"], "succeeded")
+        self.assertEqual(result["files_scanned"], 30)
+        self.assertEqual(result["files_sent"] + result["files_skipped"], 30)
+        self.assertGreater(result["files_skipped"], 0)
+        self.assertGreater(result["db_queries"], 0)
+        self.assertEqual(result["corpus"]["bytes"], corpus_size)
+        self.assertGreater(result["files_per_s"], 0)
+        self.assertGreater(result["mb_per_s"], 0)
+        self.assertGreater(result["peak_rss_mib"], 0)
+        self.assertLess(result["requests"], result["files_sent"])
+        self.assertGreater(result["latency_p99_ms"], 0)
@@ -0,0 +1,149 @@
+import os
+import random
+import tempfile
+from unittest import mock
+from unittest.mock import MagicMock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from file_manager.models import Chunk, ChunkManifest, File
+from file_manager.services.chunk_dedup import ChunkUploader
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.fingerprint import hash_unhashed_files
+from file_manager.tests.receivers import ChunkReceiver, make_response
+
+from rest_framework import status
+
+MOCK_CHUNK_DEDUP_URL = "https://test-url.com/dedup/"
+CONTENT = random.Random(0).randbytes(64 * 1024)
+
+
+@override_settings(
+    CHUNK_DEDUP_URL=MOCK_CHUNK_DEDUP_URL,
+    CHUNK_DEDUP_MIN_SIZE=256,
+    CHUNK_DEDUP_AVG_SIZE=1024,
+    CHUNK_DEDUP_MAX_SIZE=4096,
+)
+class ChunkUploaderTestCase(TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.receiver = ChunkReceiver(MOCK_CHUNK_DEDUP_URL)
+
+    def _upload(self, file_name: str, content: bytes):
+        file_path = os.path.join(self.temp_dir, file_name)
+        with open(file_path, "wb") as file:
+            file.write(content)
+        scanned_file = ScannedFile(
+            name=file_name, path=file_path, stat_result=os.stat(file_path)
+        )
+        hash_unhashed_files([scanned_file])
+
+        with mock.patch(
+            "file_manager.services.sender.requests.Session.request",
+            side_effect=self.receiver.request,
+        ):
+            response = ChunkUploader().upload(scanned_file)
+        return response, scanned_file
+
+    def test_file_is_assembled_from_chunks(self):
+        response, scanned_file = self._upload("app.log", CONTENT)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.receiver.files, {"app.log": CONTENT})
+        self.assertEqual(self.receiver.bytes_received, len(CONTENT))
+        self.assertEqual(Chunk.objects.count(), len(scanned_file.chunk_digests))
+
+    def test_only_changed_chunks_are_sent(self):
+        self._upload("app.log", CONTENT)
+        bytes_received = self.receiver.bytes_received
+        appended = CONTENT + b"one more line\n"
+
+        response, _ = self._upload("app.log.1", appended)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.receiver.files["app.log.1"], appended)
+        self.assertLess(self.receiver.bytes_received - bytes_received, 2 * 4096)
+
+    def test_chunks_lost_by_receiver_are_sent_again(self):
+        self._upload("app.log", CONTENT)
+        self.receiver.chunks.clear()
+
+        response, _ = self._upload("app.log.1", CONTENT)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.receiver.files["app.log.1"], CONTENT)
+        self.assertEqual(self.receiver.bytes_received, 2 * len(CONTENT))
+
+    def test_file_is_split_once(self):
+        with mock.patch.object(
+            ChunkUploader,
+            "_send_manifest",
+            return_value=MagicMock(status_code=status.HTTP_503_SERVICE_UNAVAILABLE),
+        ):
+            response, _ = self._upload("app.log", CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        with mock.patch(
+            "file_manager.services.chunk_dedup.iter_chunks"
+        ) as mock_iter_chunks:
+            response, _ = self._upload("app.log", CONTENT)
+
+        mock_iter_chunks.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.receiver.files, {"app.log": CONTENT})
+        self.assertEqual(self.receiver.bytes_received, len(CONTENT))
+        self.assertFalse(ChunkManifest.objects.exists())
+
+    def test_conflict_without_missing_chunks_is_error(self):
+        response = make_response(status.HTTP_409_CONFLICT)
+        response._content = b"<html>Bad gateway</html>"
+
+        with mock.patch.object(
+            ChunkUploader, "_send_manifest", return_value=response
+        ), self.assertRaises(OSError):
+            self._upload("app.log", CONTENT)
+
+    def test_slow_chunker_is_warned_about(self):
+        with mock.patch(
+            "file_manager.services.chunking.pyfastcdc", None
+        ), self.assertLogs("file_manager.services.chunk_dedup", "WARNING"):
+            ChunkUploader()
+
+
+@override_settings(
+    TRANSFER_JOBS_ASYNC=False,
+    FILE_RECEIVE_URL="https://test-url.com/",
+    CHUNK_DEDUP_URL=MOCK_CHUNK_DEDUP_URL,
+    CHUNK_DEDUP_THRESHOLD=1024,
+    CHUNK_DEDUP_MIN_SIZE=256,
+    CHUNK_DEDUP_AVG_SIZE=1024,
+    CHUNK_DEDUP_MAX_SIZE=4096,
+)
+class ChunkDedupTransferTestCase(TestCase):
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_large_files_are_sent_by_chunks(self, mock_post: MagicMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+        receiver = ChunkReceiver(MOCK_CHUNK_DEDUP_URL)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for file_name, content in [("app.log", CONTENT), ("small.txt", b"test")]:
+                with open(os.path.join(temp_dir, file_name), "wb") as file:
+                    file.write(content)
+
+            with override_settings(FILES_FOLDER_PATH=temp_dir), mock.patch(
+                "file_manager.services.sender.requests.Session.request",
+                side_effect=receiver.request,
+            ):
+                response = self.client.post(reverse("transfer"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["files_sent"], 2)
+        self.assertEqual(receiver.files, {"app.log": CONTENT})
+        self.assertEqual(mock_post.call_count, 1)
+        file = File.objects.get(name="app.log")
+        self.assertEqual(
+            b"".join(receiver.chunks[chunk.chunk_id] for chunk in file.chunks.all()),
+            CONTENT,
+        )
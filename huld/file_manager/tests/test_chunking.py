@@ -0,0 +1,66 @@
+import io
+import random
+from unittest import mock
+
+from django.test import SimpleTestCase
+from file_manager.services.chunking import get_chunker, iter_chunks
+
+MIN_SIZE = 256
+AVG_SIZE = 1024
+MAX_SIZE = 4096
+
+
+def _split(content: bytes) -> list[bytes]:
+    return list(iter_chunks(io.BytesIO(content), MIN_SIZE, AVG_SIZE, MAX_SIZE))
+
+
+class ChunkingTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.content = random.Random(0).randbytes(64 * 1024)
+
+    def test_chunks_make_up_the_content(self):
+        chunks = _split(self.content)
+
+        self.assertEqual(b"".join(chunks), self.content)
+        self.assertTrue(
+            all(MIN_SIZE <= len(chunk) <= MAX_SIZE for chunk in chunks[:-1])
+        )
+        self.assertGreater(len(chunks), 64 * 1024 // MAX_SIZE)
+
+    def test_chunks_do_not_depend_on_reads(self):
+        class SlowReader(io.BytesIO):
+            def read(self, size=-1):
+                return super().read(min(size, 100))
+
+        chunks = list(
+            iter_chunks(SlowReader(self.content), MIN_SIZE, AVG_SIZE, MAX_SIZE)
+        )
+
+        self.assertEqual(chunks, _split(self.content))
+
+    def test_insertion_changes_only_nearby_chunks(self):
+        position = len(self.content) // 2
+        changed = self.content[:position] + b"inserted line\n" + self.content[position:]
+
+        chunks = set(_split(self.content))
+        changed_chunks = _split(changed)
+
+        new_chunks = [chunk for chunk in changed_chunks if chunk not in chunks]
+        self.assertLessEqual(len(new_chunks), 2)
+        self.assertLess(sum(map(len, new_chunks)), 2 * MAX_SIZE)
+
+    def test_empty_file_has_no_chunks(self):
+        self.assertEqual(_split(b""), [])
+
+
+class GearChunkingTestCase(ChunkingTestCase):
+    """Same tests of the chunker in Python, which is used if `pyfastcdc` is not installed"""
+
+    def setUp(self) -> None:
+        super().setUp()
+        patcher = mock.patch("file_manager.services.chunking.pyfastcdc", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_chunker(self):
+        self.assertEqual(get_chunker(MIN_SIZE, AVG_SIZE, MAX_SIZE), "gear")
@@ -0,0 +1,205 @@
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from unittest.mock import MagicMock
+
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from file_manager.models import ContentClaim, File, FileClaim, TransferJob
+from file_manager.services.claims import (
+    claim_contents, claim_files, get_content_key, release_files
+)
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.fingerprint import hash_scanned_files
+from file_manager.services.jobs import get_transfer_lock_name, queue_job
+from file_manager.services.locking import _lock_key
+
+from rest_framework import status
+
+MOCK_FILE_RECEIVE_URL = "https://test-url.com/"
+
+
+@override_settings(
+    FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL,
+    TRANSFER_JOBS_ASYNC=False,
+    TRANSFER_RETRY_BASE_DELAY=0,
+)
+class ClaimsTestCase(TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.scanned_files = []
+        for file_name, file_content in [("file1.txt", "test"), ("file2.txt", "text")]:
+            path = os.path.join(self.temp_dir, file_name)
+            with open(path, "w") as temp_file:
+                temp_file.write(file_content)
+            self.scanned_files.append(ScannedFile(file_name, path, os.stat(path)))
+        self.job = TransferJob.objects.create()
+        self.other_job = TransferJob.objects.create()
+
+    def test_file_claimed_by_other_job_is_skipped(self):
+        FileClaim.objects.create(
+            file_number=self.scanned_files[0].file_number, job=self.other_job
+        )
+
+        with self.assertLogs("file_manager.services.claims"):
+            claimed_files = claim_files(self.job, self.scanned_files)
+
+        self.assertEqual(claimed_files, self.scanned_files[1:])
+
+    def test_stale_claim_is_taken_over(self):
+        claim = FileClaim.objects.create(
+            file_number=self.scanned_files[0].file_number, job=self.other_job
+        )
+        FileClaim.objects.filter(pk=claim.pk).update(
+            claimed_at=timezone.now() - timedelta(days=1)
+        )
+
+        claimed_files = claim_files(self.job, self.scanned_files)
+
+        self.assertEqual(claimed_files, self.scanned_files)
+        self.assertEqual(FileClaim.objects.filter(job=self.job).count(), 2)
+
+    def test_only_own_claims_are_released(self):
+        claim_files(self.job, self.scanned_files[:1])
+        claim_files(self.other_job, self.scanned_files[1:])
+
+        release_files(self.job, self.scanned_files)
+
+        self.assertEqual(
+            list(FileClaim.objects.values_list("job", flat=True)), [self.other_job.pk]
+        )
+
+    def _copy(self, scanned_file: ScannedFile, file_name: str) -> ScannedFile:
+        path = os.path.join(self.temp_dir, file_name)
+        with open(scanned_file.path, "rb") as source, open(path, "wb") as copy:
+            copy.write(source.read())
+        return ScannedFile(file_name, path, os.stat(path))
+
+    def test_content_claimed_by_other_job_is_skipped(self):
+        copy = self._copy(self.scanned_files[0], "copy.txt")
+        hash_scanned_files([copy])
+        claim_contents(self.other_job, [copy])
+        hash_scanned_files(self.scanned_files)
+
+        with self.assertLogs("file_manager.services.claims"):
+            claimed_files = claim_contents(self.job, self.scanned_files)
+
+        self.assertEqual(claimed_files, self.scanned_files[1:])
+
+    @override_settings(DEDUP_SAMPLE_SIZE=0)
+    def test_content_is_claimed_by_hash_without_samples(self):
+        hash_scanned_files(self.scanned_files)
+
+        claim_contents(self.job, self.scanned_files)
+
+        self.assertEqual(
+            set(ContentClaim.objects.values_list("content_key", flat=True)),
+            {f"md5:{scanned_file.md5_hash}" for scanned_file in self.scanned_files},
+        )
+
+    def test_content_claims_are_released(self):
+        claim_contents(self.job, self.scanned_files)
+        self.assertEqual(
+            set(ContentClaim.objects.values_list("content_key", flat=True)),
+            {get_content_key(scanned_file) for scanned_file in self.scanned_files},
+        )
+
+        release_files(self.job, self.scanned_files)
+
+        self.assertFalse(ContentClaim.objects.exists())
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_transfer_skips_claimed_files(self, mock_post: MagicMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+        FileClaim.objects.create(
+            file_number=self.scanned_files[0].file_number, job=self.other_job
+        )
+
+        with override_settings(FILES_FOLDER_PATH=self.temp_dir), self.assertLogs(
+            "file_manager.services.claims"
+        ):
+            response = self.client.post(reverse("transfer"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["files_sent"], 1)
+        self.assertEqual(response.json()["files_skipped"], 1)
+        self.assertEqual(
+            list(File.objects.values_list("name", flat=True)), ["file2.txt"]
+        )
+        # The claims of the sent files are released, the claim of the other job stays
+        self.assertEqual(
+            list(FileClaim.objects.values_list("job", flat=True)), [self.other_job.pk]
+        )
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_sent_files_are_not_claimed_again(self, mock_post: MagicMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+        with override_settings(FILES_FOLDER_PATH=self.temp_dir):
+            self.client.post(reverse("transfer"))
+
+            with mock.patch.object(
+                FileClaim.objects, "bulk_create"
+            ) as bulk_create, mock.patch.object(
+                ContentClaim.objects, "bulk_create"
+            ) as bulk_create_contents:
+                response = self.client.post(reverse("transfer"))
+
+        self.assertEqual(response.json()["files_skipped"], 2)
+        bulk_create.assert_not_called()
+        bulk_create_contents.assert_not_called()
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_file_sent_before_being_claimed_is_skipped(self, mock_post: MagicMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+
+        def claim_files(job: TransferJob, scanned_files: list[ScannedFile]):
+            # Another job sends the file and releases it after it was checked for duplicates
+            self.scanned_files[0].to_model().save()
+            return scanned_files
+
+        with override_settings(FILES_FOLDER_PATH=self.temp_dir), mock.patch(
+            "file_manager.services.transfer.claim_files", side_effect=claim_files
+        ):
+            response = self.client.post(reverse("transfer"))
+
+        self.assertEqual(response.json()["files_sent"], 1)
+        self.assertEqual(response.json()["files_skipped"], 1)
+        self.assertEqual(mock_post.call_count, 1)
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_running_transfer_conflicts(self, mock_post: MagicMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+        # The lock is held by another connection, as by another worker of the server
+        other_connection = connections.create_connection("default")
+        self.addCleanup(other_connection.close)
+        with override_settings(FILES_FOLDER_PATH=self.temp_dir):
+            with other_connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_advisory_lock(%s)",
+                    [_lock_key(get_transfer_lock_name())],
+                )
+            response = self.client.post(reverse("transfer"))
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(mock_post.call_count, 0)
+
+        other_connection.close()
+        with override_settings(FILES_FOLDER_PATH=self.temp_dir):
+            response = self.client.post(reverse("transfer"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_queued_job_is_reused(self):
+        TransferJob.objects.all().delete()
+
+        job, created = queue_job()
+        same_job, same_created = queue_job()
+
+        self.assertTrue(created)
+        self.assertFalse(same_created)
+        self.assertEqual(same_job, job)
+        self.assertEqual(TransferJob.objects.count(), 1)
@@ -0,0 +1,180 @@
+import gzip
+import os
+import tempfile
+from hashlib import md5
+from typing import Callable
+from unittest import mock
+from unittest.mock import MagicMock
+
+import zstandard
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from file_manager.models import File
+from file_manager.services.compression import choose_codec, is_compressible
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.multipart import MultipartEncoder
+from file_manager.tests.receivers import (
+    MultipartReceiver, make_response, parse_parts
+)
+
+from rest_framework import status
+
+LOG_CONTENT = b"2023-06-01 12:00:00 INFO Nothing has happened.\n" * 1000
+PNG_CONTENT = b"\x89PNG\r\n\x1a\n" + os.urandom(1000)
+
+
+@override_settings(UPLOAD_COMPRESSION=["zstd", "gzip"])
+class ChooseCodecTestCase(SimpleTestCase):
+    def test_preferred_accepted_codec(self):
+        self.assertEqual(choose_codec("gzip, zstd;q=0.5"), "zstd")
+        self.assertEqual(choose_codec("br, GZIP"), "gzip")
+
+    def test_no_accepted_codec(self):
+        self.assertIsNone(choose_codec(""))
+        self.assertIsNone(choose_codec("br"))
+
+
+class IsCompressibleTestCase(SimpleTestCase):
+    def test_compressed_extension(self):
+        self.assertFalse(is_compressible("archive.tar.GZ", b"anything"))
+
+    def test_compressed_magic_bytes(self):
+        self.assertFalse(is_compressible("image", PNG_CONTENT[:8]))
+        self.assertFalse(is_compressible("data.bin", gzip.compress(b"x")[:8]))
+
+    def test_text(self):
+        self.assertTrue(is_compressible("app.log", LOG_CONTENT[:8]))
+
+
+class CompressedMultipartEncoderTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+
+        self.scanned_files = []
+        for file_name, file_content in [
+            ("app.log", LOG_CONTENT),
+            ("image", PNG_CONTENT),
+        ]:
+            file_path = os.path.join(temp_dir.name, file_name)
+            with open(file_path, "wb") as file:
+                file.write(file_content)
+            self.scanned_files.append(
+                ScannedFile(
+                    name=file_name, path=file_path, stat_result=os.stat(file_path)
+                )
+            )
+
+    def test_gzip(self):
+        body = MultipartEncoder(
+            "files", self.scanned_files, chunk_size=100, codec="gzip"
+        )
+
+        (log_headers, log_part), (png_headers, png_part) = parse_parts(
+            b"".join(body.data), body.boundary
+        )
+
+        self.assertNotIn("Content-Length", body.headers)
+        self.assertEqual(log_headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(log_part), LOG_CONTENT)
+        self.assertEqual(self.scanned_files[0].compressed_size, len(log_part))
+        self.assertLess(len(log_part), len(LOG_CONTENT) / 10)
+        self.assertNotIn("Content-Encoding", png_headers)
+        self.assertEqual(png_part, PNG_CONTENT)
+        self.assertIsNone(self.scanned_files[1].compressed_size)
+
+    @override_settings(UPLOAD_COMPRESSION_LEVEL=19)
+    def test_zstd(self):
+        body = MultipartEncoder("files", self.scanned_files[:1], codec="zstd")
+
+        ((headers, part),) = parse_parts(body.read(), body.boundary)
+
+        self.assertEqual(headers["Content-Encoding"], "zstd")
+        decompressor = zstandard.ZstdDecompressor()
+        self.assertEqual(decompressor.decompressobj().decompress(part), LOG_CONTENT)
+
+    def test_uncompressed_body_has_length(self):
+        body = MultipartEncoder("files", self.scanned_files)
+
+        self.assertIs(body.data, body)
+        self.assertEqual(body.headers["Content-Length"], str(len(body)))
+
+
+@override_settings(
+    TRANSFER_JOBS_ASYNC=False,
+    FILE_RECEIVE_URL="https://test-url.com/",
+    UPLOAD_COMPRESSION=["zstd", "gzip"],
+)
+class CompressedTransferTestCase(TestCase):
+    @override_settings(UPLOAD_HASH_FIELD="hash")
+    @mock.patch("file_manager.services.sender.requests.Session.options")
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_compressed_size_is_stored(
+        self, mock_post: MagicMock, mock_options: MagicMock
+    ):
+        mock_options.return_value = MagicMock(
+            headers={"X-Accept-Part-Encoding": "gzip"}
+        )
+        received = []
+
+        def receive(url, data, headers):
+            received.append((headers, b"".join(data)))
+            return MagicMock(status_code=status.HTTP_200_OK)
+
+        mock_post.side_effect = receive
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, "app.log"), "wb") as file:
+                file.write(LOG_CONTENT)
+
+            with override_settings(FILES_FOLDER_PATH=temp_dir):
+                response = self.client.post(reverse("transfer"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ((headers, body),) = received
+        boundary = headers["Content-Type"].split("boundary=")[1]
+        (part_headers, part), (_, hash_part) = parse_parts(body, boundary)
+        self.assertEqual(part_headers["Content-Encoding"], "gzip")
+        file = File.objects.get()
+        self.assertEqual(file.size, len(LOG_CONTENT))
+        self.assertEqual(file.compressed_size, len(part))
+        # The hash of the uncompressed content follows the file
+        self.assertEqual(hash_part.decode(), f"md5:{md5(LOG_CONTENT).hexdigest()}")
+        self.assertEqual(file.md5_hash, md5(LOG_CONTENT).hexdigest())
+
+    def _transfer(self, request: Callable, files: dict[str, bytes]) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for file_name, file_content in files.items():
+                with open(os.path.join(temp_dir, file_name), "wb") as file:
+                    file.write(file_content)
+
+            with override_settings(FILES_FOLDER_PATH=temp_dir), mock.patch(
+                "file_manager.services.sender.requests.Session.request",
+                side_effect=request,
+            ):
+                response = self.client.post(reverse("transfer"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_received_files_equal_originals(self):
+        receiver = MultipartReceiver("gzip, zstd")
+        files = {"app.log": LOG_CONTENT, "image": PNG_CONTENT}
+
+        self._transfer(receiver.request, files)
+
+        self.assertEqual(receiver.files, files)
+        self.assertEqual(receiver.encodings, {"app.log": "zstd", "image": None})
+
+    def test_accept_encoding_is_not_taken_for_part_encoding(self):
+        receiver = MultipartReceiver()
+
+        def request(method: str, url: str, **kwargs):
+            # The codings of the whole body say nothing about the codings of its parts
+            if method == "OPTIONS":
+                return make_response(200, {"Accept-Encoding": "gzip, zstd"})
+            return receiver.request(method, url, **kwargs)
+
+        self._transfer(request, {"app.log": LOG_CONTENT})
+
+        self.assertEqual(receiver.files, {"app.log": LOG_CONTENT})
+        self.assertEqual(receiver.encodings, {"app.log": None})
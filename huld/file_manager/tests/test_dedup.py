@@ -0,0 +1,135 @@
+import os
+import tempfile
+from hashlib import md5
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from file_manager.models import File
+from file_manager.services import dedup
+from file_manager.services.dedup import (
+    ScannedFile, get_legacy_algorithms, mark_duplicates
+)
+
+
+class MarkDuplicatesTestCase(TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+
+    def _scanned_file(self, file_name: str, md5_hash: str) -> ScannedFile:
+        file_path = os.path.join(self.temp_dir, file_name)
+        with open(file_path, "w") as file:
+            file.write(file_name)
+        return ScannedFile(
+            name=file_name,
+            path=file_path,
+            stat_result=os.stat(file_path),
+            md5_hash=md5_hash,
+        )
+
+    def test_duplicates_are_resolved_by_batch(self):
+        sent_file = self._scanned_file("sent.txt", "hash-sent")
+        File.objects.create(
+            name=sent_file.name,
+            path=sent_file.path,
+            md5_hash="hash-other",
+            file_number=sent_file.file_number,
+        )
+        File.objects.create(
+            name="deleted.txt", path="deleted.txt", md5_hash="hash-1", file_number=0
+        )
+        scanned_files = [
+            sent_file,
+            self._scanned_file("file1.txt", "hash-1"),
+            self._scanned_file("file2.txt", "hash-2"),
+            self._scanned_file("file3.txt", "hash-2"),
+        ]
+
+        with self.assertNumQueries(2):
+            mark_duplicates(scanned_files, legacy_algorithms={})
+
+        self.assertEqual(
+            [scanned_file.is_duplicate for scanned_file in scanned_files],
+            [True, True, False, True],
+        )
+
+    @override_settings(HASH_ALGORITHM="sha256")
+    def test_files_hashed_by_previous_algorithm_are_duplicates(self):
+        File.objects.create(
+            name="old.txt",
+            path="old.txt",
+            md5_hash=md5(b"file1.txt").hexdigest(),
+            hash_algorithm="md5",
+            file_number=0,
+            size=len(b"file1.txt"),
+        )
+        scanned_files = [
+            self._scanned_file("file1.txt", "hash-1"),
+            self._scanned_file("file2.txt", "hash-2"),
+        ]
+        for scanned_file in scanned_files:
+            scanned_file.hash_algorithm = "sha256"
+
+        legacy_algorithms = get_legacy_algorithms()
+
+        # The hashes, the file numbers, the sizes of the legacy files and their hashes
+        with self.assertNumQueries(4):
+            mark_duplicates(scanned_files, legacy_algorithms)
+
+        self.assertEqual(
+            [scanned_file.is_duplicate for scanned_file in scanned_files],
+            [True, False],
+        )
+
+    @override_settings(HASH_ALGORITHM="sha256")
+    def test_files_are_hashed_only_by_previous_algorithms_of_their_size(self):
+        File.objects.create(
+            name="old.txt",
+            path="old.txt",
+            md5_hash=md5(b"file1.txt").hexdigest(),
+            hash_algorithm="md5",
+            file_number=0,
+            size=len(b"file1.txt"),
+        )
+        scanned_files = [
+            self._scanned_file("file1.txt", "hash-1"),
+            self._scanned_file("file22.txt", "hash-2"),
+        ]
+        for scanned_file in scanned_files:
+            scanned_file.hash_algorithm = "sha256"
+
+        with mock.patch.object(
+            dedup, "hash_file_path", wraps=dedup.hash_file_path
+        ) as hash_file_path:
+            mark_duplicates(scanned_files)
+
+        self.assertEqual(hash_file_path.call_count, 1)
+        self.assertEqual(
+            [scanned_file.is_duplicate for scanned_file in scanned_files],
+            [True, False],
+        )
+
+    @override_settings(HASH_ALGORITHM="sha256")
+    def test_files_of_unknown_size_hashed_by_previous_algorithm_are_duplicates(self):
+        # Sent before the size was stored, the file is gone, so its size was not filled in
+        File.objects.create(
+            name="old.txt",
+            path="old.txt",
+            md5_hash=md5(b"file1.txt").hexdigest(),
+            hash_algorithm="md5",
+            file_number=0,
+        )
+        scanned_files = [
+            self._scanned_file("file1.txt", "hash-1"),
+            self._scanned_file("file22.txt", "hash-2"),
+        ]
+        for scanned_file in scanned_files:
+            scanned_file.hash_algorithm = "sha256"
+
+        mark_duplicates(scanned_files)
+
+        self.assertEqual(
+            [scanned_file.is_duplicate for scanned_file in scanned_files],
+            [True, False],
+        )
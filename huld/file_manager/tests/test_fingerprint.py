@@ -0,0 +1,175 @@
+import importlib
+import os
+import tempfile
+from hashlib import md5, sha256
+
+from django.apps import apps
+from django.test import TestCase, override_settings
+from file_manager.models import File, Fingerprint
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.fingerprint import (
+    hash_scanned_files, hash_unhashed_files
+)
+from file_manager.services.hashing import sample_file_path
+
+
+class HashScannedFilesTestCase(TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+
+    def _scanned_file(self, file_name: str, content: bytes) -> ScannedFile:
+        file_path = os.path.join(self.temp_dir, file_name)
+        with open(file_path, "wb") as file:
+            file.write(content)
+        return ScannedFile(
+            name=file_name, path=file_path, stat_result=os.stat(file_path)
+        )
+
+    def _scan_again(self, scanned_file: ScannedFile) -> ScannedFile:
+        return ScannedFile(
+            name=scanned_file.name,
+            path=scanned_file.path,
+            stat_result=os.stat(scanned_file.path),
+        )
+
+    def test_unchanged_files_are_not_hashed_again(self):
+        scanned_file = self._scanned_file("file1.txt", b"test-text")
+        hash_scanned_files([scanned_file])
+        hash_unhashed_files([scanned_file])
+        unchanged_file = self._scan_again(scanned_file)
+
+        self.assertEqual(hash_scanned_files([unchanged_file]), 0)
+        self.assertEqual(hash_unhashed_files([unchanged_file]), 0)
+
+        self.assertEqual(unchanged_file.md5_hash, md5(b"test-text").hexdigest())
+
+    def test_files_are_hashed_again_by_another_algorithm(self):
+        scanned_file = self._scanned_file("file1.txt", b"test-text")
+        hash_scanned_files([scanned_file])
+        hash_unhashed_files([scanned_file])
+        unchanged_file = self._scan_again(scanned_file)
+
+        with override_settings(HASH_ALGORITHM="sha256"):
+            hash_scanned_files([unchanged_file])
+            hash_unhashed_files([unchanged_file])
+
+        self.assertEqual(unchanged_file.md5_hash, sha256(b"test-text").hexdigest())
+        fingerprint = Fingerprint.objects.get()
+        self.assertEqual(fingerprint.md5_hash, unchanged_file.md5_hash)
+        self.assertEqual(fingerprint.hash_algorithm, "sha256")
+
+    @override_settings(DEDUP_SAMPLE_SIZE=4)
+    def test_files_with_unique_sample_are_not_hashed(self):
+        scanned_files = [
+            self._scanned_file("file1.txt", b"head-1-middle-tail"),
+            self._scanned_file("file2.txt", b"HEAD-2-middle-tail"),
+            self._scanned_file("file3.txt", b"other-size"),
+        ]
+
+        self.assertEqual(hash_scanned_files(scanned_files), 0)
+
+        self.assertEqual(
+            [scanned_file.md5_hash for scanned_file in scanned_files], [""] * 3
+        )
+        self.assertEqual(
+            len({scanned_file.sample_hash for scanned_file in scanned_files}), 3
+        )
+
+        self.assertEqual(hash_unhashed_files(scanned_files), 3)
+
+        self.assertEqual(
+            scanned_files[0].md5_hash, md5(b"head-1-middle-tail").hexdigest()
+        )
+        self.assertEqual(Fingerprint.objects.count(), 3)
+
+    @override_settings(DEDUP_SAMPLE_SIZE=4)
+    def test_files_with_colliding_sample_are_hashed(self):
+        sent_file = self._scanned_file("sent.txt", b"head-1-middle-tail")
+        sent_file.sample_hash = sample_file_path(sent_file.path, 4)
+        sent_file.sample_size = 4
+        sent_file.md5_hash = "hash-sent"
+        sent_file.to_model().save()
+        scanned_files = [
+            # Different in the middle only, so it is told apart by the full hash
+            self._scanned_file("file1.txt", b"head-1-MIDDLE-tail"),
+            self._scanned_file("file2.txt", b"equal-content"),
+            self._scanned_file("file3.txt", b"equal-content"),
+            self._scanned_file("file4.txt", b"unique"),
+        ]
+
+        self.assertEqual(hash_scanned_files(scanned_files), 3)
+
+        self.assertEqual(
+            [scanned_file.md5_hash for scanned_file in scanned_files],
+            [
+                md5(b"head-1-MIDDLE-tail").hexdigest(),
+                md5(b"equal-content").hexdigest(),
+                md5(b"equal-content").hexdigest(),
+                "",
+            ],
+        )
+
+    @override_settings(DEDUP_SAMPLE_SIZE=4)
+    def test_files_are_hashed_if_sent_files_were_sampled_by_another_size(self):
+        sent_file = self._scanned_file("sent.txt", b"head-1-middle-tail")
+        sent_file.sample_hash = sample_file_path(sent_file.path, 8)
+        sent_file.sample_size = 8
+        sent_file.md5_hash = md5(b"head-1-middle-tail").hexdigest()
+        sent_file.to_model().save()
+        scanned_file = self._scanned_file("file1.txt", b"head-1-middle-tail")
+
+        self.assertEqual(hash_scanned_files([scanned_file]), 1)
+
+        self.assertEqual(scanned_file.md5_hash, sent_file.md5_hash)
+        self.assertEqual(scanned_file.sample_size, 4)
+
+    @override_settings(DEDUP_SAMPLE_SIZE=4)
+    def test_files_are_hashed_while_sent_files_have_unknown_size(self):
+        # Sent before the size was stored, the file is gone, so its size cannot be filled in
+        File.objects.create(
+            name="sent.txt",
+            path=os.path.join(self.temp_dir, "sent.txt"),
+            md5_hash=md5(b"test-text").hexdigest(),
+            file_number=0,
+        )
+        scanned_files = [self._scanned_file("file1.txt", b"test-text")]
+
+        self.assertEqual(hash_scanned_files(scanned_files), 1)
+
+        self.assertEqual(scanned_files[0].md5_hash, md5(b"test-text").hexdigest())
+
+    def test_size_of_sent_files_is_filled_in(self):
+        scanned_file = self._scanned_file("file1.txt", b"test-text")
+        kept = File.objects.create(
+            name="file1.txt",
+            path=scanned_file.path,
+            md5_hash="hash-1",
+            file_number=scanned_file.file_number,
+        )
+        gone = File.objects.create(
+            name="gone.txt",
+            path=os.path.join(self.temp_dir, "gone.txt"),
+            md5_hash="hash-2",
+            file_number=0,
+        )
+        migration = importlib.import_module(
+            "file_manager.migrations.0014_backfill_file_size"
+        )
+
+        migration.backfill_file_size(apps, None)
+
+        kept.refresh_from_db()
+        gone.refresh_from_db()
+        self.assertEqual(kept.size, len(b"test-text"))
+        self.assertIsNone(gone.size)
+
+    @override_settings(DEDUP_SAMPLE_SIZE=0)
+    def test_sampling_can_be_disabled(self):
+        scanned_files = [self._scanned_file("file1.txt", b"test-text")]
+
+        self.assertEqual(hash_scanned_files(scanned_files), 1)
+
+        self.assertEqual(scanned_files[0].md5_hash, md5(b"test-text").hexdigest())
+        self.assertIsNone(scanned_files[0].sample_hash)
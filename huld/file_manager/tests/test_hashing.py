@@ -0,0 +1,85 @@
+import os
+import tempfile
+from hashlib import blake2b, md5, sha256
+
+from django.test import SimpleTestCase, override_settings
+from file_manager.services.hashing import (
+    create_hash_executor, hash_file, hash_file_paths
+)
+
+
+class HashFileTestCase(SimpleTestCase):
+    def test_hash_matches_md5(self):
+        content = b"0123456789" * 1000
+
+        with tempfile.TemporaryFile() as file:
+            file.write(content)
+            self.assertEqual(hash_file(file, chunk_size=64), md5(content).hexdigest())
+
+    @override_settings(HASH_CHUNK_SIZE=7)
+    def test_hash_uses_default_chunk_size(self):
+        content = b"test-text"
+
+        with tempfile.TemporaryFile() as file:
+            file.write(content)
+            self.assertEqual(hash_file(file), md5(content).hexdigest())
+
+    def test_file_is_rewound(self):
+        content = b"test-text"
+
+        with tempfile.TemporaryFile() as file:
+            file.write(content)
+            hash_file(file)
+            self.assertEqual(file.read(), content)
+
+    def test_hash_by_algorithm(self):
+        content = b"test-text"
+
+        with tempfile.TemporaryFile() as file:
+            file.write(content)
+            self.assertEqual(
+                hash_file(file, algorithm="sha256"), sha256(content).hexdigest()
+            )
+            with override_settings(HASH_ALGORITHM="blake2b"):
+                self.assertEqual(
+                    hash_file(file), blake2b(content, digest_size=32).hexdigest()
+                )
+
+    def test_unknown_algorithm(self):
+        with tempfile.TemporaryFile() as file:
+            with self.assertRaises(ValueError):
+                hash_file(file, algorithm="crc32")
+
+    def test_empty_file(self):
+        with tempfile.TemporaryFile() as file:
+            self.assertEqual(hash_file(file), md5(b"").hexdigest())
+
+
+class HashFilePathsTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.contents = [f"test-text-{index}".encode() for index in range(5)]
+        self.file_paths = []
+        for index, content in enumerate(self.contents):
+            file_path = os.path.join(temp_dir.name, f"file{index}.txt")
+            with open(file_path, "wb") as file:
+                file.write(content)
+            self.file_paths.append(file_path)
+
+    def test_hashes_keep_order_of_paths(self):
+        with create_hash_executor(3) as executor:
+            hashes = hash_file_paths(self.file_paths, executor=executor)
+
+        self.assertEqual(
+            hashes, [md5(content).hexdigest() for content in self.contents]
+        )
+
+    def test_single_path_is_hashed_serially(self):
+        executor = create_hash_executor(2)
+        self.addCleanup(executor.shutdown)
+
+        with self.settings(HASH_CHUNK_SIZE=4):
+            hashes = hash_file_paths(self.file_paths[:1], executor=executor)
+
+        self.assertEqual(hashes, [md5(self.contents[0]).hexdigest()])
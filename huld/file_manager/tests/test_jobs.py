@@ -0,0 +1,89 @@
+import os
+import tempfile
+from unittest import mock
+from unittest.mock import MagicMock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from file_manager.models import File, TransferJob
+from file_manager.services.jobs import claim_next_job
+
+from rest_framework import status
+
+MOCK_FILE_RECEIVE_URL = "https://test-url.com/"
+
+
+@override_settings(
+    TRANSFER_JOBS_ASYNC=True,
+    FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL,
+    TRANSFER_RETRY_BASE_DELAY=0,
+    METRICS_PORT=0,
+)
+class TransferJobTestCase(TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        for file_name, file_content in [("file1.txt", "test"), ("file2.txt", "test")]:
+            with open(os.path.join(self.temp_dir, file_name), "w") as temp_file:
+                temp_file.write(file_content)
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_transfer_is_queued(self, mock_post: MagicMock):
+        response = self.client.post(reverse("transfer"))
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = TransferJob.objects.get(pk=response.json()["id"])
+        self.assertEqual(job.status, TransferJob.Status.QUEUED)
+        self.assertEqual(mock_post.call_count, 0)
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_worker_processes_queued_jobs(self, mock_post: MagicMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+        job_id = self.client.post(reverse("transfer")).json()["id"]
+
+        with override_settings(FILES_FOLDER_PATH=self.temp_dir):
+            call_command("transfer_worker", "--once")
+
+        response = self.client.get(reverse("transfer-detail", args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["status"], TransferJob.Status.SUCCEEDED)
+        self.assertEqual(response.json()["files_scanned"], 2)
+        self.assertEqual(response.json()["files_hashed"], 2)
+        self.assertEqual(response.json()["files_skipped"], 1)
+        self.assertEqual(response.json()["files_sent"], 1)
+        self.assertEqual(response.json()["bytes_sent"], 4)
+        self.assertIsNotNone(response.json()["finished_at"])
+        self.assertEqual(File.objects.count(), 1)
+        self.assertEqual(mock_post.call_count, 1)
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_failed_job(self, mock_post: MagicMock):
+        mock_post.side_effect = ConnectionError()
+        job = TransferJob.objects.create()
+
+        with override_settings(FILES_FOLDER_PATH=self.temp_dir), self.assertLogs(
+            "file_manager.services.transfer"
+        ):
+            call_command("transfer_worker", "--once")
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, TransferJob.Status.FAILED)
+        self.assertEqual(job.files_sent, 0)
+
+    def test_claim_next_job(self):
+        first_job = TransferJob.objects.create()
+        second_job = TransferJob.objects.create()
+
+        self.assertEqual(claim_next_job(), first_job)
+        self.assertEqual(claim_next_job(), second_job)
+        self.assertIsNone(claim_next_job())
+        self.assertEqual(
+            TransferJob.objects.filter(status=TransferJob.Status.RUNNING).count(), 2
+        )
+
+    def test_unknown_job(self):
+        response = self.client.get(reverse("transfer-detail", args=[999999]))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,189 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from file_manager.models import File
+from file_manager.services.dedup import ScannedFile, mark_duplicates
+from file_manager.services.known_hashes import BloomFilter, get_known_hashes
+
+
+class BloomFilterTestCase(SimpleTestCase):
+    def test_added_keys_are_present(self):
+        bloom = BloomFilter(1000, 0.01)
+        keys = [f"md5:{index}" for index in range(1000)]
+        for key in keys:
+            bloom.add(key)
+
+        self.assertTrue(all(key in bloom for key in keys))
+
+    def test_false_positives_are_rare(self):
+        bloom = BloomFilter(1000, 0.01)
+        for index in range(1000):
+            bloom.add(f"md5:{index}")
+
+        false_positives = sum(f"sha256:{index}" in bloom for index in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+@override_settings(DEDUP_CACHE_REFRESH_INTERVAL=0)
+class KnownHashesTestCase(TransactionTestCase):
+    # The tests create the files of explicit ids
+    reset_sequences = True
+
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        get_known_hashes().clear()
+        self.addCleanup(get_known_hashes().clear)
+        File.objects.create(
+            name="sent.txt", path="sent.txt", md5_hash="hash-sent", file_number=0
+        )
+
+    def _scanned_file(self, file_name: str, md5_hash: str) -> ScannedFile:
+        file_path = os.path.join(self.temp_dir, file_name)
+        with open(file_path, "w") as file:
+            file.write(file_name)
+        return ScannedFile(
+            name=file_name,
+            path=file_path,
+            stat_result=os.stat(file_path),
+            md5_hash=md5_hash,
+        )
+
+    def _mark_duplicates(self, scanned_files: list[ScannedFile]) -> list[str]:
+        with CaptureQueriesContext(connection) as queries:
+            mark_duplicates(scanned_files)
+        return [query["sql"] for query in queries.captured_queries]
+
+    def test_new_files_are_not_looked_up(self):
+        mark_duplicates([])
+        scanned_files = [
+            self._scanned_file("file1.txt", "hash-1"),
+            self._scanned_file("file2.txt", "hash-2"),
+        ]
+
+        queries = self._mark_duplicates(scanned_files)
+
+        self.assertFalse(any('"md5_hash" IN' in query for query in queries))
+        self.assertFalse(
+            any(scanned_file.is_duplicate for scanned_file in scanned_files)
+        )
+
+    def test_confirmed_files_are_not_looked_up_again(self):
+        self._mark_duplicates([self._scanned_file("file1.txt", "hash-sent")])
+        scanned_file = self._scanned_file("file2.txt", "hash-sent")
+
+        queries = self._mark_duplicates([scanned_file])
+
+        self.assertFalse(any('"md5_hash" IN' in query for query in queries))
+        self.assertTrue(scanned_file.is_duplicate)
+
+    def test_files_sent_by_other_process_are_read(self):
+        mark_duplicates([])
+        File.objects.create(
+            name="other.txt", path="other.txt", md5_hash="hash-other", file_number=1
+        )
+        scanned_file = self._scanned_file("file1.txt", "hash-other")
+
+        mark_duplicates([scanned_file])
+
+        self.assertTrue(scanned_file.is_duplicate)
+
+    def test_deleted_files_are_forgotten(self):
+        self._mark_duplicates([self._scanned_file("file1.txt", "hash-sent")])
+        File.objects.all().delete()
+        scanned_file = self._scanned_file("file2.txt", "hash-sent")
+
+        mark_duplicates([scanned_file])
+
+        self.assertFalse(scanned_file.is_duplicate)
+
+    def test_files_committed_out_of_order_are_read(self):
+        mark_duplicates([])
+        File.objects.create(
+            id=10,
+            name="later.txt",
+            path="later.txt",
+            md5_hash="hash-10",
+            file_number=10,
+        )
+        get_known_hashes().refresh()
+        # Committed by a transaction, which got its id before the file above
+        File.objects.create(
+            id=5,
+            name="earlier.txt",
+            path="earlier.txt",
+            md5_hash="hash-5",
+            file_number=5,
+        )
+        get_known_hashes().refresh()
+
+        _, lookup_hashes = get_known_hashes().lookup([("md5", "hash-5")])
+
+        self.assertEqual(lookup_hashes, [("md5", "hash-5")])
+
+    @override_settings(DEDUP_CACHE_GAP_TIMEOUT=0)
+    def test_gaps_expire(self):
+        mark_duplicates([])
+        File.objects.create(
+            id=10,
+            name="later.txt",
+            path="later.txt",
+            md5_hash="hash-10",
+            file_number=10,
+        )
+        get_known_hashes().refresh()
+        get_known_hashes().refresh()
+
+        with CaptureQueriesContext(connection) as queries:
+            get_known_hashes().refresh()
+
+        self.assertNotIn("BETWEEN", queries.captured_queries[0]["sql"])
+
+    @override_settings(DEDUP_CACHE_REFRESH_INTERVAL=60)
+    def test_files_are_read_once_per_interval(self):
+        mark_duplicates([])
+        File.objects.create(
+            name="other.txt", path="other.txt", md5_hash="hash-other", file_number=1
+        )
+        scanned_files = [
+            self._scanned_file("file1.txt", "hash-1"),
+            self._scanned_file("file2.txt", "hash-other"),
+        ]
+
+        # Only the file numbers of the batch are looked up
+        with self.assertNumQueries(1):
+            mark_duplicates(scanned_files, legacy_algorithms={})
+
+        # The file sent by another process is not known until the next refresh
+        self.assertEqual(
+            [scanned_file.is_duplicate for scanned_file in scanned_files],
+            [False, False],
+        )
+
+    @override_settings(DEDUP_CACHE_REFRESH_INTERVAL=60)
+    def test_files_sent_by_process_are_known_at_once(self):
+        mark_duplicates([])
+        get_known_hashes().add(
+            [
+                File.objects.create(
+                    name="new.txt", path="new.txt", md5_hash="hash-new", file_number=1
+                )
+            ]
+        )
+        scanned_file = self._scanned_file("file1.txt", "hash-new")
+
+        with self.assertNumQueries(1):
+            mark_duplicates([scanned_file], legacy_algorithms={})
+
+        self.assertTrue(scanned_file.is_duplicate)
+
+
+class KnownHashesTransactionTestCase(TestCase):
+    def test_cache_is_bypassed_in_transaction(self):
+        self.assertFalse(get_known_hashes().refresh())
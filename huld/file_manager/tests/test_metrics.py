@@ -0,0 +1,129 @@
+import os
+import tempfile
+from unittest import mock
+from unittest.mock import MagicMock
+from urllib.request import urlopen
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from file_manager.services.metrics import (
+    BYTES_HASHED, BYTES_SENT, DB_QUERIES, FILES, JOBS, RECEIVER_REQUESTS,
+    REGISTRY, STAGE_SECONDS, Counter, Histogram, serve_metrics,
+    start_metrics_server
+)
+
+from rest_framework import status
+
+MOCK_FILE_RECEIVE_URL = "https://test-url.com/"
+DUPLICATE_FILES = [("file1.txt", "test-text"), ("file2.txt", "test-text")]
+
+
+class MetricsTestCase(TestCase):
+    def test_counter(self):
+        counter = Counter("test_total", "Test counter.", ["outcome"])
+
+        counter.inc(outcome="sent")
+        counter.inc(2, outcome="sent")
+        counter.inc(outcome='a "b"')
+
+        self.assertEqual(counter.get(outcome="sent"), 3)
+        self.assertEqual(
+            counter.render(),
+            "# HELP test_total Test counter.\n"
+            "# TYPE test_total counter\n"
+            'test_total{outcome="a \\"b\\""} 1\n'
+            'test_total{outcome="sent"} 3',
+        )
+
+    def test_histogram(self):
+        histogram = Histogram("test_seconds", "Test histogram.", buckets=(0.1, 1))
+
+        for value in [0.05, 0.5, 0.7, 5]:
+            histogram.observe(value)
+
+        self.assertEqual(histogram.get_count(), 4)
+        self.assertEqual(
+            histogram.render().splitlines()[2:],
+            [
+                'test_seconds_bucket{le="0.1"} 1',
+                'test_seconds_bucket{le="1"} 3',
+                'test_seconds_bucket{le="+Inf"} 4',
+                "test_seconds_sum 6.25",
+                "test_seconds_count 4",
+            ],
+        )
+
+    def test_metrics_server(self):
+        FILES.inc(outcome="sent")
+
+        server = start_metrics_server(0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as reply:
+            body = reply.read().decode()
+
+        self.assertIn('huld_transfer_files_total{outcome="sent"}', body)
+
+    def test_taken_port_is_logged(self):
+        server = start_metrics_server(0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        with self.assertLogs("file_manager.services.metrics", "ERROR"):
+            self.assertIsNone(serve_metrics(server.server_address[1]))
+        self.assertIsNone(serve_metrics(0))
+
+
+@override_settings(
+    TRANSFER_JOBS_ASYNC=False,
+    TRANSFER_RETRY_BASE_DELAY=0,
+    FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL,
+)
+class TransferMetricsTestCase(TestCase):
+    def setUp(self) -> None:
+        REGISTRY.clear()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        for file_name, content in DUPLICATE_FILES:
+            with open(os.path.join(self.temp_dir, file_name), "w") as temp_file:
+                temp_file.write(content)
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_transfer_is_measured(self, mock_post: MagicMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+
+        with override_settings(FILES_FOLDER_PATH=self.temp_dir):
+            self.client.post(reverse("transfer"))
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            'huld_transfer_files_total{outcome="sent"} 1', response.content.decode()
+        )
+        self.assertEqual(FILES.get(outcome="scanned"), 2)
+        self.assertEqual(FILES.get(outcome="hashed"), 2)
+        self.assertEqual(BYTES_SENT.get(), len("test-text"))
+        self.assertEqual(BYTES_HASHED.get(), 2 * len("test-text"))
+        self.assertEqual(JOBS.get(status="succeeded"), 1)
+        self.assertEqual(RECEIVER_REQUESTS.get(status=status.HTTP_200_OK), 1)
+        for stage in ["scan", "claim", "hash", "dedup", "send", "store", "release"]:
+            self.assertGreater(STAGE_SECONDS.get_count(stage=stage), 0, stage)
+        self.assertGreater(DB_QUERIES.get(stage="claim"), 0)
+        self.assertGreater(DB_QUERIES.get(stage="store"), 0)
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_receiver_errors_are_counted(self, mock_post: MagicMock):
+        mock_post.return_value = MagicMock(
+            status_code=status.HTTP_400_BAD_REQUEST, text=""
+        )
+
+        with override_settings(FILES_FOLDER_PATH=self.temp_dir), self.assertLogs(
+            "file_manager.services.transfer"
+        ):
+            self.client.post(reverse("transfer"))
+
+        self.assertEqual(RECEIVER_REQUESTS.get(status=status.HTTP_400_BAD_REQUEST), 1)
+        self.assertEqual(FILES.get(outcome="sent"), 0)
+        self.assertEqual(JOBS.get(status="failed"), 1)
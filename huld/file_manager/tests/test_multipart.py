@@ -0,0 +1,85 @@
+import os
+import tempfile
+from hashlib import md5
+
+from django.test import SimpleTestCase
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.multipart import MultipartEncoder
+from urllib3.fields import RequestField
+from urllib3.filepost import encode_multipart_formdata
+
+FILES = [("file1.txt", b"test-text" * 100), ('file "2".txt', b""), ("file3", b"x")]
+
+
+class MultipartEncoderTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+
+        self.scanned_files = []
+        for index, (file_name, file_content) in enumerate(FILES):
+            file_path = os.path.join(temp_dir.name, str(index))
+            with open(file_path, "wb") as file:
+                file.write(file_content)
+            self.scanned_files.append(
+                ScannedFile(
+                    name=file_name, path=file_path, stat_result=os.stat(file_path)
+                )
+            )
+
+    def _expected_body(self, boundary: str) -> bytes:
+        """Body, which would be built in the memory by `requests`"""
+        fields = []
+        for file_name, file_content in FILES:
+            field = RequestField(name="files", data=file_content, filename=file_name)
+            field.make_multipart()
+            fields.append(field)
+        body, _ = encode_multipart_formdata(fields, boundary=boundary)
+        return body
+
+    def test_body_matches_requests_encoding(self):
+        body = MultipartEncoder("files", self.scanned_files)
+
+        self.assertEqual(body.read(), self._expected_body(body.boundary))
+        self.assertEqual(body.read(), b"")
+
+    def test_body_is_read_in_small_parts(self):
+        body = MultipartEncoder("files", self.scanned_files, chunk_size=64)
+
+        parts = []
+        while part := body.read(10):
+            self.assertLessEqual(len(part), 10)
+            parts.append(part)
+
+        expected_body = self._expected_body(body.boundary)
+        self.assertEqual(b"".join(parts), expected_body)
+        self.assertEqual(len(body), len(expected_body))
+
+    def test_files_are_hashed_while_read(self):
+        self.scanned_files[2].md5_hash = "known-hash"
+        body = MultipartEncoder("files", self.scanned_files, hash_field="hash")
+
+        fields = []
+        for scanned_file, (file_name, file_content) in zip(self.scanned_files, FILES):
+            field = RequestField(name="files", data=file_content, filename=file_name)
+            field.make_multipart()
+            file_hash = scanned_file.md5_hash or md5(file_content).hexdigest()
+            hash_field = RequestField(name="hash", data=f"md5:{file_hash}")
+            hash_field.make_multipart()
+            fields += [field, hash_field]
+        expected_body, _ = encode_multipart_formdata(fields, boundary=body.boundary)
+
+        self.assertEqual(len(body), len(expected_body))
+        self.assertEqual(body.read(), expected_body)
+        self.assertEqual(
+            [scanned_file.streamed_hash for scanned_file in self.scanned_files],
+            [md5(FILES[0][1]).hexdigest(), md5(FILES[1][1]).hexdigest(), None],
+        )
+
+    def test_truncated_file(self):
+        body = MultipartEncoder("files", self.scanned_files)
+        with open(self.scanned_files[0].path, "wb") as file:
+            file.write(b"short")
+
+        with self.assertRaises(OSError):
+            body.read()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from file_manager.models import File
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.raw_body import RawBodySender
+from file_manager.tests.receivers import RawBodyReceiver
+
+from rest_framework import status
+
+FILES = [("file1.txt", b"test-text"), ("empty é.txt", b"")]
+
+
+class RawBodySenderTestCase(TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.scanned_files = []
+        for file_name, content in FILES:
+            path = os.path.join(self.temp_dir, file_name)
+            with open(path, "wb") as file:
+                file.write(content)
+            self.scanned_files.append(ScannedFile(file_name, path, os.stat(path)))
+
+    def test_files_are_sent_by_sendfile(self):
+        with RawBodyReceiver() as receiver, mock.patch(
+            "os.sendfile", wraps=os.sendfile
+        ) as mock_sendfile:
+            sender = RawBodySender(receiver.url)
+            responses = [
+                sender.post(scanned_file) for scanned_file in self.scanned_files
+            ]
+            sender.close()
+
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_201_CREATED] * 2,
+        )
+        self.assertEqual(receiver.files, dict(FILES))
+        self.assertTrue(mock_sendfile.called)
+        # The connection is kept alive for the next file
+        self.assertEqual(receiver.connections, 1)
+
+    def test_connection_closed_by_receiver(self):
+        with RawBodyReceiver(close_after_requests={1}) as receiver:
+            sender = RawBodySender(receiver.url)
+            for scanned_file in self.scanned_files:
+                sender.post(scanned_file)
+            sender.close()
+
+        self.assertEqual(receiver.files, dict(FILES))
+        self.assertEqual(receiver.connections, 2)
+
+    def test_truncated_file(self):
+        with open(self.scanned_files[0].path, "wb") as file:
+            file.write(b"test")
+
+        with RawBodyReceiver() as receiver, self.assertRaises(OSError):
+            sender = RawBodySender(receiver.url)
+            sender.post(self.scanned_files[0])
+        sender.close()
+
+    @override_settings(
+        TRANSFER_JOBS_ASYNC=False, UPLOAD_RAW_BODY=True, TRANSFER_RETRY_BASE_DELAY=0
+    )
+    def test_transfer_files(self):
+        with RawBodyReceiver() as receiver, override_settings(
+            FILE_RECEIVE_URL=receiver.url, FILES_FOLDER_PATH=self.temp_dir
+        ):
+            response = self.client.post(reverse("transfer"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["files_sent"], 2)
+        self.assertEqual(receiver.files, dict(FILES))
+        self.assertEqual(File.objects.count(), 2)
+
+    @override_settings(
+        TRANSFER_JOBS_ASYNC=False,
+        UPLOAD_RAW_BODY=True,
+        SEND_FILES_BULK=True,
+        TRANSFER_RETRY_BASE_DELAY=0,
+    )
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_connection_is_closed_in_bulk_mode(self, mock_post: mock.MagicMock):
+        mock_post.return_value = mock.MagicMock(status_code=status.HTTP_200_OK)
+
+        with mock.patch.object(RawBodySender, "close") as mock_close, override_settings(
+            FILE_RECEIVE_URL="https://test-url.com/", FILES_FOLDER_PATH=self.temp_dir
+        ):
+            response = self.client.post(reverse("transfer"))
+
+        self.assertEqual(response.json()["files_sent"], 2)
+        mock_close.assert_called_once()
@@ -0,0 +1,146 @@
+import os
+import tempfile
+from unittest import mock
+from unittest.mock import MagicMock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from file_manager.models import ChunkedUpload, File
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.resumable import MAX_RESYNCS, ResumableUploader
+from file_manager.tests.receivers import TusReceiver, make_response
+
+from rest_framework import status
+
+MOCK_CHUNKED_UPLOAD_URL = "https://test-url.com/files/"
+CONTENT = b"0123456789" * 10
+
+
+@override_settings(CHUNKED_UPLOAD_URL=MOCK_CHUNKED_UPLOAD_URL)
+class ResumableUploaderTestCase(TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        file_path = os.path.join(temp_dir.name, "large.bin")
+        with open(file_path, "wb") as file:
+            file.write(CONTENT)
+        self.scanned_file = ScannedFile(
+            name="large.bin",
+            path=file_path,
+            stat_result=os.stat(file_path),
+            md5_hash="hash",
+        )
+
+    def _upload(self, receiver: TusReceiver):
+        with mock.patch(
+            "file_manager.services.sender.requests.Session.request",
+            side_effect=receiver.request,
+        ):
+            return ResumableUploader(chunk_size=30).upload(self.scanned_file)
+
+    def test_file_is_uploaded_in_chunks(self):
+        receiver = TusReceiver(MOCK_CHUNKED_UPLOAD_URL)
+
+        response = self._upload(receiver)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(receiver.files(), {"large.bin": CONTENT})
+        self.assertEqual(receiver.patches, 4)
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_interrupted_upload_is_resumed(self):
+        receiver = TusReceiver(MOCK_CHUNKED_UPLOAD_URL, drop_on_patches={3})
+
+        with self.assertRaises(OSError):
+            self._upload(receiver)
+        self.assertEqual(ChunkedUpload.objects.get().offset, 60)
+
+        response = self._upload(receiver)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(receiver.files(), {"large.bin": CONTENT})
+        self.assertEqual(receiver.bytes_received, len(CONTENT))
+        self.assertEqual(len(receiver.uploads), 1)
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_expired_upload_is_started_again(self):
+        receiver = TusReceiver(MOCK_CHUNKED_UPLOAD_URL, drop_on_patches={2})
+        with self.assertRaises(OSError):
+            self._upload(receiver)
+        receiver.uploads.clear()
+
+        response = self._upload(receiver)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(receiver.files(), {"large.bin": CONTENT})
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_missing_offset_is_error(self):
+        receiver = TusReceiver(MOCK_CHUNKED_UPLOAD_URL)
+
+        def request(method: str, url: str, **kwargs):
+            response = receiver.request(method, url, **kwargs)
+            if method == "PATCH":
+                del response.headers["Upload-Offset"]
+            return response
+
+        with self.assertRaises(OSError):
+            self._upload(MagicMock(request=request))
+        self.assertEqual(ChunkedUpload.objects.get().offset, 0)
+
+    def test_missing_location_is_error(self):
+        receiver = TusReceiver(MOCK_CHUNKED_UPLOAD_URL)
+
+        def request(method: str, url: str, **kwargs):
+            response = receiver.request(method, url, **kwargs)
+            if method == "POST":
+                del response.headers["Location"]
+            return response
+
+        with self.assertRaises(OSError):
+            self._upload(MagicMock(request=request))
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_resyncs_are_limited(self):
+        receiver = TusReceiver(MOCK_CHUNKED_UPLOAD_URL)
+
+        def request(method: str, url: str, **kwargs):
+            if method == "PATCH":
+                receiver.patches += 1
+                return make_response(status.HTTP_409_CONFLICT)
+            return receiver.request(method, url, **kwargs)
+
+        with self.assertRaises(OSError):
+            self._upload(MagicMock(request=request))
+        self.assertEqual(receiver.patches, MAX_RESYNCS + 1)
+
+
+@override_settings(
+    TRANSFER_JOBS_ASYNC=False,
+    FILE_RECEIVE_URL="https://test-url.com/",
+    CHUNKED_UPLOAD_URL=MOCK_CHUNKED_UPLOAD_URL,
+    CHUNKED_UPLOAD_THRESHOLD=50,
+    CHUNKED_UPLOAD_CHUNK_SIZE=30,
+)
+class ResumableTransferTestCase(TestCase):
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_large_files_are_uploaded_in_chunks(self, mock_post: MagicMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+        receiver = TusReceiver(MOCK_CHUNKED_UPLOAD_URL)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for file_name, content in [("large.bin", CONTENT), ("small.txt", b"test")]:
+                with open(os.path.join(temp_dir, file_name), "wb") as file:
+                    file.write(content)
+
+            with override_settings(FILES_FOLDER_PATH=temp_dir), mock.patch(
+                "file_manager.services.sender.requests.Session.request",
+                side_effect=receiver.request,
+            ):
+                response = self.client.post(reverse("transfer"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["files_sent"], 2)
+        self.assertEqual(receiver.files(), {"large.bin": CONTENT})
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(File.objects.count(), 2)
@@ -0,0 +1,112 @@
+from unittest import mock
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase
+from file_manager.services.retry import (
+    CircuitBreaker, CircuitOpenError, Retrier
+)
+
+from rest_framework import status
+
+
+def make_response(status_code: int, headers: dict | None = None) -> MagicMock:
+    return MagicMock(status_code=status_code, headers=headers or {})
+
+
+@mock.patch("file_manager.services.retry.time.sleep")
+class RetrierTestCase(SimpleTestCase):
+    def test_transient_failure_is_retried(self, mock_sleep: MagicMock):
+        request = MagicMock(
+            side_effect=[
+                make_response(status.HTTP_503_SERVICE_UNAVAILABLE),
+                ConnectionError(),
+                make_response(status.HTTP_200_OK),
+            ]
+        )
+
+        response = Retrier(max_attempts=5, base_delay=1, max_delay=10).call(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(request.call_count, 3)
+        # Full jitter of the exponential backoff
+        self.assertLessEqual(mock_sleep.call_args_list[0].args[0], 1)
+        self.assertLessEqual(mock_sleep.call_args_list[1].args[0], 2)
+
+    def test_permanent_failure_is_not_retried(self, mock_sleep: MagicMock):
+        request = MagicMock(return_value=make_response(status.HTTP_400_BAD_REQUEST))
+
+        response = Retrier(max_attempts=5).call(request)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(request.call_count, 1)
+
+    def test_file_error_is_not_retried(self, mock_sleep: MagicMock):
+        request = MagicMock(side_effect=FileNotFoundError())
+
+        with self.assertRaises(FileNotFoundError):
+            Retrier(max_attempts=5).call(request)
+        self.assertEqual(request.call_count, 1)
+
+    def test_last_response_after_all_attempts(self, mock_sleep: MagicMock):
+        request = MagicMock(
+            return_value=make_response(status.HTTP_503_SERVICE_UNAVAILABLE)
+        )
+
+        response = Retrier(max_attempts=3).call(request)
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_retry_after_is_respected(self, mock_sleep: MagicMock):
+        request = MagicMock(
+            side_effect=[
+                make_response(status.HTTP_429_TOO_MANY_REQUESTS, {"Retry-After": "7"}),
+                make_response(status.HTTP_200_OK),
+            ]
+        )
+
+        Retrier(max_attempts=2, base_delay=0, max_delay=30).call(request)
+
+        mock_sleep.assert_called_once_with(7)
+
+
+@mock.patch("file_manager.services.retry.time.monotonic", return_value=100)
+class CircuitBreakerTestCase(SimpleTestCase):
+    def test_circuit_opens_after_failures_in_row(self, mock_monotonic: MagicMock):
+        breaker = CircuitBreaker(threshold=2, reset_timeout=30)
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.before_request()
+        breaker.record_failure()
+
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request()
+
+    def test_one_trial_request_after_timeout(self, mock_monotonic: MagicMock):
+        breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+        breaker.record_failure()
+
+        mock_monotonic.return_value = 130
+        breaker.before_request()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request()
+
+        breaker.record_success()
+        breaker.before_request()
+        self.assertFalse(breaker.is_open)
+
+    def test_failed_trial_opens_circuit_again(self, mock_monotonic: MagicMock):
+        breaker = CircuitBreaker(threshold=5, reset_timeout=30)
+        for _ in range(5):
+            breaker.record_failure()
+
+        mock_monotonic.return_value = 130
+        breaker.before_request()
+        breaker.record_failure()
+
+        mock_monotonic.return_value = 159
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+from file_manager.services.scanner import (
+    PARTIAL_UPLOAD_PREFIX, scan_folder, scan_paths
+)
+
+
+class ScanFolderTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.folder_path = temp_dir.name
+        os.makedirs(os.path.join(self.folder_path, "sub", "nested"))
+        for file_name in ["file1.txt", "sub/file2.txt", "sub/nested/file3.txt"]:
+            with open(os.path.join(self.folder_path, file_name), "w") as file:
+                file.write(file_name)
+
+    def test_only_top_level_files(self):
+        scanned_files = list(scan_folder(self.folder_path, recursive=False))
+
+        self.assertEqual(
+            [scanned_file.name for scanned_file in scanned_files], ["file1.txt"]
+        )
+        self.assertEqual(
+            scanned_files[0].path, os.path.join(self.folder_path, "file1.txt")
+        )
+        self.assertEqual(scanned_files[0].size, len("file1.txt"))
+
+    def test_partial_uploads_are_skipped(self):
+        partial_path = os.path.join(self.folder_path, f"{PARTIAL_UPLOAD_PREFIX}1234")
+        with open(partial_path, "w") as file:
+            file.write("partial")
+
+        scanned_files = scan_folder(self.folder_path, recursive=False)
+
+        self.assertEqual(
+            [scanned_file.name for scanned_file in scanned_files], ["file1.txt"]
+        )
+        self.assertEqual(list(scan_paths(self.folder_path, [partial_path])), [])
+
+    def test_recursive(self):
+        scanned_files = scan_folder(self.folder_path, recursive=True)
+
+        self.assertEqual(
+            sorted(scanned_file.name for scanned_file in scanned_files),
+            ["file1.txt", "sub/file2.txt", "sub/nested/file3.txt"],
+        )
+
+    @override_settings(FILES_FOLDER_RECURSIVE=True)
+    def test_recursive_by_default_setting(self):
+        self.assertEqual(len(list(scan_folder(self.folder_path))), 3)
+
+    def test_symlinked_folder_is_not_followed(self):
+        os.symlink(self.folder_path, os.path.join(self.folder_path, "sub", "loop"))
+
+        self.assertEqual(len(list(scan_folder(self.folder_path, recursive=True))), 3)
+
+    def test_symlinked_file_has_size_of_target(self):
+        os.symlink(
+            os.path.join(self.folder_path, "file1.txt"),
+            os.path.join(self.folder_path, "link.txt"),
+        )
+
+        scanned_files = {
+            scanned_file.name: scanned_file
+            for scanned_file in scan_folder(self.folder_path, recursive=False)
+        }
+
+        self.assertEqual(scanned_files["link.txt"].size, len("file1.txt"))
+
+    def test_non_existing_folder(self):
+        with self.assertRaises(FileNotFoundError):
+            list(scan_folder(os.path.join(self.folder_path, "missing")))
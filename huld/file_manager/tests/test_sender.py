@@ -0,0 +1,89 @@
+import os
+import tempfile
+from unittest import mock
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase, override_settings
+from file_manager.services.dedup import ScannedFile
+from file_manager.services.sender import FileSender, TokenBucket, get_session
+
+from rest_framework import status
+
+MOCK_FILE_RECEIVE_URL = "https://test-url.com/"
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class TokenBucketTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        patcher = mock.patch("file_manager.services.sender.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_is_not_delayed(self):
+        bucket = TokenBucket(rate=10, capacity=3)
+
+        for _ in range(3):
+            bucket.acquire()
+
+        self.assertEqual(self.clock.now, 0.0)
+
+    def test_rate_is_limited(self):
+        bucket = TokenBucket(rate=4, capacity=1)
+
+        for _ in range(9):
+            bucket.acquire()
+
+        self.assertEqual(self.clock.now, 2.0)
+
+    def test_zero_rate_is_unlimited(self):
+        bucket = TokenBucket(rate=0)
+
+        for _ in range(100):
+            bucket.acquire()
+
+        self.assertEqual(self.clock.now, 0.0)
+
+
+@override_settings(FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL)
+class FileSenderTestCase(SimpleTestCase):
+    def test_session_is_shared(self):
+        self.assertIs(get_session(), get_session())
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_files_are_sent_concurrently(self, mock_post: MagicMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            scanned_files = []
+            for index in range(10):
+                file_path = os.path.join(temp_dir, f"file{index}.txt")
+                with open(file_path, "w") as file:
+                    file.write("test-text")
+                scanned_files.append(
+                    ScannedFile(
+                        name=f"file{index}.txt",
+                        path=file_path,
+                        stat_result=os.stat(file_path),
+                    )
+                )
+
+            with FileSender(max_concurrency=4, rate_limit=0) as sender:
+                futures = [
+                    sender.submit(scanned_file) for scanned_file in scanned_files
+                ]
+                responses = [future.result() for future in futures]
+
+        self.assertEqual(len(responses), 10)
+        self.assertEqual(mock_post.call_count, 10)
+        self.assertEqual(mock_post.call_args.args[0], MOCK_FILE_RECEIVE_URL)
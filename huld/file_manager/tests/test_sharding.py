@@ -0,0 +1,147 @@
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from unittest.mock import MagicMock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from file_manager.models import File, TransferJob, TransferWorker
+from file_manager.services.jobs import claim_next_job, queue_job
+from file_manager.services.scanner import scan_folder
+from file_manager.services.sharding import HashRing, get_members, get_shard
+
+from rest_framework import status
+
+MOCK_FILE_RECEIVE_URL = "https://test-url.com/"
+FILE_NAMES = [f"file{index}.txt" for index in range(20)]
+
+
+class HashRingTestCase(TestCase):
+    def test_keys_are_spread_over_members(self):
+        ring = HashRing(["worker-1", "worker-2", "worker-3"])
+
+        owners = [ring.get_owner(f"file{index}.txt") for index in range(3000)]
+
+        for member in ["worker-1", "worker-2", "worker-3"]:
+            self.assertGreater(owners.count(member), 700)
+
+    def test_only_keys_of_left_member_move(self):
+        keys = [f"file{index}.txt" for index in range(1000)]
+        ring = HashRing(["worker-1", "worker-2", "worker-3"])
+        smaller_ring = HashRing(["worker-1", "worker-2"])
+
+        for key in keys:
+            if ring.get_owner(key) != "worker-3":
+                self.assertEqual(smaller_ring.get_owner(key), ring.get_owner(key))
+
+    def test_empty_ring(self):
+        self.assertIsNone(HashRing([]).get_owner("file.txt"))
+
+
+@override_settings(
+    TRANSFER_SHARDING=True,
+    TRANSFER_JOBS_ASYNC=True,
+    FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL,
+    TRANSFER_RETRY_BASE_DELAY=0,
+    METRICS_PORT=0,
+)
+class ShardedTransferTestCase(TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        for index, file_name in enumerate(FILE_NAMES):
+            with open(os.path.join(self.temp_dir, file_name), "w") as temp_file:
+                temp_file.write(file_name * (index + 1))
+        for name in ["worker-1", "worker-2"]:
+            TransferWorker.objects.create(name=name, heartbeat_at=timezone.now())
+
+    def test_job_is_split_to_shards(self):
+        job, _ = queue_job()
+
+        self.assertEqual(
+            sorted(job.shards.values_list("worker", flat=True)),
+            ["worker-1", "worker-2"],
+        )
+        # The job itself is processed only by its shards
+        self.assertEqual(claim_next_job("worker-1").worker, "worker-1")
+        self.assertIsNone(claim_next_job("worker-1"))
+
+    def test_without_workers_job_is_not_split(self):
+        TransferWorker.objects.all().delete()
+
+        job, _ = queue_job()
+
+        self.assertFalse(job.shards.exists())
+        self.assertEqual(claim_next_job("worker-1"), job)
+
+    def test_gone_worker_is_removed(self):
+        TransferWorker.objects.filter(name="worker-2").update(
+            heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+
+        with self.assertLogs("file_manager.services.sharding"):
+            self.assertEqual(get_members(), ["worker-1"])
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_workers_send_own_shards(self, mock_post: MagicMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+        job, _ = queue_job()
+
+        sent_files = {}
+        for name in ["worker-1", "worker-2"]:
+            with override_settings(
+                FILES_FOLDER_PATH=self.temp_dir, TRANSFER_WORKER_NAME=name
+            ):
+                call_command("transfer_worker", "--once")
+            sent_files[name] = set(File.objects.values_list("name", flat=True))
+            # The worker leaves the ring on exit, it is registered again as if it was still running
+            TransferWorker.objects.create(name=name, heartbeat_at=timezone.now())
+
+        self.assertTrue(sent_files["worker-1"])
+        self.assertLess(len(sent_files["worker-1"]), len(FILE_NAMES))
+        self.assertEqual(sent_files["worker-2"], set(FILE_NAMES))
+        self.assertEqual(mock_post.call_count, len(FILE_NAMES))
+        job.refresh_from_db()
+        self.assertEqual(job.status, TransferJob.Status.SUCCEEDED)
+        self.assertEqual(job.files_scanned, len(FILE_NAMES))
+        self.assertEqual(job.files_sent, len(FILE_NAMES))
+        self.assertIsNotNone(job.finished_at)
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_shard_of_left_worker_is_taken_over(self, mock_post: MagicMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+        job, _ = queue_job()
+        TransferWorker.objects.filter(name="worker-2").delete()
+
+        with override_settings(
+            FILES_FOLDER_PATH=self.temp_dir, TRANSFER_WORKER_NAME="worker-1"
+        ):
+            call_command("transfer_worker", "--once")
+
+        self.assertEqual(File.objects.count(), len(FILE_NAMES))
+        job.refresh_from_db()
+        self.assertEqual(job.status, TransferJob.Status.SUCCEEDED)
+        self.assertEqual(job.files_sent, len(FILE_NAMES))
+
+    def test_files_of_same_size_are_spread_over_shards(self):
+        for index in range(20):
+            with open(os.path.join(self.temp_dir, f"copy{index}.txt"), "w") as file:
+                file.write("same-content")
+        job, _ = queue_job()
+        shards = [get_shard(shard) for shard in job.shards.all()]
+
+        owners = {
+            scanned_file.name: [scanned_file.file_number in shard for shard in shards]
+            for scanned_file in scan_folder(self.temp_dir)
+        }
+
+        for shards_of_file in owners.values():
+            self.assertEqual(sum(shards_of_file), 1)
+        copies_of_shards = [
+            sum(owners[f"copy{index}.txt"][shard] for index in range(20))
+            for shard in range(len(shards))
+        ]
+        self.assertTrue(all(copies_of_shards))
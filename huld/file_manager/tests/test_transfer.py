@@ -1,12 +1,14 @@
 import os
 import shutil
 import tempfile
+from hashlib import md5
 from unittest import mock
 from unittest.mock import MagicMock
 
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, override_settings
 from django.urls import reverse
-from file_manager.models import File
+from file_manager.models import DeadLetter, File, Fingerprint
 
 from rest_framework import status
 
@@ -15,8 +17,9 @@ VALID_FILES = [("file1.txt", "test-text"), ("file2.txt", "test-text2")]
 DUPLICATE_FILES = [("file1.txt", "test-text"), ("file2.txt", "test-text")]
 
 
+@override_settings(TRANSFER_JOBS_ASYNC=False, TRANSFER_RETRY_BASE_DELAY=0)
 class TransferViewTestCase(TestCase):
-    @mock.patch("file_manager.views.transfer.requests.post")
+    @mock.patch("file_manager.services.sender.requests.Session.post")
     def _test_success_bulk(
         self, mock_post: MagicMock, files: list, expected_files_num: int
     ) -> None:
@@ -38,10 +41,10 @@ class TransferViewTestCase(TestCase):
             self.assertEqual(mock_post.call_args.args[0], expected_url)
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             self.assertEqual(
-                len(mock_post.call_args.kwargs["files"]), expected_files_num
+                len(mock_post.call_args.kwargs["data"].fields), expected_files_num
             )
 
-    @mock.patch("file_manager.views.transfer.requests.post")
+    @mock.patch("file_manager.services.sender.requests.Session.post")
     def _test_success(
         self, mock_post: MagicMock, files: list, expected_files_num: int
     ) -> None:
@@ -65,7 +68,7 @@ class TransferViewTestCase(TestCase):
     def test_transfer_files_bulk(self):
         files = VALID_FILES
 
-        with self.assertLogs("file_manager.views.transfer") as log_mock:
+        with self.assertLogs("file_manager.services.transfer") as log_mock:
             self._test_success_bulk(files=files, expected_files_num=2)
 
         self.assertIn("Files were sent. Response:", log_mock.records[0].getMessage())
@@ -78,7 +81,7 @@ class TransferViewTestCase(TestCase):
     def test_duplicate_files_bulk(self):
         files = DUPLICATE_FILES
 
-        with self.assertLogs("file_manager.views.transfer") as log_mock:
+        with self.assertLogs("file_manager.services.transfer") as log_mock:
             self._test_success_bulk(files=files, expected_files_num=1)
 
         self.assertIn(
@@ -90,7 +93,7 @@ class TransferViewTestCase(TestCase):
         self.assertEqual(File.objects.filter(name="file1.txt").count(), 1)
         self.assertEqual(File.objects.filter(name="file2.txt").count(), 0)
 
-    @mock.patch("file_manager.views.transfer.requests.post")
+    @mock.patch("file_manager.services.sender.requests.Session.post")
     @override_settings(FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL, SEND_FILES_BULK=True)
     def test_connection_error_bulk(self, mock_post):
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -103,26 +106,53 @@ class TransferViewTestCase(TestCase):
                     temp_file.write(file_content)
                 temp_files.append(temp_file_path)
 
-            mock_post.side_effect = [ConnectionError()]
+            mock_post.side_effect = ConnectionError()
 
             with override_settings(FILES_FOLDER_PATH=temp_dir), self.assertLogs(
-                "file_manager.views.transfer",
+                "file_manager.services.transfer",
             ) as log_mock:
                 _ = self.client.post(reverse("transfer"))
 
-            self.assertEqual(
+            self.assertIn(
                 "Files were NOT sent. An Exception has been raised: ",
-                log_mock.records[-1].getMessage(),
+                [record.getMessage() for record in log_mock.records],
             )
             self.assertEqual(mock_post.call_args.args[0], expected_url)
             self.assertEqual(File.objects.count(), 0)
 
-    @mock.patch("file_manager.views.transfer.requests.post")
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    @override_settings(
+        FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL, SEND_FILES_BULK=True, BULK_MAX_FILES=1
+    )
+    def test_retried_batch_bulk(self, mock_post):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for file_name, file_content in VALID_FILES:
+                temp_file_path = os.path.join(temp_dir, file_name)
+                with open(temp_file_path, "w") as temp_file:
+                    temp_file.write(file_content)
+
+            mock_post.side_effect = [
+                MagicMock(status_code=status.HTTP_503_SERVICE_UNAVAILABLE),
+                MagicMock(status_code=status.HTTP_200_OK),
+                MagicMock(status_code=status.HTTP_200_OK),
+            ]
+
+            with override_settings(FILES_FOLDER_PATH=temp_dir), self.assertLogs(
+                "file_manager.services.transfer",
+            ):
+                response = self.client.post(reverse("transfer"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(File.objects.count(), 2)
+        self.assertFalse(DeadLetter.objects.exists())
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
     @override_settings(FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL)
     def test_transfer_files(self, mock_post):
         files = VALID_FILES
 
-        with self.assertLogs("file_manager.views.transfer") as log_mock:
+        with self.assertLogs("file_manager.services.transfer") as log_mock:
             self._test_success(files=files, expected_files_num=2)
 
         self.assertIn(
@@ -140,7 +170,7 @@ class TransferViewTestCase(TestCase):
     def test_duplicate_files(self):
         files = DUPLICATE_FILES
 
-        with self.assertLogs("file_manager.views.transfer") as log_mock:
+        with self.assertLogs("file_manager.services.transfer") as log_mock:
             self._test_success(files=files, expected_files_num=1)
 
         self.assertIn(
@@ -155,7 +185,7 @@ class TransferViewTestCase(TestCase):
         self.assertEqual(File.objects.filter(name="file1.txt").count(), 1)
         self.assertEqual(File.objects.filter(name="file2.txt").count(), 0)
 
-    @mock.patch("file_manager.views.transfer.requests.post")
+    @mock.patch("file_manager.services.sender.requests.Session.post")
     @override_settings(FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL)
     def test_connection_error(self, mock_post):
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -168,27 +198,28 @@ class TransferViewTestCase(TestCase):
                     temp_file.write(file_content)
                 temp_files.append(temp_file_path)
 
-            mock_post.side_effect = [ConnectionError()]
+            mock_post.side_effect = ConnectionError()
 
             with override_settings(FILES_FOLDER_PATH=temp_dir), self.assertLogs(
-                "file_manager.views.transfer",
+                "file_manager.services.transfer",
             ) as log_mock:
                 _ = self.client.post(reverse("transfer"))
 
-        self.assertEqual(
+        self.assertIn(
             "Files were NOT sent. An Exception has been raised: ",
-            log_mock.records[-1].getMessage(),
+            [record.getMessage() for record in log_mock.records],
         )
         self.assertEqual(mock_post.call_args.args[0], expected_url)
         self.assertEqual(File.objects.count(), 0)
+        self.assertEqual(DeadLetter.objects.count(), 2)
 
-    @mock.patch("file_manager.views.transfer.requests.post")
+    @mock.patch("file_manager.services.sender.requests.Session.post")
     @override_settings(FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL)
     def test_renamed_file_not_sent_not_created(self, mock_post):
         files = [("file1.txt", "test-text")]
         new_name = "file1_renamed.txt"
 
-        with self.assertLogs("file_manager.views.transfer") as log_mock:
+        with self.assertLogs("file_manager.services.transfer") as log_mock:
             with tempfile.TemporaryDirectory() as temp_dir:
                 temp_files = []
                 for file_name, file_content in files:
@@ -231,9 +262,132 @@ class TransferViewTestCase(TestCase):
                 with self.assertRaises(File.DoesNotExist):
                     File.objects.get(name=new_file_name)
 
+    def _post_files(self, files: list):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for file_name, file_content in files:
+                with open(os.path.join(temp_dir, file_name), "w") as temp_file:
+                    temp_file.write(file_content)
+
+            with override_settings(FILES_FOLDER_PATH=temp_dir), self.assertLogs(
+                "file_manager.services.transfer"
+            ):
+                return self.client.post(reverse("transfer"))
+
+    @staticmethod
+    def _reject_file(file_name: str):
+        """Receiver, which rejects the requests containing the given file"""
+
+        def post(url, data, headers):
+            names = [scanned_file.name for _, scanned_file in data.fields]
+            status_code = (
+                status.HTTP_400_BAD_REQUEST
+                if file_name in names
+                else status.HTTP_200_OK
+            )
+            return MagicMock(status_code=status_code, text="")
+
+        return post
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    @override_settings(FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL)
+    def test_failed_file_is_dead_lettered(self, mock_post):
+        mock_post.side_effect = self._reject_file("file1.txt")
+
+        response = self._post_files(VALID_FILES)
+
+        self.assertEqual(response.status_code, status.HTTP_424_FAILED_DEPENDENCY)
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(
+            list(File.objects.values_list("name", flat=True)), ["file2.txt"]
+        )
+        dead_letter = DeadLetter.objects.get()
+        self.assertEqual(dead_letter.name, "file1.txt")
+        self.assertEqual(dead_letter.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(dead_letter.attempts, 1)
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    @override_settings(FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL)
+    def test_dead_letter_is_removed_once_sent(self, mock_post):
+        mock_post.side_effect = self._reject_file("file1.txt")
+        self._post_files(VALID_FILES[:1])
+        self.assertEqual(DeadLetter.objects.count(), 1)
+
+        mock_post.side_effect = None
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+        response = self._post_files(VALID_FILES[:1])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(DeadLetter.objects.exists())
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    @override_settings(FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL)
+    def test_new_files_are_hashed_once_sent(self, mock_post):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+
+        response = self._post_files(VALID_FILES)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["files_hashed"], 2)
+        self.assertEqual(
+            File.objects.get(name="file2.txt").md5_hash,
+            md5(b"test-text2").hexdigest(),
+        )
+        self.assertIsNotNone(File.objects.get(name="file2.txt").sample_hash)
+
+    @mock.patch("file_manager.services.fingerprint.hash_file_paths", return_value=[])
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    @override_settings(FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL)
+    def test_new_files_are_hashed_while_sent(self, mock_post, mock_hash_file_paths):
+        def post(url, data, headers):
+            data.read()
+            return MagicMock(status_code=status.HTTP_200_OK)
+
+        mock_post.side_effect = post
+
+        response = self._post_files(VALID_FILES)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["files_hashed"], 2)
+        self.assertEqual(
+            File.objects.get(name="file2.txt").md5_hash,
+            md5(b"test-text2").hexdigest(),
+        )
+        # The files were read only once, while they were sent
+        for call in mock_hash_file_paths.call_args_list:
+            self.assertEqual(call.args[0], [])
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    @override_settings(FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL, SEND_FILES_BULK=True)
+    def test_failed_batch_is_sent_by_one_bulk(self, mock_post):
+        mock_post.side_effect = self._reject_file("file1.txt")
+
+        response = self._post_files(VALID_FILES)
+
+        self.assertEqual(response.status_code, status.HTTP_424_FAILED_DEPENDENCY)
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(
+            list(File.objects.values_list("name", flat=True)), ["file2.txt"]
+        )
+        self.assertEqual(DeadLetter.objects.get().name, "file1.txt")
+
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    @override_settings(
+        FILE_RECEIVE_URL=MOCK_FILE_RECEIVE_URL,
+        TRANSFER_MAX_CONCURRENCY=1,
+        TRANSFER_CIRCUIT_THRESHOLD=2,
+    )
+    def test_transfer_stops_when_circuit_opens(self, mock_post):
+        mock_post.side_effect = ConnectionError()
+
+        response = self._post_files(VALID_FILES)
+
+        self.assertEqual(response.status_code, status.HTTP_424_FAILED_DEPENDENCY)
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertFalse(DeadLetter.objects.exists())
+
     def test_non_existing_folder(self):
         non_exitsting_folder = "this/folder/does/not/exist"
-        with self.assertLogs("file_manager.views.transfer") as log_mock:
+        with self.assertLogs("file_manager.services.transfer") as log_mock:
             with override_settings(FILES_FOLDER_PATH=non_exitsting_folder):
                 response = self.client.post(reverse("transfer"))
 
@@ -268,3 +422,58 @@ class UploadViewTestCase(TestCase):
             self.assertEqual(saved_content, file_content)
 
         shutil.rmtree(non_existing_folder)
+
+    def _upload(self, file_content: bytes, headers: dict | None = None):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        upload = SimpleUploadedFile("upload.txt", file_content)
+        with override_settings(FILES_FOLDER_PATH=temp_dir.name):
+            response = self.client.post(
+                reverse("transfer-upload"), {"file": upload}, headers=headers
+            )
+        return response, temp_dir.name
+
+    def test_uploaded_file_is_fingerprinted(self):
+        response, folder_path = self._upload(b"Test data")
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(os.listdir(folder_path), ["upload.txt"])
+        fingerprint = Fingerprint.objects.get()
+        self.assertEqual(fingerprint.md5_hash, md5(b"Test data").hexdigest())
+        self.assertTrue(
+            fingerprint.matches(os.stat(os.path.join(folder_path, "upload.txt")), "md5")
+        )
+
+    def test_sent_content_is_not_stored(self):
+        File.objects.create(
+            name="other.txt",
+            md5_hash=md5(b"Test data").hexdigest(),
+            file_number=1,
+            size=9,
+        )
+
+        response, folder_path = self._upload(b"Test data")
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(os.listdir(folder_path), [])
+
+    def test_sent_content_is_rejected_by_hash_header(self):
+        file_hash = md5(b"Test data").hexdigest()
+        File.objects.create(name="other.txt", md5_hash=file_hash, file_number=1, size=9)
+
+        with mock.patch(
+            "file_manager.services.uploads.FolderUploadHandler.receive_data_chunk"
+        ) as mock_receive:
+            response, folder_path = self._upload(
+                b"Test data", headers={"X-Content-Hash": f"md5:{file_hash}"}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(mock_receive.call_count, 0)
+        self.assertEqual(os.listdir(folder_path), [])
+
+    def test_empty_file_is_not_stored(self):
+        response, folder_path = self._upload(b"")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(os.listdir(folder_path), [])
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import time
+from unittest import mock
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from file_manager.models import File, TransferJob
+from file_manager.services.jobs import run_job
+from file_manager.services.watcher import InotifyWatcher, PollingWatcher
+
+from rest_framework import status
+
+
+class WatcherTestMixin:
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.folder_path = temp_dir.name
+
+    def _write(self, file_name: str, content: str, mode: str = "w") -> str:
+        file_path = os.path.join(self.folder_path, file_name)
+        with open(file_path, mode) as file:
+            file.write(content)
+        return file_path
+
+    def _poll_until_ready(self, watcher, timeout: float = 2) -> list[str]:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if file_paths := watcher.poll(timeout=0.05):
+                return file_paths
+        return []
+
+
+class InotifyWatcherTestCase(WatcherTestMixin, SimpleTestCase):
+    def _create_watcher(self, **kwargs) -> InotifyWatcher:
+        watcher = InotifyWatcher(self.folder_path, **kwargs)
+        self.addCleanup(watcher.close)
+        return watcher
+
+    def test_written_file_is_reported(self):
+        watcher = self._create_watcher(recursive=False, debounce=0)
+
+        file_path = self._write("file1.txt", "test-text")
+
+        self.assertEqual(self._poll_until_ready(watcher), [file_path])
+
+    def test_moved_in_file_is_reported(self):
+        watcher = self._create_watcher(recursive=False, debounce=0)
+        with tempfile.NamedTemporaryFile(delete=False) as file:
+            file.write(b"test-text")
+
+        file_path = os.path.join(self.folder_path, "file1.txt")
+        os.rename(file.name, file_path)
+
+        self.assertEqual(self._poll_until_ready(watcher), [file_path])
+
+    def test_file_written_again_is_debounced(self):
+        watcher = self._create_watcher(recursive=False, debounce=0.5)
+
+        file_path = self._write("file1.txt", "test-text")
+        self.assertEqual(watcher.poll(timeout=0.2), [])
+        self._write("file1.txt", "-appended", mode="a")
+        self.assertEqual(watcher.poll(timeout=0.4), [])
+
+        self.assertEqual(self._poll_until_ready(watcher), [file_path])
+
+    def test_file_in_new_subfolder_is_reported(self):
+        watcher = self._create_watcher(recursive=True, debounce=0)
+
+        os.mkdir(os.path.join(self.folder_path, "sub"))
+        watcher.poll(timeout=0.1)
+        file_path = self._write("sub/file1.txt", "test-text")
+
+        self.assertEqual(self._poll_until_ready(watcher), [file_path])
+
+
+class PollingWatcherTestCase(WatcherTestMixin, SimpleTestCase):
+    def test_only_new_files_are_reported(self):
+        self._write("file1.txt", "test-text")
+        watcher = PollingWatcher(
+            self.folder_path, recursive=False, debounce=0, poll_interval=0.05
+        )
+
+        file_path = self._write("file2.txt", "test-text2")
+
+        self.assertEqual(self._poll_until_ready(watcher), [file_path])
+        self.assertEqual(watcher.poll(timeout=0.1), [])
+
+
+@override_settings(FILE_RECEIVE_URL="https://test-url.com/")
+class RunJobForFilesTestCase(WatcherTestMixin, TestCase):
+    @mock.patch("file_manager.services.sender.requests.Session.post")
+    def test_only_given_files_are_sent(self, mock_post: MagicMock):
+        mock_post.return_value = MagicMock(status_code=status.HTTP_200_OK)
+        self._write("file1.txt", "test-text")
+        file_path = self._write("file2.txt", "test-text2")
+        job = TransferJob.objects.create(status=TransferJob.Status.RUNNING)
+
+        with override_settings(FILES_FOLDER_PATH=self.folder_path):
+            run_job(job, [file_path, os.path.join(self.folder_path, "missing.txt")])
+
+        self.assertEqual(job.status, TransferJob.Status.SUCCEEDED)
+        self.assertEqual(job.files_scanned, 1)
+        self.assertEqual(
+            list(File.objects.values_list("name", flat=True)), ["file2.txt"]
+        )
@@ -1,10 +1,19 @@
 from django.urls import path
+from file_manager.views.async_transfer import AsyncTransferView
 from file_manager.views.main import MainScreen
+from file_manager.views.metrics import MetricsView
 from file_manager.views.transfer import TransferView
 
 urlpatterns = [
     path("", MainScreen.as_view()),
+    path("metrics", MetricsView.as_view(), name="metrics"),
     path("transfer/", TransferView.as_view({"post": "create"}), name="transfer"),
+    path("transfer/async/", AsyncTransferView.as_view(), name="transfer-async"),
+    path(
+        "transfer/<int:pk>/",
+        TransferView.as_view({"get": "retrieve"}),
+        name="transfer-detail",
+    ),
     path(
         "transfer/upload/",
         TransferView.as_view({"post": "upload"}),
@@ -0,0 +1,41 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from file_manager.models import TransferJob
+from file_manager.serializers.transfer_job import TransferJobSerializer
+from file_manager.services.jobs import arun_job, get_transfer_lock_name
+from file_manager.services.locking import advisory_unlock, try_advisory_lock
+
+from rest_framework import status
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncTransferView(View):
+    """
+    View for handling the transfer of the files natively on the event loop.
+    Meant to be served by an ASGI server (e.g. `uvicorn huld.asgi:application`).
+    """
+
+    async def post(self, request, *args, **kwargs) -> JsonResponse:
+        # Only one transfer started by the API runs at once, see `TransferView`
+        lock_name = get_transfer_lock_name()
+        if not await sync_to_async(try_advisory_lock)(lock_name):
+            return JsonResponse(
+                {"detail": "Transfer of the folder is running already."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        try:
+            job = await TransferJob.objects.acreate(
+                status=TransferJob.Status.RUNNING, started_at=timezone.now()
+            )
+            await arun_job(job)
+        finally:
+            await sync_to_async(advisory_unlock)(lock_name)
+        if job.status == TransferJob.Status.SUCCEEDED:
+            response_status = status.HTTP_200_OK
+        else:
+            response_status = status.HTTP_424_FAILED_DEPENDENCY
+        return JsonResponse(TransferJobSerializer(job).data, status=response_status)
@@ -0,0 +1,10 @@
+from django.http import HttpResponse
+from django.views import View
+from file_manager.services.metrics import CONTENT_TYPE, REGISTRY
+
+
+class MetricsView(View):
+    """Metrics of the process in the Prometheus text format, meant to be scraped by Prometheus"""
+
+    def get(self, request, *args, **kwargs) -> HttpResponse:
+        return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
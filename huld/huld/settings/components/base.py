@@ -131,8 +131,134 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Folder path, from which the files shall be sent
 FILES_FOLDER_PATH = os.environ.get("HULD_FILES_FOLDER_PATH", BASE_DIR / "test")
+# Whether the files in the subfolders of `FILES_FOLDER_PATH` shall be sent as well
+FILES_FOLDER_RECURSIVE = (
+    os.environ.get("HULD_FILES_FOLDER_RECURSIVE", "false").lower() == "true"
+)
 FILE_RECEIVE_URL = os.environ.get("HULD_FILE_RECEIVE_URL")
 SEND_FILES_BULK = False
+# Whether the transfer is only queued by the API and processed by the `transfer_worker` command
+TRANSFER_JOBS_ASYNC = (
+    os.environ.get("HULD_TRANSFER_JOBS_ASYNC", "true").lower() == "true"
+)
+# Number of seconds, after which a file claimed by a job, which has not released it (e.g. it has crashed),
+# can be claimed by another job. Must be longer than the sending of one batch of the files takes.
+TRANSFER_CLAIM_TIMEOUT = int(os.environ.get("HULD_TRANSFER_CLAIM_TIMEOUT", 60 * 60))
+# Whether a queued transfer is split to shards of the folder, one for every running `transfer_worker`,
+# so the workers sharing the folder (e.g. on a shared volume) send the files in parallel
+TRANSFER_SHARDING = os.environ.get("HULD_TRANSFER_SHARDING", "false").lower() == "true"
+# Unique name of the `transfer_worker` in the sharded transfers (default: host name and process ID)
+TRANSFER_WORKER_NAME = os.environ.get("HULD_TRANSFER_WORKER_NAME", "")
+# Number of seconds between the heartbeats of the `transfer_worker` and after which a worker without a heartbeat
+# is considered gone, so its shards are taken over by the other workers
+TRANSFER_WORKER_HEARTBEAT_INTERVAL = float(
+    os.environ.get("HULD_TRANSFER_WORKER_HEARTBEAT_INTERVAL", 10)
+)
+TRANSFER_WORKER_TIMEOUT = float(os.environ.get("HULD_TRANSFER_WORKER_TIMEOUT", 60))
+# Number of points of every worker on the consistent hash ring, more points spread the files more evenly
+TRANSFER_SHARD_VIRTUAL_NODES = int(
+    os.environ.get("HULD_TRANSFER_SHARD_VIRTUAL_NODES", 128)
+)
+# Port, on which the `transfer_worker` and `watch_folder` commands serve their metrics at `/metrics` (0 = disabled),
+# the application serves the metrics of its own process at `/metrics`. The jobs are run by the `transfer_worker`
+# by default (`TRANSFER_JOBS_ASYNC`), so its metrics are served unless disabled.
+METRICS_PORT = int(os.environ.get("HULD_METRICS_PORT", 9464))
+# Number of seconds the `transfer_worker` waits before checking for new jobs again
+TRANSFER_WORKER_POLL_INTERVAL = float(
+    os.environ.get("HULD_TRANSFER_WORKER_POLL_INTERVAL", 2)
+)
+# Number of seconds a new file must stay unchanged before the `watch_folder` command sends it
+WATCH_DEBOUNCE = float(os.environ.get("HULD_WATCH_DEBOUNCE", 1))
+# Number of seconds between the scans of the folder, if the `watch_folder` command cannot use inotify
+WATCH_POLL_INTERVAL = float(os.environ.get("HULD_WATCH_POLL_INTERVAL", 2))
+# Size of the buffer (in bytes), in which the files are read while being hashed
+HASH_CHUNK_SIZE = int(os.environ.get("HULD_HASH_CHUNK_SIZE", 1024 * 1024))
+# Number of bytes of the head and of the tail of a new file, by which it is sampled before it is hashed (0 = disabled).
+# Only the files, whose size and sample equal to another file, are hashed before being sent, the others after.
+DEDUP_SAMPLE_SIZE = int(os.environ.get("HULD_DEDUP_SAMPLE_SIZE", 4096))
+# In-process cache of the sent hashes: bloom filter sized for `DEDUP_CACHE_CAPACITY` files (0 = disabled) with
+# `DEDUP_CACHE_ERROR_RATE` false positives and LRU of `DEDUP_CACHE_POSITIVES` hashes confirmed to be sent
+DEDUP_CACHE_CAPACITY = int(os.environ.get("HULD_DEDUP_CACHE_CAPACITY", 1_000_000))
+DEDUP_CACHE_ERROR_RATE = float(os.environ.get("HULD_DEDUP_CACHE_ERROR_RATE", 0.01))
+DEDUP_CACHE_POSITIVES = int(os.environ.get("HULD_DEDUP_CACHE_POSITIVES", 100_000))
+# Number of seconds, for which the cache reads again the ids of the sent files missing below the last read one,
+# as a transaction holding a lower id may commit later (the longest transaction storing the sent files)
+DEDUP_CACHE_GAP_TIMEOUT = float(os.environ.get("HULD_DEDUP_CACHE_GAP_TIMEOUT", 60))
+# Number of seconds, for which the cache is used without reading the files sent by the other processes since,
+# the files sent by this process are added at once
+DEDUP_CACHE_REFRESH_INTERVAL = float(
+    os.environ.get("HULD_DEDUP_CACHE_REFRESH_INTERVAL", 10)
+)
+# Algorithm, by which the files are hashed for the deduplication (`md5`, `sha256`, `blake2b`,
+# `blake3` if the `blake3` package is installed, `xxh3` if the `xxhash` package is installed)
+HASH_ALGORITHM = os.environ.get("HULD_HASH_ALGORITHM", "md5")
+# Number of workers hashing the files in parallel (0 = number of CPU cores) and their type (`thread` or `process`)
+HASH_WORKERS = int(os.environ.get("HULD_HASH_WORKERS", 0))
+HASH_POOL = os.environ.get("HULD_HASH_POOL", "thread")
+# Number of files, which are hashed and checked for duplicates together
+TRANSFER_BATCH_SIZE = int(os.environ.get("HULD_TRANSFER_BATCH_SIZE", 1000))
+# Maximal number of files being sent at once and maximal number of requests per second (0 = unlimited),
+# so we don't overwhelm the external endpoint
+TRANSFER_MAX_CONCURRENCY = int(os.environ.get("HULD_TRANSFER_MAX_CONCURRENCY", 8))
+TRANSFER_RATE_LIMIT = float(os.environ.get("HULD_TRANSFER_RATE_LIMIT", 50))
+# Maximal number of files being sent at once by the asynchronous transfer (`/transfer/async/`)
+TRANSFER_ASYNC_MAX_CONCURRENCY = int(
+    os.environ.get("HULD_TRANSFER_ASYNC_MAX_CONCURRENCY", 200)
+)
+# Number of attempts to send a file (or a batch in the bulk mode) and the delays (in seconds) between them,
+# which grow exponentially from the base delay up to the maximal delay
+TRANSFER_RETRY_ATTEMPTS = int(os.environ.get("HULD_TRANSFER_RETRY_ATTEMPTS", 5))
+TRANSFER_RETRY_BASE_DELAY = float(os.environ.get("HULD_TRANSFER_RETRY_BASE_DELAY", 0.5))
+TRANSFER_RETRY_MAX_DELAY = float(os.environ.get("HULD_TRANSFER_RETRY_MAX_DELAY", 30))
+# Number of failed attempts in a row, after which the transfer stops sending to the receiver,
+# and number of seconds, after which it is tried again
+TRANSFER_CIRCUIT_THRESHOLD = int(os.environ.get("HULD_TRANSFER_CIRCUIT_THRESHOLD", 10))
+TRANSFER_CIRCUIT_RESET_TIMEOUT = float(
+    os.environ.get("HULD_TRANSFER_CIRCUIT_RESET_TIMEOUT", 30)
+)
+# Maximal number of files and maximal total size (in bytes) of files sent in one request in the bulk mode
+BULK_MAX_FILES = int(os.environ.get("HULD_BULK_MAX_FILES", 100))
+BULK_MAX_BYTES = int(os.environ.get("HULD_BULK_MAX_BYTES", 100 * 1024 * 1024))
+# Endpoint of the receiver for the resumable uploads by the tus protocol (https://tus.io), unset = disabled.
+# Files of at least `CHUNKED_UPLOAD_THRESHOLD` bytes are then uploaded in chunks of `CHUNKED_UPLOAD_CHUNK_SIZE` bytes.
+CHUNKED_UPLOAD_URL = os.environ.get("HULD_CHUNKED_UPLOAD_URL")
+CHUNKED_UPLOAD_THRESHOLD = int(
+    os.environ.get("HULD_CHUNKED_UPLOAD_THRESHOLD", 64 * 1024 * 1024)
+)
+CHUNKED_UPLOAD_CHUNK_SIZE = int(
+    os.environ.get("HULD_CHUNKED_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)
+)
+# Endpoint of the receiver of the files split to content-defined chunks, unset = disabled.
+# Files of at least `CHUNK_DEDUP_THRESHOLD` bytes are then split to chunks of `CHUNK_DEDUP_MIN_SIZE` up to
+# `CHUNK_DEDUP_MAX_SIZE` bytes (`CHUNK_DEDUP_AVG_SIZE` on average) and only the chunks new to the receiver are sent.
+CHUNK_DEDUP_URL = os.environ.get("HULD_CHUNK_DEDUP_URL")
+CHUNK_DEDUP_THRESHOLD = int(
+    os.environ.get("HULD_CHUNK_DEDUP_THRESHOLD", 16 * 1024 * 1024)
+)
+CHUNK_DEDUP_MIN_SIZE = int(os.environ.get("HULD_CHUNK_DEDUP_MIN_SIZE", 256 * 1024))
+CHUNK_DEDUP_AVG_SIZE = int(os.environ.get("HULD_CHUNK_DEDUP_AVG_SIZE", 1024 * 1024))
+CHUNK_DEDUP_MAX_SIZE = int(os.environ.get("HULD_CHUNK_DEDUP_MAX_SIZE", 4 * 1024 * 1024))
+# Whether the files sent one by one are sent as the raw body of the request instead of the multipart form,
+# so the content is sent by `os.sendfile` without being copied to Python (zero-copy, plain HTTP only).
+# The name of the file is in the `Content-Disposition` header, the files are not compressed.
+UPLOAD_RAW_BODY = os.environ.get("HULD_UPLOAD_RAW_BODY", "false").lower() == "true"
+# Codecs (`gzip`, `zstd`), by which the sent files may be compressed, in the order of preference.
+# The first one accepted by the receiver is used, the files are sent uncompressed if none is accepted.
+UPLOAD_COMPRESSION = [
+    codec for codec in os.environ.get("HULD_UPLOAD_COMPRESSION", "").split(",") if codec
+]
+# Level of the compression (0 = default level of the codec)
+UPLOAD_COMPRESSION_LEVEL = int(os.environ.get("HULD_UPLOAD_COMPRESSION_LEVEL", 0))
+# Extensions of the files, which are compressed already and so they are sent as they are
+UPLOAD_COMPRESSION_SKIP_EXTENSIONS = os.environ.get(
+    "HULD_UPLOAD_COMPRESSION_SKIP_EXTENSIONS",
+    ".gz,.tgz,.zst,.zip,.bz2,.xz,.7z,.rar,.jpg,.jpeg,.png,.gif,.webp,.mp3,.mp4,.mkv,.avi,.pdf,.docx,.xlsx",
+).split(",")
+# Size of the chunks (in bytes), in which the files are read while being sent
+UPLOAD_CHUNK_SIZE = int(os.environ.get("HULD_UPLOAD_CHUNK_SIZE", 256 * 1024))
+# Name of the form field following every sent file with the hash of its content (`<algorithm>:<hash>`),
+# computed while the file is being sent (empty = not sent, e.g. `hash`)
+UPLOAD_HASH_FIELD = os.environ.get("HULD_UPLOAD_HASH_FIELD", "")
 
 # Whitenoise for taking care about the static files
 STORAGES = {